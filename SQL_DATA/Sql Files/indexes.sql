@@ -0,0 +1,20 @@
+-- =========================
+--  SECONDARY INDEXES
+--  Created by the warehouse loader after the bulk load, then ANALYZE.
+-- =========================
+
+-- Joins from SalesOrder to its dimensions
+CREATE INDEX IF NOT EXISTS ix_salesorder_customer ON SalesOrder (customerNameIndex);
+CREATE INDEX IF NOT EXISTS ix_salesorder_region ON SalesOrder (deliveryRegionIndex);
+CREATE INDEX IF NOT EXISTS ix_salesorder_product ON SalesOrder (productDescriptionIndex);
+
+-- Date filters ("in 2018", "last quarter") and the rollup watermark;
+-- the included columns let monthly revenue queries use an index-only scan
+CREATE INDEX IF NOT EXISTS ix_salesorder_orderdate ON SalesOrder (orderDate)
+    INCLUDE (lineTotal, orderQuantity);
+
+-- Per-product trends over time
+CREATE INDEX IF NOT EXISTS ix_salesorder_product_orderdate ON SalesOrder (productDescriptionIndex, orderDate);
+
+-- Regions -> stateRegions join and state filters
+CREATE INDEX IF NOT EXISTS ix_regions_statecode ON Regions (stateCode);
@@ -0,0 +1,207 @@
+"""
+Admission control for the chat API.
+
+* PipelineLimiter caps how many RAG / SQL branches run at once and how many
+  requests may queue for a slot; beyond that a request is refused at once.
+* RateLimiter is a token bucket per client.
+* The request deadline lives in a ContextVar. tracing.submit copies the
+  context into pool threads, so every stage (LLM calls, retries, the SQL
+  agent) can see how much of the client's budget is left.
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .cache import TTLCache, MISSING
+from . import tracing
+
+RAG_MAX_CONCURRENT = int(os.getenv("RAG_MAX_CONCURRENT", "8"))
+RAG_QUEUE_SIZE = int(os.getenv("RAG_QUEUE_SIZE", "16"))
+SQL_MAX_CONCURRENT = int(os.getenv("SQL_MAX_CONCURRENT", "4"))
+SQL_QUEUE_SIZE = int(os.getenv("SQL_QUEUE_SIZE", "4"))
+# Longest a request waits in the queue for a pipeline slot
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+
+# Per-client token bucket: sustained requests/second and burst size
+CLIENT_RATE = float(os.getenv("CLIENT_RATE", "1.0"))
+CLIENT_BURST = float(os.getenv("CLIENT_BURST", "10"))
+
+_deadline = ContextVar("deadline", default=None)
+
+
+class Overloaded(Exception):
+    """No capacity for the request; retry_after is a hint in seconds."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def retry_after_header(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+# ---------------------------------------------------------------- deadlines
+
+@contextmanager
+def deadline(seconds: float):
+    """Give the block (and tasks submitted from it) a budget of seconds."""
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(at, current))
+    try:
+        yield _deadline.get()
+    finally:
+        _deadline.reset(token)
+
+
+def deadline_at(default: float = None):
+    """Absolute (monotonic) deadline of the current request, or default."""
+    at = _deadline.get()
+    return default if at is None else at if default is None else min(at, default)
+
+
+def remaining(default: float = None):
+    """Seconds left in the current budget; default when there is no deadline."""
+    at = _deadline.get()
+    return default if at is None else max(0.0, at - time.monotonic())
+
+
+def check_deadline(stage: str):
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"deadline exceeded before {stage}")
+
+
+# ---------------------------------------------------------------- pipelines
+
+class PipelineLimiter:
+    """Concurrency limit with a bounded wait queue in front of it."""
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # Moving average of how long a slot is held, for Retry-After
+        self.avg_seconds = 1.0
+
+    def retry_after(self) -> float:
+        return self.avg_seconds * (self.waiting + 1) / self.limit
+
+    def acquire(self, timeout: float = None, wait: bool = True):
+        """Take a slot, waiting in the queue if allowed; raises Overloaded."""
+        timeout = self.queue_timeout if timeout is None else timeout
+        timeout = min(timeout, remaining(timeout))
+        with self._cond:
+            if self.active < self.limit:
+                self.active += 1
+                self.admitted += 1
+                return
+            if not wait or self.waiting >= self.queue_size:
+                self.rejected += 1
+                raise Overloaded(f"{self.name} pipeline is saturated", self.retry_after())
+
+            self.waiting += 1
+            try:
+                end = time.monotonic() + timeout
+                while self.active >= self.limit:
+                    left = end - time.monotonic()
+                    if left <= 0:
+                        self.timed_out += 1
+                        raise Overloaded(f"{self.name} pipeline queue timed out", self.retry_after())
+                    self._cond.wait(left)
+                self.active += 1
+                self.admitted += 1
+            finally:
+                self.waiting -= 1
+
+    def release(self, held_seconds: float = None):
+        with self._cond:
+            self.active -= 1
+            if held_seconds is not None:
+                self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * held_seconds
+            self._cond.notify()
+
+    def submit(self, executor, fn, *args, wait: bool = True, **kwargs):
+        """Acquire a slot, run fn on the executor and free the slot when it finishes."""
+        self.acquire(wait=wait)
+        start = time.monotonic()
+        try:
+            future = tracing.submit(executor, fn, *args, **kwargs)
+        except BaseException:
+            self.release()
+            raise
+        future.add_done_callback(lambda _: self.release(time.monotonic() - start))
+        return future
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "queue_size": self.queue_size,
+                "active": self.active,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "avg_seconds": round(self.avg_seconds, 3),
+            }
+
+
+# ---------------------------------------------------------------- clients
+
+class RateLimiter:
+    """Token bucket per client; idle clients are forgotten after an hour."""
+
+    def __init__(self, rate: float = CLIENT_RATE, burst: float = CLIENT_BURST, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = TTLCache(max_size=max_clients, ttl=3600)
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def allow(self, client: str):
+        """Return (allowed, retry_after_seconds)."""
+        if self.rate <= 0:
+            return True, 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            tokens, last = (self.burst, now) if bucket is MISSING else bucket
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1.0:
+                self._buckets.set(client, (tokens - 1.0, now))
+                return True, 0.0
+            self._buckets.set(client, (tokens, now))
+            self.limited += 1
+            return False, (1.0 - tokens) / self.rate
+
+    def stats(self) -> dict:
+        return {"rate": self.rate, "burst": self.burst, "clients": len(self._buckets), "limited": self.limited}
+
+
+rag_limiter = PipelineLimiter("rag", RAG_MAX_CONCURRENT, RAG_QUEUE_SIZE)
+sql_limiter = PipelineLimiter("sql", SQL_MAX_CONCURRENT, SQL_QUEUE_SIZE)
+client_limiter = RateLimiter()
+
+
+def admission_stats() -> dict:
+    return {
+        "rag": rag_limiter.stats(),
+        "sql": sql_limiter.stats(),
+        "clients": client_limiter.stats(),
+    }
@@ -1,14 +1,41 @@
-from flask import Flask
-from flask_restful import Api, Resource, reqparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import time
 
-from .data_retrival_.search import ask_question
+from flask import Flask, Response, request, stream_with_context
+from flask_restful import Api, Resource, inputs, reqparse
+
+from .data_retrival_.search import ask_question, stream_answer
+from .data_retrival_.retriever import embed_query
+from .data_retrival_.query_router import BOTH, Route, router
+from .data_retrival_.response_generator import NO_ANSWER
 from .data_retrival_.sql_retrival import data_retriever
+from .data_retrival_.answer_cache import answer_cache
+from .data_retrival_.chart_store import MIMETYPES, chart_store, parse_name
+from .data_retrival_.LLMs import llm_stats
+from .database_config import ping
+from .vectordb import warm_up, registry_stats
+from . import admission, tracing
+from .admission import (
+    Overloaded, RAG_MAX_CONCURRENT, SQL_MAX_CONCURRENT,
+    admission_stats, client_limiter, rag_limiter, retry_after_header, sql_limiter,
+)
 from flask_cors import CORS
 
 
-app = Flask(__name__)
-api = Api(app)
-CORS(app)
+# The RAG answer and the SQL/graph pipeline run side by side on a bounded pool
+CHAT_MAX_WORKERS = int(os.getenv("CHAT_MAX_WORKERS", str(RAG_MAX_CONCURRENT + SQL_MAX_CONCURRENT)))
+RAG_TIMEOUT = float(os.getenv("RAG_TIMEOUT", "60"))
+SQL_TIMEOUT = float(os.getenv("SQL_TIMEOUT", "90"))
+# Longest budget a request gets; clients may ask for less with X-Request-Timeout
+CHAT_DEADLINE = float(os.getenv("CHAT_DEADLINE", str(max(RAG_TIMEOUT, SQL_TIMEOUT))))
+# Header naming the client for rate limiting (e.g. X-Client-Id or X-Real-IP). Only
+# set it when a gateway in front authenticates clients and overwrites the header;
+# otherwise every caller could pick a fresh id per request. Unset: the peer address.
+CLIENT_ID_HEADER = os.getenv("CLIENT_ID_HEADER", "")
+
+executor = ThreadPoolExecutor(max_workers=CHAT_MAX_WORKERS, thread_name_prefix="chat")
 
 parser = reqparse.RequestParser()
 parser.add_argument(
@@ -17,22 +44,320 @@ parser.add_argument(
     required=True,
     help="Question is required"
 )
+# Opt-in per-stage latency breakdown in the response body
+parser.add_argument("timings", type=inputs.boolean, default=False)
+
+
+def wait_for(future, deadline, name, errors, default=None):
+    """Wait for a branch until its deadline; record failures instead of raising."""
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeout:
+        future.cancel()
+        errors[name] = "timed out"
+    except Exception as e:
+        errors[name] = str(e)
+    return default
+
+
+def client_id() -> str:
+    if CLIENT_ID_HEADER:
+        trusted = request.headers.get(CLIENT_ID_HEADER)
+        if trusted:
+            return trusted
+    return request.remote_addr or "unknown"
+
+
+def request_budget() -> float:
+    """Seconds this request may take: the client's X-Request-Timeout, capped."""
+    try:
+        asked = float(request.headers.get("X-Request-Timeout", CHAT_DEADLINE))
+    except ValueError:
+        asked = CHAT_DEADLINE
+    return max(0.0, min(asked, CHAT_DEADLINE))
+
+
+def rate_limited():
+    """A 429 response when the client is over its rate, otherwise None."""
+    allowed, retry_after = client_limiter.allow(client_id())
+    if allowed:
+        return None
+    return {"message": "Too many requests"}, 429, retry_after_header(retry_after)
+
+
+def route_question(question, errors):
+    """Route the question, reusing its embedding downstream; on failure run both pipelines."""
+    try:
+        embedding = embed_query(question)
+        return router.route(question, embedding), embedding
+    except Exception as e:
+        errors["route"] = str(e)
+        return Route(BOTH, 0.0, "fallback"), None
+
+
+def submit_graph(question, errors, degraded):
+    """Start the SQL/graph branch, or skip it (answer without a chart) when saturated."""
+    try:
+        return sql_limiter.submit(executor, data_retriever, question)
+    except Overloaded as e:
+        errors["graph"] = f"skipped: {e}"
+        degraded.append("graph")
+        return None
+
 
 class Chat(Resource):
     def post(self):
         args = parser.parse_args()
         question = args["question"]
 
-        response = ask_question(question)
-        graph_summary,graph_img = data_retriever(question)
+        limited = rate_limited()
+        if limited:
+            return limited
+
+        with tracing.trace("chat") as trace, admission.deadline(request_budget()):
+            start = time.monotonic()
+            errors = {}
+            degraded = []
+            route, embedding = route_question(question, errors)
+
+            rag_future = None
+            if route.run_rag:
+                try:
+                    rag_future = rag_limiter.submit(executor, ask_question, question, embedding=embedding)
+                except Overloaded as e:
+                    return {"message": str(e)}, 503, retry_after_header(e.retry_after)
+            sql_future = submit_graph(question, errors, degraded) if route.run_sql else None
+
+            response = None
+            if rag_future is not None:
+                response = wait_for(rag_future, admission.deadline_at(start + RAG_TIMEOUT), "response", errors)
+            graph_summary, graph_url = None, None
+            if sql_future is not None:
+                graph_summary, graph_url = wait_for(
+                    sql_future, admission.deadline_at(start + SQL_TIMEOUT), "graph", errors, default=(None, None)
+                )
+
+            if not route.run_rag:
+                # Analytics only: the chart summary is the answer, unless the data had none
+                response = graph_summary
+                if not response:
+                    try:
+                        rag_future = rag_limiter.submit(executor, ask_question, question, embedding=embedding)
+                        response = wait_for(
+                            rag_future, admission.deadline_at(time.monotonic() + RAG_TIMEOUT), "response", errors
+                        )
+                    except Overloaded as e:
+                        errors["response"] = f"skipped: {e}"
+
+            body = {
+                "question": question,
+                "response": response,
+                "graph_summary": graph_summary,
+                "graph_url": graph_url,
+                "route": route.to_dict(),
+            }
+            if errors:
+                body["errors"] = errors
+            if degraded:
+                body["degraded"] = degraded
+            if args["timings"]:
+                body["timings"] = trace.timings()
+        return body, 200
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class ChatStream(Resource):
+    """Server-sent events: the route, sources, then answer tokens, then the graph payload."""
+
+    def post(self):
+        args = parser.parse_args()
+        question = args["question"]
+
+        limited = rate_limited()
+        if limited:
+            return limited
+
+        start = time.monotonic()
+        end = start + request_budget()
+        # The trace outlives this method: it is finished when the stream ends
+        trace = tracing.Trace("chat_stream")
+        errors = {}
+        degraded = []
+        with tracing.activate(trace), admission.deadline(end - time.monotonic()):
+            route, embedding = route_question(question, errors)
+
+        # The answer streams on this thread, so it holds its RAG slot until the end
+        if route.run_rag:
+            try:
+                rag_limiter.acquire()
+            except Overloaded as e:
+                trace.finish()
+                return {"message": str(e)}, 503, retry_after_header(e.retry_after)
+
+        with tracing.activate(trace), admission.deadline(end - time.monotonic()):
+            # The SQL/graph branch starts now and is collected after the answer
+            sql_future = submit_graph(question, errors, degraded) if route.run_sql else None
+
+        def answer_events():
+            try:
+                for event, data in stream_answer(question, embedding=embedding):
+                    yield sse(event, data)
+            except Exception as e:
+                errors["response"] = str(e)
+
+        def fallback_events():
+            # Like /chat: no chart summary, so answer from the documents after all
+            try:
+                rag_limiter.acquire()
+            except Overloaded as e:
+                errors["response"] = f"skipped: {e}"
+                yield sse("sources", [])
+                yield sse("token", NO_ANSWER)
+                return
+            held = time.monotonic()
+            try:
+                yield from answer_events()
+            finally:
+                rag_limiter.release(time.monotonic() - held)
+
+        def events():
+            with tracing.activate(trace), admission.deadline(end - time.monotonic()):
+                yield sse("route", route.to_dict())
+                if route.run_rag:
+                    yield from answer_events()
+
+                graph_summary, graph_url = None, None
+                if sql_future is not None:
+                    graph_summary, graph_url = wait_for(
+                        sql_future, admission.deadline_at(start + SQL_TIMEOUT), "graph", errors,
+                        default=(None, None),
+                    )
+                if not route.run_rag:
+                    if graph_summary:
+                        # Analytics only: the chart summary stands in for the streamed answer
+                        yield sse("sources", [])
+                        yield sse("token", graph_summary)
+                    else:
+                        yield from fallback_events()
+                yield sse("graph", {"graph_summary": graph_summary, "graph_url": graph_url})
+
+                done = {"errors": errors} if errors else {}
+                if degraded:
+                    done["degraded"] = degraded
+                timings = trace.finish()
+                if args["timings"]:
+                    done["timings"] = timings
+                yield sse("done", done)
+
+        response = Response(
+            stream_with_context(events()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        # Runs even if the client disconnects before the stream starts
+        if route.run_rag:
+            response.call_on_close(lambda: rag_limiter.release(time.monotonic() - start))
+        return response
+
+# Flipped by warm_up_worker(); /health/ready stays 503 until a warm-up has passed
+_warm = {"ready": False, "embedding_seconds": None, "db_seconds": None}
+
+
+def warm_up_worker():
+    """Run one embedding and one DB round-trip so the first real request is fast."""
+    _warm["embedding_seconds"] = warm_up()
+    _warm["db_seconds"] = ping()
+    _warm["ready"] = True
+    return dict(_warm)
+
+
+class Live(Resource):
+    def get(self):
+        return {"status": "ok"}, 200
+
+
+class Ready(Resource):
+    def get(self):
+        try:
+            if not _warm["ready"]:
+                # Retry a warm-up that failed at boot (e.g. the database came up late)
+                warm_up_worker()
+            db_seconds = ping()
+        except Exception as e:
+            return {"status": "not ready", "error": str(e)}, 503
+        return {
+            "status": "ready",
+            "db_seconds": db_seconds,
+            "warm_up": {k: v for k, v in _warm.items() if k != "ready"},
+        }, 200
+
+
+class Stats(Resource):
+    def get(self):
         return {
-            "question": question,
-            "response": response,
-            "graph_summary": graph_summary,
-            "graph_img": graph_img
+            "answer_cache": answer_cache.stats(),
+            "llm": llm_stats(),
+            "vectordb": registry_stats(),
+            "slow_requests": tracing.slow_requests(),
+            "admission": admission_stats(),
+            "router": router.stats(),
+            "charts": chart_store.stats(),
         }, 200
 
-api.add_resource(Chat, "/chat")
+
+class Chart(Resource):
+    """Rendered charts by content key; a key's body never changes, so clients may cache it forever."""
+
+    def get(self, name):
+        parsed = parse_name(name)
+        if parsed is None:
+            return {"message": "Chart not found"}, 404
+        key, fmt = parsed
+
+        headers = {
+            "ETag": f'"{key}"',
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "Vary": "Accept-Encoding",
+        }
+        # The key is the content hash: a client holding it has the current body
+        if key in request.if_none_match:
+            return Response(status=304, headers=headers)
+
+        stored = chart_store.get(key, fmt)
+        if stored is None:
+            return {"message": "Chart not found"}, 404
+        body, gzipped = stored
+        if gzipped is not None and request.accept_encodings["gzip"]:
+            body = gzipped
+            headers["Content-Encoding"] = "gzip"
+        return Response(body, mimetype=MIMETYPES[fmt], headers=headers)
+
+
+class Metrics(Resource):
+    """Prometheus text exposition of the per-stage and per-request histograms."""
+
+    def get(self):
+        return Response(tracing.render_metrics(), mimetype="text/plain; version=0.0.4")
+
+def create_app():
+    app = Flask(__name__)
+    api = Api(app)
+    CORS(app)
+
+    api.add_resource(Chat, "/chat")
+    api.add_resource(ChatStream, "/chat/stream")
+    api.add_resource(Chart, "/charts/<string:name>")
+    api.add_resource(Stats, "/stats")
+    api.add_resource(Metrics, "/metrics")
+    api.add_resource(Live, "/health/live")
+    api.add_resource(Ready, "/health/ready")
+    return app
+
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    # Development server; production runs wsgi.py under gunicorn.conf.py
+    print(f"🔥 Warmed up: {warm_up_worker()}")
+    create_app().run(debug=True)
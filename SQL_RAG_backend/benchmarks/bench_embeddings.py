@@ -0,0 +1,114 @@
+"""
+Parity and speed of the embedding backends against the PyTorch reference.
+
+For every backend it reports the cosine agreement with "torch" on the same
+texts (min / mean), single-query latency and batch throughput. It exits
+non-zero when a backend drops below its cosine floor, so it can gate a
+backend switch.
+
+    python -m SQL_RAG_backend.benchmarks.bench_embeddings --threads 4
+    python -m SQL_RAG_backend.benchmarks.bench_embeddings --backends torch onnx-int8 --texts chunks.txt
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from ..embedding_backends import BACKENDS, MIN_COSINE, make_embeddings, unit_vectors
+from ..vectordb import EMBEDDING_MODEL
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+QUESTIONS_PATH = os.path.join(BASE_DIR, "questions.jsonl")
+
+PASSAGES = [
+    "Tata Motors Limited is an Indian multinational automotive manufacturing company headquartered in Mumbai.",
+    "The company produces passenger cars, trucks, vans, coaches, buses, and military vehicles.",
+    "Jaguar Land Rover was acquired from Ford Motor Company in 2008 for 2.3 billion US dollars.",
+    "The Nano was marketed as the world's cheapest car when it was launched in 2009.",
+    "Manufacturing plants are located in Jamshedpur, Pune, Lucknow, Sanand, Dharwad and Pantnagar.",
+    "Revenue from commercial vehicles grew on the back of strong demand for medium and heavy trucks.",
+    "The board recommended a final dividend for the financial year subject to shareholder approval.",
+    "Electric vehicle sales crossed a new milestone as charging infrastructure expanded across cities.",
+    "Raw material costs, especially steel and aluminium prices, weighed on operating margins.",
+    "Tata Daewoo Commercial Vehicle Company in South Korea builds heavy trucks for export markets.",
+]
+
+
+def load_texts(path: str = None) -> list:
+    texts = list(PASSAGES)
+    with open(QUESTIONS_PATH, encoding="utf-8") as f:
+        texts += [json.loads(line)["question"] for line in f if line.strip()]
+    if path:
+        with open(path, encoding="utf-8") as f:
+            texts += [line.strip() for line in f if line.strip()]
+    return texts
+
+
+def measure(backend: str, texts: list, threads: int, batch_copies: int, repeat: int) -> dict:
+    start = time.perf_counter()
+    embeddings = make_embeddings(EMBEDDING_MODEL, backend, threads)
+    load_seconds = time.perf_counter() - start
+
+    # First call pays for lazy initialisation; keep it out of the numbers
+    embeddings.embed_query("warm up")
+
+    latencies = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            embeddings.embed_query(text)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    batch = texts * batch_copies
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(batch)[:len(texts)]
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "vectors": unit_vectors(vectors),
+        "load_seconds": round(load_seconds, 3),
+        "query_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "query_p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+        "batch_texts_per_s": round(len(batch) / batch_seconds, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backend parity and speed")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--threads", type=int, default=0, help="inference threads (0 = runtime default)")
+    parser.add_argument("--texts", default=None, help="extra texts, one per line")
+    parser.add_argument("--batch-copies", type=int, default=20, help="size of the batch run, in copies of the texts")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts)
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    print(f"🧪 {len(texts)} texts, model {EMBEDDING_MODEL}, threads={args.threads or 'default'}")
+
+    reference = None
+    failed = []
+    print(f"\n  {'backend':<11} {'cos min':>8} {'cos mean':>9} {'load s':>7} {'q p50 ms':>9} {'q p95 ms':>9} {'batch/s':>9}")
+    for backend in backends:
+        result = measure(backend, texts, args.threads, args.batch_copies, args.repeat)
+        vectors = result.pop("vectors")
+        if reference is None:
+            reference = vectors
+        cosine = np.sum(vectors * reference, axis=1)
+        ok = float(cosine.min()) >= MIN_COSINE[backend]
+        if not ok:
+            failed.append(backend)
+        print(
+            f"  {backend:<11} {cosine.min():>8.5f} {cosine.mean():>9.5f} {result['load_seconds']:>7} "
+            f"{result['query_p50_ms']:>9} {result['query_p95_ms']:>9} {result['batch_texts_per_s']:>9}"
+            + ("" if ok else f"   ❌ below {MIN_COSINE[backend]}")
+        )
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+"""
+End-to-end benchmark of the chat pipeline with local stand-ins.
+
+Replays benchmarks/questions.jsonl through the real retrieval, answer and
+SQL/graph code, with three substitutions so it runs offline:
+
+  * an in-memory vector store (exact cosine + keyword search) built from Pdfs/
+  * a scripted fake LLM with a fixed latency (provider "bench")
+  * SQLite loaded from SQL_DATA/*.csv plus synthetic SalesOrder rows
+
+It reports indexing throughput, retrieval recall@k, chat throughput and
+p50/p95/p99 per pipeline stage (taken from the request traces), and writes
+everything to a JSON file that a later run can be compared against.
+
+    python -m SQL_RAG_backend.benchmarks.bench_pipeline --llm-latency 0.2 --concurrency 4
+    python -m SQL_RAG_backend.benchmarks.bench_pipeline --compare results/bench-20260101-120000.json
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import numpy as np
+from langchain_core.documents import Document
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BASE_DIR, "..", "..")
+QUESTIONS_PATH = os.path.join(BASE_DIR, "questions.jsonl")
+RESULTS_DIR = os.path.join(BASE_DIR, "results")
+SQL_DATA_DIR = os.path.join(ROOT_DIR, "SQL_DATA")
+PDF_DIR = os.path.join(ROOT_DIR, "Pdfs")
+
+CSV_TABLES = {
+    "products.csv": "Products",
+    "customers.csv": "Customers",
+    "stateRegions.csv": "stateRegions",
+    "regions.csv": "Regions",
+    "budget.csv": "Budget",
+}
+SALES_COLUMNS = (
+    ("orderNumber", "TEXT PRIMARY KEY"),
+    ("orderDate", "DATE"),
+    ("customerNameIndex", "INTEGER"),
+    ("channel", "TEXT"),
+    ("currencyCode", "TEXT"),
+    ("warehouseCode", "TEXT"),
+    ("deliveryRegionIndex", "INTEGER"),
+    ("productDescriptionIndex", "INTEGER"),
+    ("orderQuantity", "INTEGER"),
+    ("unitPrice", "REAL"),
+    ("lineTotal", "REAL"),
+    ("totalUnitCost", "REAL"),
+)
+CHANNELS = ("Wholesale", "Distributor", "Export")
+WAREHOUSES = ("AXW291", "NXH382", "FLR025", "GUT930")
+
+STOPWORDS = {"the", "and", "for", "what", "which", "who", "when", "where", "why",
+             "how", "was", "are", "did", "does", "its", "with", "from", "that", "this"}
+
+
+def percentiles(values) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"n": 0}
+
+    def pick(p):
+        return round(values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))], 4)
+
+    return {
+        "n": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": pick(50),
+        "p95": pick(95),
+        "p99": pick(99),
+    }
+
+
+def load_questions(path: str = QUESTIONS_PATH) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ---------------------------------------------------------------- stand-ins
+
+def _terms(text: str) -> list:
+    return [t for t in re.findall(r"[a-z0-9]{3,}", text.lower()) if t not in STOPWORDS]
+
+
+class InMemoryStore:
+    """Exact cosine search plus keyword-overlap search over a list of chunks."""
+
+    def __init__(self, docs, vectors):
+        self.docs = docs
+        matrix = np.asarray(vectors, dtype=np.float32)
+        self.matrix = matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+        self.terms = [set(_terms(doc.page_content)) for doc in docs]
+
+    def _copy(self, i):
+        # The retriever writes scores into metadata
+        doc = self.docs[i]
+        return Document(page_content=doc.page_content, metadata=dict(doc.metadata))
+
+    def ann_search(self, embedding, k: int = 5, **kwargs):
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = self.matrix @ query
+        top = np.argsort(-scores)[:k]
+        return [(self._copy(i), float(1 - scores[i])) for i in top]
+
+    def text_search(self, query: str, k: int = 5, **kwargs):
+        terms = set(_terms(query))
+        scored = sorted(
+            ((len(terms & doc_terms), i) for i, doc_terms in enumerate(self.terms) if terms & doc_terms),
+            reverse=True,
+        )[:k]
+        return [(self._copy(i), float(score)) for score, i in scored]
+
+
+def make_scripted_llm(sql_by_question: dict, latency: float):
+    """
+    Fake chat model that can drive the SQL agent.
+
+    Agent prompts get an sql_db_query action with the question's reference
+    SQL, then a final answer built from the observation. Every other prompt
+    (RAG answer, chart spec, explanation) gets a canned answer.
+    """
+    from ..data_retrival_.LLMs import FakeChatModel
+
+    class ScriptedChatModel(FakeChatModel):
+        scripts: dict = {}
+
+        def _call(self, messages, stop=None, run_manager=None, **kwargs):
+            time.sleep(self.latency)
+            prompt = messages[-1].content if messages else ""
+            if "sql_db_query" not in prompt:
+                return self.responses[0]
+
+            for question in sorted(self.scripts, key=len, reverse=True):
+                if question not in prompt:
+                    continue
+                # The format instructions mention "Observation:" too; only the
+                # scratchpad after the question counts
+                scratchpad = prompt.rsplit(question, 1)[1]
+                if "Observation:" in scratchpad:
+                    observation = scratchpad.rsplit("Observation:", 1)[1].strip()[:300]
+                    return f"Thought: I now know the final answer\nFinal Answer: {observation}"
+                return (
+                    "Thought: I should query the database.\n"
+                    "Action: sql_db_query\n"
+                    f"Action Input: {self.scripts[question]}"
+                )
+            return "Thought: The database cannot answer this.\nFinal Answer: I don't know."
+
+    def factory():
+        return ScriptedChatModel(
+            responses=["Tata Motors is an Indian automotive manufacturer. This is a benchmark answer."],
+            latency=latency,
+            scripts=sql_by_question,
+        )
+
+    return factory
+
+
+def _value(raw: str):
+    for cast in (int, float):
+        try:
+            return cast(raw)
+        except ValueError:
+            pass
+    return raw
+
+
+def synthetic_sales(n: int, customers, regions, products, seed: int = 0):
+    """SalesOrder rows for 2014-2018 over the real dimension keys."""
+    rng = random.Random(seed)
+    start = date(2014, 1, 1)
+    days = (date(2018, 12, 31) - start).days
+    for i in range(n):
+        quantity = rng.randint(1, 12)
+        unit_price = round(rng.uniform(100, 6000), 2)
+        yield (
+            f"SO-{i:07d}",
+            (start + timedelta(days=rng.randint(0, days))).isoformat(),
+            rng.choice(customers),
+            rng.choice(CHANNELS),
+            "USD",
+            rng.choice(WAREHOUSES),
+            rng.choice(regions),
+            rng.choice(products),
+            quantity,
+            unit_price,
+            round(quantity * unit_price, 2),
+            round(unit_price * rng.uniform(0.4, 0.8), 3),
+        )
+
+
+def build_sqlite(sales_rows: int, data_dir: str = SQL_DATA_DIR, seed: int = 0):
+    """In-memory SQLite engine with the warehouse tables; returns (engine, row counts)."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    counts = {}
+    keys = {}
+    conn = engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        for filename, table in CSV_TABLES.items():
+            with open(os.path.join(data_dir, filename), newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                header = next(reader)
+                rows = [[_value(v) for v in row] for row in reader if row]
+            columns = ", ".join(f'"{c}"' for c in header)
+            cur.execute(f'CREATE TABLE "{table}" ({columns})')
+            cur.executemany(
+                f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(header))})', rows
+            )
+            counts[table] = len(rows)
+            keys[table] = [row[0] for row in rows]
+
+        columns = ", ".join(f'"{name}" {kind}' for name, kind in SALES_COLUMNS)
+        cur.execute(f"CREATE TABLE SalesOrder ({columns})")
+        cur.executemany(
+            f"INSERT INTO SalesOrder VALUES ({', '.join('?' * len(SALES_COLUMNS))})",
+            synthetic_sales(sales_rows, keys["Customers"], keys["Regions"], keys["Products"], seed),
+        )
+        counts["SalesOrder"] = sales_rows
+        conn.commit()
+    finally:
+        conn.close()
+    return engine, counts
+
+
+def load_corpus(pdf_dir: str = PDF_DIR) -> list:
+    """One Document per PDF page (text layer only; OCR is not benchmarked here)."""
+    import fitz
+
+    docs = []
+    for filename in sorted(os.listdir(pdf_dir)):
+        if not filename.lower().endswith(".pdf"):
+            continue
+        with fitz.open(os.path.join(pdf_dir, filename)) as pdf:
+            for page_index, page in enumerate(pdf):
+                text = page.get_text()
+                if text.strip():
+                    docs.append(Document(
+                        page_content=text,
+                        metadata={"source": filename, "page": page_index + 1, "type": "text"},
+                    ))
+    return docs
+
+
+# ---------------------------------------------------------------- stages
+
+def bench_indexing(docs: list, batch_size: int):
+    """Split + filter and encode the corpus; returns (store, chunks, stats)."""
+    from ..indexing_store_.data_splitter import iter_split_docs
+    from ..indexing_store_.embedding_pipeline import Encoder
+    from ..vectordb import get_embeddings
+
+    start = time.perf_counter()
+    get_embeddings()
+    load_seconds = time.perf_counter() - start
+
+    split_stats = {}
+    start = time.perf_counter()
+    chunks = list(iter_split_docs(docs, split_stats))
+    split_seconds = time.perf_counter() - start
+    if not chunks:
+        raise SystemExit("No chunks survived splitting; check the PDF directory")
+
+    encoder = Encoder(processes=0, batch_size=batch_size)
+    start = time.perf_counter()
+    vectors = encoder.encode([chunk.page_content for chunk in chunks])
+    embed_seconds = time.perf_counter() - start
+    encoder.close()
+
+    stats = {
+        "documents": len(docs),
+        "chunks": len(chunks),
+        "dropped_by": split_stats["dropped_by"],
+        "model_load_seconds": round(load_seconds, 3),
+        "split_seconds": round(split_seconds, 3),
+        "split_docs_per_s": round(len(docs) / split_seconds, 1) if split_seconds else None,
+        "embed_seconds": round(embed_seconds, 3),
+        "embed_chunks_per_s": round(len(chunks) / embed_seconds, 1) if embed_seconds else None,
+    }
+    return InMemoryStore(chunks, vectors), chunks, stats
+
+
+def _is_relevant(text: str, keywords) -> bool:
+    text = text.lower()
+    return any(keyword in text for keyword in keywords)
+
+
+def bench_retrieval(questions: list, chunks: list, k: int) -> dict:
+    """recall@k = relevant chunks in the top k / min(k, relevant chunks in the corpus)."""
+    from ..data_retrival_.retriever import embed_query, vector_search, hybrid_search
+
+    recalls = {"vector": [], "hybrid": []}
+    latency = {"vector": [], "hybrid": []}
+    skipped = []
+    for q in questions:
+        if q.get("type") != "rag":
+            continue
+        relevant = sum(1 for chunk in chunks if _is_relevant(chunk.page_content, q["keywords"]))
+        if not relevant:
+            skipped.append(q["id"])
+            continue
+
+        embedding = embed_query(q["question"])
+        for mode in recalls:
+            start = time.perf_counter()
+            if mode == "vector":
+                docs = vector_search(q["question"], k=k, threshold=0, embedding=embedding)
+            else:
+                docs, _ = hybrid_search(q["question"], k=k, threshold=0, embedding=embedding)
+            latency[mode].append(time.perf_counter() - start)
+            hits = sum(1 for doc in docs if _is_relevant(doc.page_content, q["keywords"]))
+            recalls[mode].append(hits / min(k, relevant))
+
+    return {
+        "k": k,
+        "questions": len(recalls["vector"]),
+        "skipped_no_relevant_chunks": skipped,
+        **{
+            mode: {
+                f"recall_at_{k}": round(sum(values) / len(values), 4) if values else None,
+                "latency": percentiles(latency[mode]),
+            }
+            for mode, values in recalls.items()
+        },
+    }
+
+
+def run_chat(question: str, executor):
+    """The routed pipelines side by side, as /chat runs them; returns (timings, errors)."""
+    from .. import tracing
+    from ..data_retrival_.query_router import router
+    from ..data_retrival_.retriever import embed_query
+    from ..data_retrival_.search import ask_question
+    from ..data_retrival_.sql_retrival import data_retriever
+
+    errors = {}
+    with tracing.trace("bench_chat") as trace:
+        embedding = embed_query(question)
+        route = router.route(question, embedding)
+        futures = {}
+        if route.run_rag:
+            futures["response"] = tracing.submit(executor, ask_question, question, embedding=embedding)
+        if route.run_sql:
+            futures["graph"] = tracing.submit(executor, data_retriever, question)
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                errors[name] = repr(e)
+        timings = trace.timings()
+    return timings, errors
+
+
+def clear_caches():
+    from ..data_retrival_.answer_cache import answer_cache
+    from ..data_retrival_.sql_retrival import sql_answer_cache
+    from ..database_config import data_config
+
+    answer_cache.invalidate()
+    sql_answer_cache.clear()
+    data_config().clear_cache()
+
+
+def bench_chat(questions: list, repeat: int, concurrency: int, warm: bool) -> dict:
+    stage_seconds = {}
+    errors = []
+    count = 0
+    wall = 0.0
+    inner = ThreadPoolExecutor(max_workers=2 * concurrency, thread_name_prefix="bench-chat")
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench-client") as clients:
+        for _ in range(repeat):
+            if not warm:
+                # Questions are distinct within a pass, so every one of them runs cold
+                clear_caches()
+            start = time.perf_counter()
+            futures = [clients.submit(run_chat, q["question"], inner) for q in questions]
+            for q, future in zip(questions, futures):
+                timings, failed = future.result()
+                count += 1
+                for stage, value in timings.items():
+                    seconds = value["seconds"] if isinstance(value, dict) else value
+                    stage_seconds.setdefault(stage, []).append(seconds)
+                if failed:
+                    errors.append({"id": q["id"], "errors": failed})
+            wall += time.perf_counter() - start
+    inner.shutdown()
+
+    return {
+        "requests": count,
+        "concurrency": concurrency,
+        "cold": not warm,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(count / wall, 2) if wall else None,
+        "stages": {stage: percentiles(values) for stage, values in sorted(stage_seconds.items())},
+        "errors": errors,
+    }
+
+
+# ---------------------------------------------------------------- reporting
+
+def print_report(results: dict, previous: dict = None):
+    indexing = results["indexing"]
+    print(f"\n📚 Indexing: {indexing['documents']} docs -> {indexing['chunks']} chunks")
+    print(f"   split {indexing['split_docs_per_s']} docs/s, embed {indexing['embed_chunks_per_s']} chunks/s")
+
+    retrieval = results["retrieval"]
+    key = f"recall_at_{retrieval['k']}"
+    print(f"\n🎯 Retrieval ({retrieval['questions']} questions)")
+    for mode in ("vector", "hybrid"):
+        print(f"   {mode:<7} {key}={retrieval[mode][key]}  p95={retrieval[mode]['latency'].get('p95')}s")
+
+    chat = results["chat"]
+    print(f"\n💬 Chat: {chat['requests']} requests, {chat['throughput_rps']} req/s, {len(chat['errors'])} with errors")
+    old_stages = (previous or {}).get("chat", {}).get("stages", {})
+    print(f"   {'stage':<40} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8}" + ("   Δp95" if previous else ""))
+    for stage, p in chat["stages"].items():
+        line = f"   {stage:<40} {p['n']:>5} {p['p50']:>8} {p['p95']:>8} {p['p99']:>8}"
+        old = old_stages.get(stage, {}).get("p95")
+        if previous and old:
+            line += f"   {(p['p95'] - old) / old * 100:+.0f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of indexing, retrieval and /chat")
+    parser.add_argument("--questions", default=QUESTIONS_PATH)
+    parser.add_argument("--pdf-dir", default=PDF_DIR)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--sales-rows", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--warm", action="store_true", help="keep answer/SQL caches between passes")
+    parser.add_argument("--out", default=None, help="JSON results path (default: results/bench-<time>.json)")
+    parser.add_argument("--compare", default=None, help="previous JSON results to diff p95 against")
+    args = parser.parse_args()
+
+    # The provider is picked when search.py is imported, and the answer cache
+    # must not probe Postgres for the collection version
+    os.environ["LLM_PROVIDER"] = "bench"
+    os.environ.setdefault("ANSWER_CACHE_VERSION_CHECK", "1e9")
+    # The rollups are Postgres tables; on SQLite every question goes to the agent
+    os.environ.setdefault("ROLLUPS_ENABLED", "0")
+
+    from .. import database_config
+    from ..data_retrival_ import LLMs, retriever
+
+    questions = load_questions(args.questions)
+    sql_by_question = {q["question"]: q["sql"] for q in questions if q.get("type") == "sql"}
+    LLMs.LLM_PROVIDER = "bench"
+    LLMs.register_provider("bench", make_scripted_llm(sql_by_question, args.llm_latency))
+
+    engine, table_rows = build_sqlite(args.sales_rows)
+    database_config._db = database_config.CachedSQLDatabase(engine)
+
+    store, chunks, indexing = bench_indexing(load_corpus(args.pdf_dir), args.batch_size)
+    retriever.ann_search = store.ann_search
+    retriever.text_search = store.text_search
+
+    results = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "questions": len(questions),
+            "k": args.k,
+            "repeat": args.repeat,
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+            "retrieval_mode": retriever.RETRIEVAL_MODE,
+            "tables": table_rows,
+        },
+        "indexing": indexing,
+        "retrieval": bench_retrieval(questions, chunks, args.k),
+        "chat": bench_chat(questions, args.repeat, args.concurrency, args.warm),
+        "llm": LLMs.llm_stats(),
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    print_report(results, previous)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"\n💾 Results saved to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Microbenchmark: text_filters.is_good_chunk / clean_text against the
+previous implementations on a synthetic corpus.
+
+    python -m SQL_RAG_backend.benchmarks.bench_text_filters --chunks 20000
+"""
+import argparse
+import random
+import re
+import time
+from ..indexing_store_.text_filters import is_good_chunk, clean_text, filter_chunks
+
+
+def legacy_is_good_chunk(text: str) -> bool:
+    words = text.split()
+    if len(words) < 20:
+        return False
+    short_lines = sum(
+        1 for line in text.splitlines()
+        if 1 <= len(line.split()) <= 3
+    )
+    if short_lines >= 5:
+        return False
+    if text.count(".") < 1:
+        return False
+    if any(
+        phrase in text.lower()
+        for phrase in ["scroll", "read more", "learn more", "explore", "click here"]
+    ):
+        return False
+    if text.count("{") > 5 or text.count("[") > 10:
+        return False
+    return True
+
+
+def legacy_clean_text(text: str) -> str:
+    lines = text.splitlines()
+    cleaned_lines = []
+    short_line_streak = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            short_line_streak = 0
+            continue
+        word_count = len(line.split())
+        if word_count <= 3:
+            short_line_streak += 1
+            if short_line_streak >= 2:
+                continue
+        else:
+            short_line_streak = 0
+        if line.istitle() and "." not in line and "," not in line:
+            continue
+        if re.fullmatch(r"(read more|learn more|explore|visit website)", line, re.I):
+            continue
+        if re.search(r"(copyright|©|all rights reserved|privacy|cookies|disclaimer)", line, re.I):
+            continue
+        cleaned_lines.append(line)
+    text = "\n".join(cleaned_lines)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = re.sub(r"[ \t]{2,}", " ", text)
+    text = re.sub(r"([a-z])([A-Z][a-z])", r"\1\n\n\2", text)
+    return text.strip()
+
+
+VOCAB = (
+    "tata motors vehicle electric mobility india commercial passenger revenue growth "
+    "safety design engine fleet customers sustainability plant production export "
+    "Nexon Harrier Safari Punch Tiago Altroz Jaguar Land Rover 2021 2022 2023 crore"
+).split()
+NOISE_LINES = [
+    "Home", "About Us", "Careers", "Read More", "Learn more", "Explore",
+    "Click here to continue", "Scroll down", "© 2024 Tata Motors. All rights reserved",
+    "Privacy Policy", "Cookies", "{ \"id\": 1, \"x\": [1, 2] }",
+    # Non-ASCII lines exercise the regex fallback (re.I folds ı→i, ſ→s)
+    "Prıvacy notice for the Nexon", "Read the cookieſ statement here",
+]
+
+
+def make_chunk(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(2, 12)):
+        if rng.random() < 0.25:
+            lines.append(rng.choice(NOISE_LINES))
+        else:
+            words = rng.choices(VOCAB, k=rng.randint(4, 25))
+            line = " ".join(words)
+            lines.append(line.capitalize() + rng.choice([".", ".", ",", ""]))
+        if rng.random() < 0.1:
+            lines.append("")
+    return "\n".join(lines)
+
+
+def best_of(fn, corpus, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_chunk(rng) for _ in range(args.chunks)]
+
+    # Same decisions and output as before, otherwise the timing means nothing
+    assert [is_good_chunk(t) for t in corpus] == [legacy_is_good_chunk(t) for t in corpus]
+    assert [clean_text(t) for t in corpus] == [legacy_clean_text(t) for t in corpus]
+
+    print(f"📦 {len(corpus)} synthetic chunks, best of {args.repeat}")
+    for name, new, old in (
+        ("is_good_chunk", is_good_chunk, legacy_is_good_chunk),
+        ("clean_text", clean_text, legacy_clean_text),
+    ):
+        new_s = best_of(new, corpus, args.repeat)
+        old_s = best_of(old, corpus, args.repeat)
+        print(f"  {name:<14} old {old_s * 1000:8.1f} ms   new {new_s * 1000:8.1f} ms   "
+              f"speed-up x{old_s / new_s:.2f}")
+
+    keep, report = filter_chunks(corpus)
+    print(f"🗑️  Drop report: kept {sum(keep)}/{len(corpus)} " +
+          ", ".join(f"{rule}={count}" for rule, count in report.most_common()))
+
+
+if __name__ == "__main__":
+    main()
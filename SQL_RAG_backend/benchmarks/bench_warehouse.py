@@ -0,0 +1,188 @@
+"""
+Latency of the SQL agent's typical query shapes against the Postgres warehouse.
+
+Each shape runs `--repeat` times straight against the database (no agent, no
+result cache); the report shows p50 / p95 and the plan nodes EXPLAIN chose, so
+a sequential scan on SalesOrder stands out. With `--scales` it tops SalesOrder
+up with synthetic rows between runs to show how latency grows with data size;
+`--without-indexes` repeats every run with the secondary indexes dropped.
+
+Both options write to the database, so they also need `--allow-writes` (use a
+scratch copy of the warehouse). The synthetic rows are deleted and the indexes
+and foreign keys rebuilt when the run ends, also when it fails or is
+interrupted; `--keep-rows` leaves the synthetic rows in place.
+
+    python -m SQL_RAG_backend.benchmarks.bench_warehouse
+    python -m SQL_RAG_backend.benchmarks.bench_warehouse --allow-writes --scales 1000000 10000000 --without-indexes
+"""
+import argparse
+import json
+import os
+import time
+from sqlalchemy import text
+from ..database_config import get_engine
+from ..warehouse_loader import (
+    create_indexes,
+    drop_secondary,
+    generate_sales,
+    remove_synthetic_sales,
+    synthetic_count,
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BASE_DIR, "results")
+
+# Shapes the agent writes most often for the sales questions
+QUERIES = {
+    "top_products": """
+        SELECT p.productName, SUM(s.lineTotal) AS revenue
+        FROM SalesOrder s JOIN Products p ON p.index = s.productDescriptionIndex
+        GROUP BY p.productName ORDER BY revenue DESC LIMIT 5""",
+    "monthly_revenue_year": """
+        SELECT date_trunc('month', orderDate) AS month, SUM(lineTotal) AS revenue
+        FROM SalesOrder
+        WHERE orderDate >= DATE '2018-01-01' AND orderDate < DATE '2019-01-01'
+        GROUP BY month ORDER BY month""",
+    "revenue_by_region": """
+        SELECT sr.region, SUM(s.lineTotal) AS revenue
+        FROM SalesOrder s
+        JOIN Regions r ON r.id = s.deliveryRegionIndex
+        JOIN stateRegions sr ON sr.stateCode = r.stateCode
+        GROUP BY sr.region ORDER BY revenue DESC""",
+    "top_customers": """
+        SELECT c.customerName, SUM(s.lineTotal) AS revenue
+        FROM SalesOrder s JOIN Customers c ON c.customerIndex = s.customerNameIndex
+        GROUP BY c.customerName ORDER BY revenue DESC LIMIT 10""",
+    "customer_orders": """
+        SELECT s.orderNumber, s.orderDate, s.lineTotal
+        FROM SalesOrder s JOIN Customers c ON c.customerIndex = s.customerNameIndex
+        WHERE c.customerName = (SELECT min(customerName) FROM Customers)
+        ORDER BY s.orderDate DESC LIMIT 50""",
+    "state_orders_week": """
+        SELECT r.name, COUNT(*) AS orders, SUM(s.lineTotal) AS revenue
+        FROM SalesOrder s JOIN Regions r ON r.id = s.deliveryRegionIndex
+        WHERE r.stateCode = 'CA' AND s.orderDate BETWEEN DATE '2019-03-01' AND DATE '2019-03-07'
+        GROUP BY r.name ORDER BY revenue DESC""",
+    "product_trend": """
+        SELECT date_trunc('quarter', orderDate) AS quarter, SUM(orderQuantity) AS quantity
+        FROM SalesOrder
+        WHERE productDescriptionIndex = (SELECT min(index) FROM Products)
+        GROUP BY quarter ORDER BY quarter""",
+    "budget_vs_actual": """
+        SELECT b.productName, b.budget, SUM(s.lineTotal) AS actual
+        FROM Budget b
+        JOIN Products p ON p.productName = b.productName
+        JOIN SalesOrder s ON s.productDescriptionIndex = p.index
+        WHERE s.orderDate >= DATE '2017-01-01' AND s.orderDate < DATE '2018-01-01'
+        GROUP BY b.productName, b.budget ORDER BY actual DESC""",
+}
+
+
+def sales_rows() -> int:
+    with get_engine().connect() as conn:
+        return conn.execute(text("SELECT count(*) FROM SalesOrder")).scalar()
+
+
+def _plan_nodes(plan: dict) -> list:
+    """Scan and join nodes of an EXPLAIN (FORMAT JSON) plan, e.g. 'Seq Scan salesorder'."""
+    node = plan["Node Type"]
+    if "Relation Name" in plan:
+        node += f" {plan['Relation Name']}"
+    nodes = [node] if ("Scan" in node or "Join" in node or "Loop" in node) else []
+    for child in plan.get("Plans", []):
+        nodes += _plan_nodes(child)
+    return nodes
+
+
+def run_query(conn, sql: str, repeat: int) -> dict:
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    conn.execute(text(sql)).fetchall()  # warm the buffer cache
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(text(sql)).fetchall()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+        "plan": _plan_nodes(plan[0]["Plan"]),
+    }
+
+
+def bench_queries(repeat: int, names: list) -> dict:
+    with get_engine().connect() as conn:
+        return {name: run_query(conn, QUERIES[name], repeat) for name in names}
+
+
+def print_report(label: str, results: dict):
+    print(f"\n📊 {label}")
+    print(f"  {'query':<22} {'p50 ms':>9} {'p95 ms':>9}  plan")
+    for name, result in results.items():
+        print(f"  {name:<22} {result['p50_ms']:>9} {result['p95_ms']:>9}  {', '.join(result['plan'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warehouse query latency vs data size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--queries", nargs="+", choices=list(QUERIES), default=list(QUERIES))
+    parser.add_argument("--scales", nargs="+", type=int, default=[],
+                        help="SalesOrder sizes to top up to with synthetic rows, ascending")
+    parser.add_argument("--without-indexes", action="store_true", help="also run each size with no secondary indexes")
+    parser.add_argument("--seed", type=float, default=0.42)
+    parser.add_argument("--out", default=None, help="write the results as JSON (default: results/warehouse-<time>.json)")
+    parser.add_argument("--allow-writes", action="store_true",
+                        help="allow --scales / --without-indexes to modify the database")
+    parser.add_argument("--keep-rows", action="store_true", help="keep the synthetic rows added by --scales")
+    args = parser.parse_args()
+    if (args.scales or args.without_indexes) and not args.allow_writes:
+        parser.error("--scales and --without-indexes modify the database; pass --allow-writes "
+                     "(against a scratch copy of the warehouse)")
+
+    runs = []
+    synthetic_before = synthetic_count() if args.scales else None
+    indexed = True
+    try:
+        for target in [None] + sorted(args.scales):
+            if target is not None:
+                missing = target - sales_rows()
+                if missing > 0:
+                    print(f"🧪 Topping SalesOrder up to {target:,} rows")
+                    indexed = False
+                    generate_sales(missing, seed=args.seed)
+                    create_indexes()
+                    indexed = True
+
+            rows = sales_rows()
+            results = bench_queries(args.repeat, args.queries)
+            print_report(f"{rows:,} sales rows, indexed", results)
+            runs.append({"rows": rows, "indexes": True, "queries": results})
+
+            if args.without_indexes:
+                with get_engine().begin() as conn:
+                    drop_secondary(conn)
+                    for table in ("SalesOrder", "Regions"):
+                        conn.execute(text(f"ANALYZE {table}"))
+                indexed = False
+                results = bench_queries(args.repeat, args.queries)
+                print_report(f"{rows:,} sales rows, no secondary indexes", results)
+                runs.append({"rows": rows, "indexes": False, "queries": results})
+                create_indexes()
+                indexed = True
+    finally:
+        if synthetic_before is not None and not args.keep_rows:
+            print(f"\n🧹 Removed {remove_synthetic_sales(keep=synthetic_before):,} synthetic rows")
+        if not indexed:
+            print(f"🗂️  Indexes and foreign keys restored in {create_indexes()}s")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"warehouse-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(runs, f, indent=2)
+    print(f"\n💾 Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,24 @@
 from langchain_ollama import ChatOllama
 from langchain_groq import ChatGroq
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any
+import asyncio
+import hashlib
 import os
+import random
+import threading
+import time
+from ..tracing import span
+from ..admission import check_deadline, remaining, DeadlineExceeded
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
 
 def ollama3_2_3bmodel():
     llm = ChatOllama(
@@ -25,4 +43,319 @@ def grokllm():
        max_tokens=2048,
        api_key = os.getenv("GROQ_API_KEY")
     )
-    return llm
\ No newline at end of file
+    return llm
+
+
+class FakeChatModel(FakeListChatModel):
+    """Local stand-in for tests and benchmarks: canned answers after a fixed delay."""
+
+    latency: float = 0.0
+
+    def _call(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return super()._call(*args, **kwargs)
+
+
+def fakellm():
+    return FakeChatModel(
+        responses=[os.getenv("FAKE_LLM_RESPONSE", "This is a fake answer.")],
+        latency=float(os.getenv("FAKE_LLM_LATENCY", "0")),
+    )
+
+
+PROVIDERS = {
+    "groq": grokllm,
+    "ollama-llama3.2": ollama3_2_3bmodel,
+    "ollama-phi3": ollamaph3_mini,
+    "fake": fakellm,
+}
+
+
+class LLMRuntime:
+    """Per-provider shared state: concurrency limit, in-flight calls and metrics."""
+
+    def __init__(self, max_concurrency: int):
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.metrics = {
+            "calls": 0,
+            "errors": 0,
+            "retries": 0,
+            "coalesced": 0,
+            "latency_seconds_total": 0.0,
+            "latency_seconds_max": 0.0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+        }
+
+    def count(self, name: str):
+        with self.lock:
+            self.metrics[name] += 1
+
+    def record(self, seconds: float, result=None, error: bool = False):
+        with self.lock:
+            self.metrics["calls"] += 1
+            self.metrics["errors"] += int(error)
+            self.metrics["latency_seconds_total"] += seconds
+            self.metrics["latency_seconds_max"] = max(self.metrics["latency_seconds_max"], seconds)
+            usage = _usage(result) if result is not None else None
+            if usage:
+                self.metrics["input_tokens"] += usage.get("input_tokens", 0)
+                self.metrics["output_tokens"] += usage.get("output_tokens", 0)
+
+
+class PooledChatModel(BaseChatModel):
+    """
+    Wraps a provider's chat model so every caller shares one client.
+
+    Adds a per-provider concurrency limit, exponential backoff on rate
+    limits and server errors, single-flight coalescing of identical
+    in-flight prompts, and latency/token metrics. Because it is a regular
+    chat model it also works inside the SQL agent.
+    """
+
+    inner: Any
+    provider: str
+    runtime: Any
+    max_retries: int = LLM_MAX_RETRIES
+    backoff_base: float = LLM_BACKOFF_BASE
+
+    @property
+    def _llm_type(self) -> str:
+        return f"pooled-{self.provider}"
+
+    def _key(self, messages, stop, kwargs) -> str:
+        h = hashlib.sha256()
+        for message in messages:
+            h.update(f"{message.type}\x1f{message.content}\x1e".encode("utf-8"))
+        h.update(repr((stop, sorted(kwargs.items()))).encode("utf-8"))
+        return h.hexdigest()
+
+    def _claim(self, key):
+        """Return (future, owner). Only the owner performs the call."""
+        with self.runtime.lock:
+            future = self.runtime.in_flight.get(key)
+            if future is not None:
+                self.runtime.metrics["coalesced"] += 1  # lock already held
+                return future, False
+            future = Future()
+            self.runtime.in_flight[key] = future
+            return future, True
+
+    def _settle(self, key, future, result=None, error=None):
+        with self.runtime.lock:
+            self.runtime.in_flight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _wait_coalesced(self, future):
+        try:
+            return future.result(timeout=remaining())
+        except FutureTimeout:
+            raise DeadlineExceeded("deadline exceeded waiting for a coalesced LLM call") from None
+
+    async def _await_coalesced(self, future):
+        # shield: a timed-out waiter must not cancel the owner's future
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("deadline exceeded waiting for a coalesced LLM call") from None
+
+    def _backoff(self, attempt: int, error) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return retry_after
+        return self.backoff_base * (2 ** attempt) + random.uniform(0, self.backoff_base)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        key = self._key(messages, stop, kwargs)
+        future, owner = self._claim(key)
+        if not owner:
+            with span("llm_coalesced"):
+                return self._wait_coalesced(future)
+
+        try:
+            # One span per call, so agent iterations show up as the call count
+            with span("llm"):
+                result = self._call_with_retries(messages, stop, **kwargs)
+        except Exception as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result=result)
+        return result
+
+    def _acquire_slot(self):
+        # Wait for a slot no longer than the request's remaining budget
+        check_deadline("llm call")
+        if not self.runtime.slots.acquire(timeout=remaining()):
+            raise DeadlineExceeded("deadline exceeded waiting for an LLM slot")
+
+    async def _aacquire_slot(self):
+        check_deadline("llm call")
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.runtime.slots.acquire, timeout=remaining()))
+        try:
+            acquired = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The thread is still waiting; give the slot back if it gets one
+            def release_late(done):
+                if not done.cancelled() and done.exception() is None and done.result():
+                    self.runtime.slots.release()
+
+            acquiring.add_done_callback(release_late)
+            raise
+        if not acquired:
+            raise DeadlineExceeded("deadline exceeded waiting for an LLM slot")
+
+    def _call_with_retries(self, messages, stop, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self._acquire_slot()
+            start = time.perf_counter()
+            try:
+                result = self.inner._generate(messages, stop=stop, **kwargs)
+            except Exception as e:
+                self.runtime.record(time.perf_counter() - start, error=True)
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                error = e
+            else:
+                self.runtime.record(time.perf_counter() - start, result)
+                return result
+            finally:
+                self.runtime.slots.release()
+            delay = self._backoff(attempt, error)
+            if delay >= remaining(float("inf")):
+                # The retry could not finish inside the client's budget
+                raise error
+            self.runtime.count("retries")
+            time.sleep(delay)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        key = self._key(messages, stop, kwargs)
+        future, owner = self._claim(key)
+        if not owner:
+            return await self._await_coalesced(future)
+
+        try:
+            result = await self._acall_with_retries(messages, stop, **kwargs)
+        except BaseException as e:
+            # Cancellation too, or coalesced waiters would wait on a call nobody makes
+            self._settle(key, future, error=e if isinstance(e, Exception) else RuntimeError("LLM call was cancelled"))
+            raise
+        self._settle(key, future, result=result)
+        return result
+
+    async def _acall_with_retries(self, messages, stop, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            await self._aacquire_slot()
+            start = time.perf_counter()
+            try:
+                result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+            except Exception as e:
+                self.runtime.record(time.perf_counter() - start, error=True)
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                error = e
+            else:
+                self.runtime.record(time.perf_counter() - start, result)
+                return result
+            finally:
+                self.runtime.slots.release()
+            delay = self._backoff(attempt, error)
+            if delay >= remaining(float("inf")):
+                raise error
+            self.runtime.count("retries")
+            await asyncio.sleep(delay)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        if type(self.inner)._stream is BaseChatModel._stream:
+            # Provider cannot stream: send the whole answer as one chunk
+            result = self._generate(messages, stop=stop, **kwargs)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=result.generations[0].message.content))
+            return
+
+        self._acquire_slot()
+        start = time.perf_counter()
+        try:
+            with span("llm"):
+                for chunk in self.inner._stream(messages, stop=stop, **kwargs):
+                    yield chunk
+        except Exception:
+            self.runtime.record(time.perf_counter() - start, error=True)
+            raise
+        finally:
+            self.runtime.slots.release()
+        self.runtime.record(time.perf_counter() - start)
+
+
+def _is_retryable(error) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    text = str(error).lower()
+    return "429" in text or "rate limit" in text
+
+
+def _retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _usage(result):
+    try:
+        return result.generations[0].message.usage_metadata
+    except (AttributeError, IndexError):
+        return None
+
+
+_clients = {}
+_runtimes = {}
+_clients_lock = threading.Lock()
+
+
+def register_provider(name: str, factory):
+    """Add or replace a provider (e.g. a local fake in tests)."""
+    with _clients_lock:
+        PROVIDERS[name] = factory
+        _clients.pop(name, None)
+        _runtimes.pop(name, None)
+
+
+def get_llm(provider: str = None) -> PooledChatModel:
+    """Shared, pooled chat model for a provider (LLM_PROVIDER by default)."""
+    provider = provider or LLM_PROVIDER
+    client = _clients.get(provider)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(provider)
+            if client is None:
+                runtime = _runtimes.setdefault(provider, LLMRuntime(LLM_MAX_CONCURRENCY))
+                client = PooledChatModel(
+                    inner=PROVIDERS[provider](),
+                    provider=provider,
+                    runtime=runtime,
+                )
+                _clients[provider] = client
+    return client
+
+
+def llm_stats() -> dict:
+    with _clients_lock:
+        runtimes = dict(_runtimes)
+    stats = {}
+    for name, runtime in runtimes.items():
+        with runtime.lock:
+            metrics = dict(runtime.metrics)
+        calls = metrics["calls"]
+        metrics["latency_seconds_avg"] = round(metrics["latency_seconds_total"] / calls, 3) if calls else 0.0
+        metrics["latency_seconds_total"] = round(metrics["latency_seconds_total"], 3)
+        metrics["latency_seconds_max"] = round(metrics["latency_seconds_max"], 3)
+        stats[name] = metrics
+    return stats
@@ -0,0 +1,131 @@
+import os
+import re
+import threading
+import time
+import numpy as np
+
+from ..cache import TTLCache, MISSING
+from ..embedding_backends import unit_vectors
+from ..vectordb import index_version
+from .context_builder import number_tokens
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+# Cosine similarity a new query needs to reuse a cached answer
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+# How often (seconds) to check whether the collection was rebuilt
+ANSWER_CACHE_VERSION_CHECK = float(os.getenv("ANSWER_CACHE_VERSION_CHECK", "30"))
+
+_spaces = re.compile(r"\s+")
+_trailing = re.compile(r"[\s?.!]+$")
+
+
+def normalize_query(query: str) -> str:
+    return _trailing.sub("", _spaces.sub(" ", query.strip().lower()))
+
+
+class SemanticAnswerCache:
+    """
+    Two-level answer cache for ask_question.
+
+    Level 1 is an exact match on the normalised query. Level 2 compares the
+    query embedding with the embeddings of cached questions and reuses an
+    answer when the cosine similarity reaches the cutoff and both questions
+    carry the same numbers ("sales in 2019" never reuses "sales in 2020").
+    """
+
+    def __init__(self, max_size=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL,
+                 similarity=ANSWER_CACHE_SIMILARITY):
+        self.similarity = similarity
+        self._entries = TTLCache(max_size=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._version = MISSING
+        self._checked_at = 0.0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._checked_at < ANSWER_CACHE_VERSION_CHECK:
+            return
+        self._checked_at = now
+        try:
+            version = index_version()
+        except Exception:
+            return
+        with self._lock:
+            if self._version is not MISSING and version != self._version:
+                self._entries.clear()
+                self.invalidations += 1
+            self._version = version
+
+    def get_exact(self, query: str):
+        """Level 1 only: the answer cached for this very question, or MISSING.
+
+        Lets callers skip embedding the query on a repeat; a miss here is not
+        counted, since the full lookup with get() follows.
+        """
+        self._check_version()
+        entry = self._entries.get(normalize_query(query))
+        if entry is MISSING:
+            return MISSING
+        self.exact_hits += 1
+        return entry[1]
+
+    def get(self, query: str, embedding=None):
+        """Return the cached answer or MISSING."""
+        self._check_version()
+        key = normalize_query(query)
+
+        entry = self._entries.get(key)
+        if entry is not MISSING:
+            self.exact_hits += 1
+            return entry[1]
+
+        if embedding is not None and self.similarity < 1.0:
+            query_vec = unit_vectors(embedding)
+            numbers = number_tokens(key)
+            entries = [
+                item for item in self._entries.items()
+                if item[1][0].shape == query_vec.shape and item[1][2] == numbers
+            ]
+            if entries:
+                matrix = np.stack([vec for _, (vec, _, _) in entries])
+                scores = matrix @ query_vec
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity:
+                    self._entries.touch(entries[best][0])
+                    self.semantic_hits += 1
+                    return entries[best][1][1]
+
+        self.misses += 1
+        return MISSING
+
+    def set(self, query: str, answer, embedding=None):
+        vec = unit_vectors(embedding) if embedding is not None else None
+        if vec is None:
+            # Entries without an embedding still serve exact matches
+            vec = np.zeros(0, dtype=np.float32)
+        key = normalize_query(query)
+        self._entries.set(key, (vec, answer, number_tokens(key)))
+
+    def invalidate(self):
+        self._entries.clear()
+        self.invalidations += 1
+
+    def stats(self):
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self._entries.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+answer_cache = SemanticAnswerCache()
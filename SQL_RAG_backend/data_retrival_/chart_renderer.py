@@ -0,0 +1,128 @@
+import io
+import os
+import math
+from matplotlib.figure import Figure
+
+CHART_DPI = int(os.getenv("CHART_DPI", "100"))
+CHART_FORMAT = os.getenv("CHART_FORMAT", "png")
+CHART_TYPES = ("bar", "barh", "line", "pie")
+MAX_POINTS = 50
+# Line and bar charts may carry several named series over the same labels
+MAX_SERIES = 8
+
+
+def validate_spec(spec):
+    """
+    Return a clean chart spec or None.
+
+    A spec is a dict: type, title, xlabel, ylabel, labels, values, or
+    instead of values a list of series: [{"name": ..., "values": [...]}].
+    """
+    if not isinstance(spec, dict) or spec.get("type") not in CHART_TYPES:
+        return None
+
+    if spec.get("series"):
+        return _validate_series(spec)
+
+    labels = spec.get("labels") or []
+    values = spec.get("values") or []
+    if len(labels) != len(values) or len(labels) < 2:
+        return None
+
+    try:
+        values = [float(v) for v in values]
+    except (TypeError, ValueError):
+        return None
+    if not all(math.isfinite(v) for v in values):
+        return None
+
+    chart_type = spec["type"]
+    if chart_type == "pie" and any(v < 0 for v in values):
+        chart_type = "bar"
+
+    return {
+        "type": chart_type,
+        "title": str(spec.get("title") or ""),
+        "xlabel": str(spec.get("xlabel") or ""),
+        "ylabel": str(spec.get("ylabel") or ""),
+        "labels": [str(label) for label in labels][:MAX_POINTS],
+        "values": values[:MAX_POINTS],
+    }
+
+
+def _validate_series(spec):
+    labels = spec.get("labels") or []
+    if len(labels) < 2:
+        return None
+
+    series = []
+    for item in spec["series"][:MAX_SERIES]:
+        try:
+            values = [float(v) for v in item.get("values") or []]
+        except (AttributeError, TypeError, ValueError):
+            return None
+        if len(values) != len(labels) or not all(math.isfinite(v) for v in values):
+            return None
+        series.append({"name": str(item.get("name") or ""), "values": values[:MAX_POINTS]})
+
+    return {
+        "type": spec["type"] if spec["type"] in ("line", "bar") else "line",
+        "title": str(spec.get("title") or ""),
+        "xlabel": str(spec.get("xlabel") or ""),
+        "ylabel": str(spec.get("ylabel") or ""),
+        "labels": [str(label) for label in labels][:MAX_POINTS],
+        "series": series,
+    }
+
+
+def render_chart(spec: dict, fmt: str = CHART_FORMAT, dpi: int = CHART_DPI) -> bytes:
+    """
+    Draw a validated spec with the object-oriented Figure API.
+
+    No pyplot state is touched, so charts can be rendered from several
+    threads at once. fmt is any matplotlib format: png, svg, webp...
+    """
+    labels, values = spec["labels"], spec.get("values")
+
+    fig = Figure(figsize=(8, 4.5))
+    ax = fig.add_subplot()
+
+    if spec.get("series"):
+        series = spec["series"]
+        if spec["type"] == "bar":
+            width = 0.8 / len(series)
+            for i, item in enumerate(series):
+                positions = [x + (i - (len(series) - 1) / 2) * width for x in range(len(labels))]
+                ax.bar(positions, item["values"], width=width, label=item["name"])
+            ax.set_xticks(range(len(labels)), labels)
+        else:
+            for item in series:
+                ax.plot(labels, item["values"], marker="o", label=item["name"])
+        ax.tick_params(axis="x", labelrotation=45 if len(labels) > 8 else 0)
+        ax.legend(fontsize="small")
+    elif spec["type"] == "bar":
+        ax.bar(labels, values, color="#1f77b4")
+        ax.tick_params(axis="x", labelrotation=45 if len(labels) > 5 else 0)
+    elif spec["type"] == "barh":
+        ax.barh(labels[::-1], values[::-1], color="#1f77b4")
+    elif spec["type"] == "line":
+        ax.plot(labels, values, marker="o", color="#1f77b4")
+        ax.tick_params(axis="x", labelrotation=45 if len(labels) > 8 else 0)
+    else:
+        ax.pie(values, labels=labels, autopct="%1.1f%%", startangle=90)
+        ax.axis("equal")
+
+    if spec["type"] != "pie":
+        xlabel, ylabel = spec["xlabel"], spec["ylabel"]
+        if spec["type"] == "barh":
+            xlabel, ylabel = ylabel, xlabel
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        ax.grid(axis="x" if spec["type"] == "barh" else "y", alpha=0.3)
+
+    ax.set_title(spec["title"])
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi)
+    return buf.getvalue()
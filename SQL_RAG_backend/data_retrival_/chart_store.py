@@ -0,0 +1,230 @@
+"""
+Content-addressed store for rendered charts.
+
+A chart's key is a hash of its validated spec plus format and DPI, so an
+identical chart is rendered once and then served from the store; the API
+returns /charts/<key>.<fmt> instead of inline base64. Bodies never change
+for a key, which lets the endpoint send an ETag and immutable caching headers.
+
+CHART_STORE=disk (the default) keeps charts under CHART_STORE_DIR, shared by
+all gunicorn workers on the host; CHART_STORE=memory keeps an LRU per
+process, which only suits a single worker. SVG is also stored gzipped.
+
+The disk store is capped at CHART_STORE_MAX_BYTES: serving a chart bumps its
+mtime, and a periodic sweep deletes the least recently served charts until
+the store is back under the cap.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import weakref
+from ..cache import TTLCache, MISSING
+from .chart_renderer import render_chart, CHART_DPI, CHART_FORMAT
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CHART_STORE = os.getenv("CHART_STORE", "disk")
+CHART_STORE_DIR = os.getenv("CHART_STORE_DIR", os.path.join(BASE_DIR, "..", ".chart_cache"))
+CHART_STORE_SIZE = int(os.getenv("CHART_STORE_SIZE", "512"))
+# Disk store cap (bytes) and how often (seconds) a worker checks it
+CHART_STORE_MAX_BYTES = int(os.getenv("CHART_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+CHART_STORE_SWEEP_INTERVAL = float(os.getenv("CHART_STORE_SWEEP_INTERVAL", "300"))
+# Prefix of the URLs handed to clients (e.g. behind a path-based proxy)
+CHART_URL_PREFIX = os.getenv("CHART_URL_PREFIX", "/charts")
+
+MIMETYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "webp": "image/webp",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+}
+# Formats worth compressing; PNG/WebP/JPEG are compressed already
+GZIP_FORMATS = ("svg",)
+_name = re.compile(r"^([0-9a-f]{32})\.([a-z]+)$")
+
+
+def chart_key(spec: dict, fmt: str = CHART_FORMAT, dpi: int = CHART_DPI) -> str:
+    payload = json.dumps({"spec": spec, "fmt": fmt, "dpi": dpi}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def parse_name(name: str):
+    """(key, fmt) from a '<key>.<fmt>' URL segment, or None if it is not one."""
+    match = _name.match(name)
+    if not match or match.group(2) not in MIMETYPES:
+        return None
+    return match.group(1), match.group(2)
+
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, max_size: int = CHART_STORE_SIZE):
+        self._items = TTLCache(max_size=max_size)
+
+    def get(self, key: str, fmt: str):
+        item = self._items.get((key, fmt))
+        return None if item is MISSING else item
+
+    def put(self, key: str, fmt: str, body: bytes, gzipped: bytes = None):
+        self._items.set((key, fmt), (body, gzipped))
+
+
+class DiskBackend:
+    name = "disk"
+
+    def __init__(self, root: str = CHART_STORE_DIR, max_bytes: int = CHART_STORE_MAX_BYTES,
+                 sweep_interval: float = CHART_STORE_SWEEP_INTERVAL):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._sweep_lock = threading.Lock()
+        self._next_sweep = 0.0
+        self.evicted = 0
+
+    def _path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.{fmt}")
+
+    def get(self, key: str, fmt: str):
+        path = self._path(key, fmt)
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # recency for the sweep
+        except OSError:
+            pass
+        gzipped = None
+        if fmt in GZIP_FORMATS:
+            try:
+                with open(f"{path}.gz", "rb") as f:
+                    gzipped = f.read()
+            except FileNotFoundError:
+                pass
+        return body, gzipped
+
+    def put(self, key: str, fmt: str, body: bytes, gzipped: bytes = None):
+        path = self._path(key, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # The gzip copy lands first, so a visible body always has its gzip twin
+        for target, data in ((f"{path}.gz", gzipped), (path, body)):
+            if data is None:
+                continue
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        if time.monotonic() >= self._next_sweep:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Delete the least recently served charts until the store is under 90% of max_bytes."""
+        if not self._sweep_lock.acquire(blocking=False):
+            return 0
+        try:
+            self._next_sweep = time.monotonic() + self.sweep_interval
+            charts, total, now = [], 0, time.time()
+            for directory, _, files in os.walk(self.root):
+                for filename in files:
+                    path = os.path.join(directory, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if filename.endswith(".tmp"):
+                        # Left behind by a worker that died mid-write
+                        if now - stat.st_mtime > 3600:
+                            _unlink(path)
+                        continue
+                    if filename.endswith(".gz") and not os.path.exists(path[:-3]):
+                        # Twin of a body removed by an interrupted sweep
+                        if now - stat.st_mtime > 3600:
+                            _unlink(path)
+                            continue
+                    total += stat.st_size
+                    if not filename.endswith(".gz"):
+                        gz_size = 0
+                        if os.path.exists(f"{path}.gz"):
+                            gz_size = os.path.getsize(f"{path}.gz")
+                        charts.append((stat.st_mtime, path, stat.st_size + gz_size))
+
+            evicted = 0
+            if total > self.max_bytes:
+                target = self.max_bytes * 0.9
+                for _, path, size in sorted(charts):
+                    if total <= target:
+                        break
+                    # Body first: a visible body always has its gzip twin
+                    _unlink(path)
+                    _unlink(f"{path}.gz")
+                    total -= size
+                    evicted += 1
+                self.evicted += evicted
+                print(f"🧹 Chart store: evicted {evicted} charts ({total / 1e6:.1f} MB left)")
+            return evicted
+        finally:
+            self._sweep_lock.release()
+
+
+def _unlink(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ChartStore:
+    """Render-once chart storage with per-key locking, so concurrent requests for one chart render it once."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._locks = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "renders": 0}
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def put(self, spec: dict, fmt: str = CHART_FORMAT, dpi: int = CHART_DPI) -> str:
+        """Key of the rendered chart, rendering it only if the store doesn't have it."""
+        key = chart_key(spec, fmt, dpi)
+        with self._key_lock(key):
+            if self.backend.get(key, fmt) is not None:
+                with self._lock:
+                    self._stats["hits"] += 1
+                return key
+            body = render_chart(spec, fmt=fmt, dpi=dpi)
+            gzipped = gzip.compress(body, compresslevel=6) if fmt in GZIP_FORMATS else None
+            self.backend.put(key, fmt, body, gzipped)
+            with self._lock:
+                self._stats["renders"] += 1
+        return key
+
+    def get(self, key: str, fmt: str):
+        """(body, gzipped body or None), or None when the chart is not stored."""
+        return self.backend.get(key, fmt)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {"backend": self.backend.name, **self._stats}
+        if hasattr(self.backend, "evicted"):
+            stats["evicted"] = self.backend.evicted
+        return stats
+
+
+chart_store = ChartStore(MemoryBackend() if CHART_STORE == "memory" else DiskBackend())
+
+
+def chart_url(key: str, fmt: str = CHART_FORMAT) -> str:
+    return f"{CHART_URL_PREFIX}/{key}.{fmt}"
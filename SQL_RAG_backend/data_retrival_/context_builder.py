@@ -0,0 +1,237 @@
+"""
+Token-budgeted prompt context for the RAG answer.
+
+Retrieved chunks overlap (the splitter keeps 100 characters of overlap) and
+neighbouring hits often repeat each other. Before the context reaches the LLM:
+
+1. chunks cut from the same source document that touch or overlap (by
+   start_index) are merged back into one passage,
+2. sentences that nearly repeat a sentence already kept are removed, unless
+   their figures differ ("grew 12% in 2019" vs "grew 15% in 2020"),
+3. passages are ordered by MMR, balancing retrieval rank against word
+   overlap with passages already chosen,
+4. passages are packed until the token budget is used up, trimming the last
+   one at a sentence boundary instead of mid-word.
+
+Tokens are counted with tiktoken when it is available, with a characters/4
+estimate otherwise.
+"""
+import os
+import re
+import threading
+from langchain_core.documents import Document
+
+# Prompt tokens available for retrieved context
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "cl100k_base")
+# MMR trade-off: 1.0 ranks by relevance only, 0.0 by novelty only
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+# Word-set Jaccard similarity at which a sentence counts as a repeat
+CONTEXT_DUPLICATE_SIMILARITY = float(os.getenv("CONTEXT_DUPLICATE_SIMILARITY", "0.8"))
+# Shorter sentences ("Revenue grew.") are never treated as repeats
+MIN_DEDUP_WORDS = 5
+# Don't pack a trimmed passage smaller than this
+MIN_PASSAGE_TOKENS = 40
+
+_sentence_end = re.compile(r"(?<=[.!?])\s+(?=\S)")
+_boundary = re.compile(r"[.!?](?=\s)|\n\n")
+_word = re.compile(r"\w+")
+_number = re.compile(r"\d+(?:[.,]\d+)*%?")
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """tiktoken encoding, or False when tiktoken (or its BPE file) is unavailable."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+
+                    _encoding = tiktoken.get_encoding(CONTEXT_TOKENIZER)
+                except Exception as e:
+                    print(f"⚠️ tiktoken unavailable ({e}); estimating tokens from characters")
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Longest prefix of text within budget that ends on a sentence or paragraph boundary."""
+    if count_tokens(text) <= budget:
+        return text
+
+    ends = [m.end() for m in _boundary.finditer(text)]
+    low, high, best = 0, len(ends) - 1, None
+    while low <= high:
+        mid = (low + high) // 2
+        if count_tokens(text[:ends[mid]]) <= budget:
+            best, low = ends[mid], mid + 1
+        else:
+            high = mid - 1
+    if best is not None:
+        return text[:best].rstrip()
+
+    # Not even one sentence fits: cut on tokens
+    encoding = _get_encoding()
+    if encoding:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:budget])
+    return text[:budget * 4]
+
+
+def _words(text: str) -> frozenset:
+    return frozenset(w.lower() for w in _word.findall(text))
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _document_key(doc) -> tuple:
+    meta = doc.metadata
+    return meta.get("source"), meta.get("page"), meta.get("section"), meta.get("type")
+
+
+def merge_overlapping(docs: list) -> list:
+    """
+    Merge chunks of the same source document that touch or overlap.
+
+    docs are in retrieval order; a merged passage takes the position of its
+    best-ranked chunk. Chunks without start_index are kept as they are.
+    """
+    groups = {}
+    for rank, doc in enumerate(docs):
+        start = doc.metadata.get("start_index")
+        key = _document_key(doc) if isinstance(start, int) else ("rank", rank)
+        groups.setdefault(key, []).append((rank, doc))
+
+    passages = []
+    for key, members in groups.items():
+        if key[0] == "rank":
+            passages.append(members[0])
+            continue
+
+        members.sort(key=lambda item: item[1].metadata["start_index"])
+        rank, first = members[0]
+        text, start = first.page_content, first.metadata["start_index"]
+        metadata = dict(first.metadata)
+        for other_rank, doc in members[1:]:
+            other_start = doc.metadata["start_index"]
+            end = start + len(text)
+            if other_start > end + 1:
+                passages.append((rank, Document(page_content=text, metadata=metadata)))
+                rank, text, start, metadata = other_rank, doc.page_content, other_start, dict(doc.metadata)
+                continue
+
+            overlap = end - other_start
+            if overlap >= len(doc.page_content):
+                pass  # fully contained
+            elif overlap > 0 and text.endswith(doc.page_content[:overlap]):
+                text += doc.page_content[overlap:]
+            else:
+                text = f"{text} {doc.page_content}"
+            rank = min(rank, other_rank)
+            if doc.metadata.get("similarity_score", 0) > metadata.get("similarity_score", 0):
+                metadata["similarity_score"] = doc.metadata["similarity_score"]
+        passages.append((rank, Document(page_content=text, metadata=metadata)))
+
+    passages.sort(key=lambda item: item[0])
+    return [doc for _, doc in passages]
+
+
+def number_tokens(text: str) -> tuple:
+    """The figures in text, in order ("12%", "2,019.5"), for "same facts" checks."""
+    return tuple(_number.findall(text))
+
+
+def drop_repeated_sentences(docs: list, similarity: float = CONTEXT_DUPLICATE_SIMILARITY) -> list:
+    """
+    Remove sentences that nearly repeat one kept earlier (in retrieval order).
+
+    Only sentences with the same figures in the same order are compared, so
+    two facts that differ by a number or year are both kept.
+    """
+    seen = []
+    kept_docs = []
+    for doc in docs:
+        kept = []
+        for sentence in _sentence_end.split(doc.page_content.strip()):
+            words = _words(sentence)
+            if len(words) >= MIN_DEDUP_WORDS:
+                numbers = number_tokens(sentence)
+                if any(n == numbers and _jaccard(words, other) >= similarity for other, n in seen):
+                    continue
+                seen.append((words, numbers))
+            kept.append(sentence)
+        if kept:
+            kept_docs.append(Document(page_content=" ".join(kept), metadata=doc.metadata))
+    return kept_docs
+
+
+def mmr_order(docs: list, lambda_: float = CONTEXT_MMR_LAMBDA) -> list:
+    """
+    Reorder passages by maximal marginal relevance.
+
+    Relevance comes from the retrieval rank (the fused hybrid ranking has no
+    common score scale); redundancy is the highest word-set Jaccard with an
+    already selected passage.
+    """
+    n = len(docs)
+    words = [_words(doc.page_content) for doc in docs]
+    remaining = list(range(n))
+    selected = []
+    while remaining:
+        best = max(
+            remaining,
+            key=lambda i: lambda_ * (1 - i / n)
+            - (1 - lambda_) * max((_jaccard(words[i], words[j]) for j in selected), default=0.0),
+        )
+        selected.append(best)
+        remaining.remove(best)
+    return [docs[i] for i in selected]
+
+
+def header(doc) -> str:
+    meta = doc.metadata
+    parts = [str(meta.get("source", "Unknown"))]
+    if meta.get("section"):
+        parts.append(str(meta["section"]))
+    if meta.get("page") is not None:
+        parts.append(f"p. {meta['page']}")
+    return f"[{' | '.join(parts)}]"
+
+
+def pack(docs: list, token_budget: int = CONTEXT_TOKEN_BUDGET) -> list:
+    """Passages (header + text) that fit the token budget, in order."""
+    parts = []
+    remaining = token_budget
+    for doc in docs:
+        part = f"{header(doc)}\n{doc.page_content}"
+        tokens = count_tokens(part) + 1  # blank line separator
+        if tokens > remaining:
+            if remaining < MIN_PASSAGE_TOKENS:
+                break
+            part = truncate_to_tokens(part, remaining - 1)
+            if count_tokens(part) < MIN_PASSAGE_TOKENS or "\n" not in part:
+                continue
+            tokens = count_tokens(part) + 1
+        parts.append(part)
+        remaining -= tokens
+    return parts
+
+
+def build_context(results: list, token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """Merge, de-duplicate, diversify and pack retrieved documents into one context."""
+    docs = drop_repeated_sentences(merge_overlapping(results))
+    return "\n\n".join(pack(mmr_order(docs), token_budget))
@@ -1,13 +1,25 @@
 from langchain_core.prompts import PromptTemplate
 from langchain_core.messages import HumanMessage
 import re
-import io
-import base64
-import matplotlib
-matplotlib.use("Agg") 
-import matplotlib.pyplot as plt
+import json
+import datetime
+from decimal import Decimal
+from .chart_renderer import validate_spec, CHART_FORMAT, CHART_DPI
+from .chart_store import chart_store, chart_url
+from ..tracing import traced
+
+DATE_HINTS = ("date", "month", "year", "week", "day", "quarter", "period")
+
 
 class GraphGenerator:
+    """
+    Builds a compact chart spec and renders it.
+
+    The spec comes straight from the SQL result rows when they have a
+    label column and a numeric column; the LLM is only asked for a spec
+    when the rows cannot be used.
+    """
+
     def __init__(self, llm):
         self.llm = llm
         self.prompt_template = PromptTemplate(
@@ -15,54 +27,19 @@ class GraphGenerator:
             template=("""
 You are a data-visualization assistant.
 
-Input is natural-language SQL agent output. Extract label–value pairs and generate Python code to visualize them.
-
-TASKS
-1) Parse text → extract names + numeric values
-2) Normalize numbers (remove $, %, commas → float)
-3) Identify meaningful relationships
-4) Output Python plotting code
-
-EXTRACT
-- names / categories / labels
-- numeric amounts / totals / sales / values
-Ignore rankings (1., 2., 3.) and commentary.
-
-If no numeric values → reply:
-"No meaningful numeric relationship detected."
+Input is natural-language SQL agent output. Extract label–value pairs for one chart.
 
-VISUALIZATION
-You may use:
-- matplotlib
-- seaborn
-- subplots (when useful)
-
-Choose chart type by data meaning:
-- categorical vs numeric → bar
-- rankings → horizontal bar
-- proportions → pie / donut
-- trends → line
-- distributions → hist / kde
-- correlation → scatter
-
-Prefer seaborn when clearer. Avoid redundant charts.
-
-STYLE
-- import seaborn as sns
-- include title, axis labels, legend (if needed)
+RULES
+- Normalize numbers (remove $, %, commas → float)
+- Ignore rankings (1., 2., 3.) and commentary
+- Choose type by data meaning: categorical vs numeric → "bar", rankings → "barh",
+  proportions → "pie", trends over time → "line"
 
 OUTPUT FORMAT
-Return ONLY Python code containing a title:
-
-```python
-labels = [...]
-values = [...]
+Return ONLY one JSON object, no code, no prose:
+{"type": "...", "title": "...", "xlabel": "...", "ylabel": "...", "labels": [...], "values": [...]}
 
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# plotting code here
-plt.show()
+If there are no numeric values, return: {"type": "none"}
 
 INPUT
 {{ sqlAnswer }}
@@ -71,7 +48,48 @@ INPUT
             template_format="jinja2"
         )
 
-    def generate_graph(self, sqlAnswer: str) -> str:
+    @staticmethod
+    def spec_from_rows(columns, rows, title: str = None):
+        """Chart spec from SQL rows: first text/date column vs last numeric column."""
+        if not columns or len(rows) < 2:
+            return None
+
+        def is_number(value):
+            return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+        numeric = [i for i in range(len(columns)) if all(is_number(r[i]) for r in rows)]
+        label_cols = [i for i in range(len(columns)) if i not in numeric]
+        if not numeric or not label_cols:
+            return None
+
+        label_i, value_i = label_cols[0], numeric[-1]
+        label_name, value_name = columns[label_i], columns[value_i]
+
+        # Only real dates are re-sorted (dates and datetimes don't compare with
+        # each other); otherwise the agent's ORDER BY is kept as it is
+        label_types = {type(r[label_i]) for r in rows}
+        is_dates = len(label_types) == 1 and label_types <= {datetime.date, datetime.datetime}
+        if is_dates:
+            rows = sorted(rows, key=lambda r: r[label_i])
+        if is_dates or any(hint in label_name.lower() for hint in DATE_HINTS):
+            chart_type = "line"
+        elif len(rows) > 8:
+            chart_type = "barh"
+        else:
+            chart_type = "bar"
+
+        return validate_spec({
+            "type": chart_type,
+            "title": title or f"{_pretty(value_name)} by {_pretty(label_name)}",
+            "xlabel": _pretty(label_name),
+            "ylabel": _pretty(value_name),
+            "labels": [r[label_i] for r in rows],
+            "values": [r[value_i] for r in rows],
+        })
+
+    @traced("chart_spec")
+    def generate_spec(self, sqlAnswer) -> dict:
+        """Fallback: ask the LLM for a chart spec (JSON) instead of plotting code."""
         prompt = self.prompt_template.format(
             sqlAnswer=sqlAnswer
         )
@@ -79,34 +97,30 @@ INPUT
         try:
             messages = [HumanMessage(content=prompt)]
             response = self.llm.invoke(messages)
-            return response.content.strip()
         except Exception as e:
-            return f"Error generating response: {str(e)}" 
-        
-        
-    def generate_plot_base64(self, graphtext: str) -> str:
-        code = re.search(r"```python(.*?)```", graphtext, re.S)
-
-        if not code:
+            print(f"⚠️ Error generating chart spec: {e}")
             return None
 
-        code=code.group(1).replace("plt.show","").strip()
-
-        # run chart code in isolated namespace
-        exec_namespace = {"plt": plt}
-        exec(code, exec_namespace)
+        match = re.search(r"\{.*\}", response.content, re.S)
+        if not match:
+            return None
+        try:
+            return validate_spec(json.loads(match.group(0)))
+        except ValueError:
+            return None
 
-        fig = plt.gcf()
+    @traced("chart_render")
+    def generate_plot_url(self, spec: dict, fmt: str = CHART_FORMAT, dpi: int = CHART_DPI) -> str:
+        if not spec:
+            return None
 
+        # Rendered once per distinct chart; clients fetch it from /charts/<key>
+        return chart_url(chart_store.put(spec, fmt=fmt, dpi=dpi), fmt)
 
-        # Render image to memory buffer
-        buf = io.BytesIO()
-        plt.savefig(buf, format="png", bbox_inches="tight", dpi=200)
-        plt.close(fig)
-        buf.seek(0)
 
-        # Encode as Base64 string
-        return base64.b64encode(buf.read()).decode("utf-8")
+def _pretty(name: str) -> str:
+    name = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(name)).replace("_", " ")
+    return name.strip().capitalize()
 
 
 class GraphExplainer:
@@ -152,6 +166,7 @@ Trend Observed:
             template_format="jinja2"
         )
 
+    @traced("explain")
     def generate_explanation(self, explainText: str) -> str:
         prompt = self.prompt_template.format(
             graph_summary_text=explainText
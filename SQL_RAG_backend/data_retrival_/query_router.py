@@ -0,0 +1,236 @@
+"""
+Route a question to the document (RAG) pipeline, the analytics (SQL/graph)
+pipeline, or both.
+
+The router reuses the MiniLM query embedding that retrieval and the answer
+cache need anyway, so routing costs a few dot products. By default the
+embedding is compared with labelled prototype questions: each intent scores
+the mean cosine similarity of its closest prototypes. When a classifier has
+been trained (`python -m SQL_RAG_backend.data_retrival_.query_router train`)
+its probabilities are used instead. Anything below the confidence cut-off
+runs both pipelines, as before.
+
+    python -m SQL_RAG_backend.data_retrival_.query_router ask "Top 5 products by revenue"
+    python -m SQL_RAG_backend.data_retrival_.query_router eval
+    python -m SQL_RAG_backend.data_retrival_.query_router train --extra labelled.jsonl
+"""
+import argparse
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+import numpy as np
+from ..embedding_backends import unit_vectors
+from ..tracing import traced
+from ..vectordb import get_embeddings
+
+DOCUMENT, ANALYTICS, BOTH = "document", "analytics", "both"
+
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "1") == "1"
+# Prototype routing: minimum gap between the two intents' scores...
+ROUTER_MARGIN = float(os.getenv("ROUTER_MARGIN", "0.06"))
+# ...and minimum similarity of the winning intent
+ROUTER_MIN_SIMILARITY = float(os.getenv("ROUTER_MIN_SIMILARITY", "0.3"))
+# Classifier routing: minimum probability of the winning intent
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.75"))
+# Closest prototypes averaged per intent
+ROUTER_TOP_N = int(os.getenv("ROUTER_TOP_N", "3"))
+ROUTER_CLASSIFIER_PATH = os.getenv(
+    "ROUTER_CLASSIFIER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "router_classifier.joblib"),
+)
+BENCH_QUESTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks", "questions.jsonl")
+
+PROTOTYPES = {
+    DOCUMENT: [
+        "What is the history of Tata Motors?",
+        "Who founded the company and in which year?",
+        "Where is the company's head office?",
+        "Which brands and subsidiaries does Tata Motors own?",
+        "Tell me about the acquisition of Jaguar Land Rover.",
+        "What cars and trucks does the company manufacture?",
+        "Describe the Tata Nano.",
+        "Who is the chairman of Tata Motors?",
+        "What joint ventures has the company formed?",
+        "What is the company's strategy for electric vehicles?",
+        "Where are the company's factories?",
+        "What awards has Tata Motors received?",
+        "Explain the company's business segments.",
+        "Which countries does Tata Motors export to?",
+    ],
+    ANALYTICS: [
+        "What is the total revenue by product?",
+        "Show sales per month as a chart.",
+        "Which customers placed the most orders?",
+        "Plot revenue by region.",
+        "How many units were sold last year?",
+        "Compare budget against actual sales.",
+        "What is the average order value by channel?",
+        "List the top 10 states by revenue.",
+        "Show the quarterly sales trend.",
+        "Which warehouse shipped the most orders?",
+        "What is the profit margin per product?",
+        "How many orders came from each sales channel in 2019?",
+        "Graph the order quantity over time.",
+        "Which product had the lowest sales?",
+    ],
+}
+
+
+@dataclass
+class Route:
+    intent: str
+    confidence: float
+    method: str
+    scores: dict = field(default_factory=dict)
+
+    @property
+    def run_rag(self) -> bool:
+        return self.intent in (DOCUMENT, BOTH)
+
+    @property
+    def run_sql(self) -> bool:
+        return self.intent in (ANALYTICS, BOTH)
+
+    def to_dict(self) -> dict:
+        return {
+            "intent": self.intent,
+            "confidence": round(self.confidence, 3),
+            "method": self.method,
+            "scores": {k: round(v, 3) for k, v in self.scores.items()},
+        }
+
+
+class QueryRouter:
+    """Prototype (or classifier) intent routing over query embeddings."""
+
+    def __init__(self, prototypes: dict = PROTOTYPES, classifier_path: str = ROUTER_CLASSIFIER_PATH):
+        self.prototypes = prototypes
+        self.classifier_path = classifier_path
+        self._vectors = None
+        self._classifier = None
+        self._lock = threading.Lock()
+        self._counts = {DOCUMENT: 0, ANALYTICS: 0, BOTH: 0}
+
+    def _load(self):
+        if self._vectors is not None:
+            return
+        with self._lock:
+            if self._vectors is not None:
+                return
+            embeddings = get_embeddings()
+            self._vectors = {
+                label: unit_vectors(embeddings.embed_documents(questions))
+                for label, questions in self.prototypes.items()
+            }
+            if self.classifier_path and os.path.exists(self.classifier_path):
+                try:
+                    import joblib
+
+                    self._classifier = joblib.load(self.classifier_path)
+                    print(f"🧭 Router classifier loaded from {self.classifier_path}")
+                except Exception as e:
+                    print(f"⚠️ Router classifier not loaded ({e}); using prototypes")
+
+    def _by_prototypes(self, vector) -> Route:
+        scores = {}
+        for label, vectors in self._vectors.items():
+            similarities = np.sort(vectors @ vector)[::-1]
+            scores[label] = float(similarities[:ROUTER_TOP_N].mean())
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        margin = scores[ranked[0]] - scores[ranked[1]]
+        confident = margin >= ROUTER_MARGIN and scores[ranked[0]] >= ROUTER_MIN_SIMILARITY
+        return Route(ranked[0] if confident else BOTH, margin, "prototypes", scores)
+
+    def _by_classifier(self, vector) -> Route:
+        probabilities = self._classifier.predict_proba(vector.reshape(1, -1))[0]
+        scores = {str(label): float(p) for label, p in zip(self._classifier.classes_, probabilities)}
+        best = max(scores, key=scores.get)
+        confident = scores[best] >= ROUTER_MIN_CONFIDENCE
+        return Route(best if confident else BOTH, scores[best], "classifier", scores)
+
+    @traced("route")
+    def route(self, question: str, embedding=None) -> Route:
+        if not ROUTER_ENABLED:
+            return Route(BOTH, 0.0, "disabled")
+        self._load()
+        if embedding is None:
+            embedding = get_embeddings().embed_query(question)
+        vector = unit_vectors(embedding)
+        route = self._by_classifier(vector) if self._classifier is not None else self._by_prototypes(vector)
+        with self._lock:
+            self._counts[route.intent] += 1
+        return route
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "enabled": ROUTER_ENABLED,
+            "method": "classifier" if self._classifier is not None else "prototypes",
+            "routes": counts,
+        }
+
+
+router = QueryRouter()
+
+
+def labelled_questions(path: str = BENCH_QUESTIONS) -> list:
+    """(question, intent) pairs from a JSONL file with "label", or the benchmark's "type" field."""
+    kinds = {"rag": DOCUMENT, "sql": ANALYTICS}
+    pairs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                label = item.get("label") or kinds.get(item.get("type"))
+                if label in (DOCUMENT, ANALYTICS):
+                    pairs.append((item["question"], label))
+    return pairs
+
+
+def train(extra: list = None, path: str = ROUTER_CLASSIFIER_PATH) -> int:
+    """Fit a logistic regression on the prototypes (plus extra pairs) and save it."""
+    import joblib
+    from sklearn.linear_model import LogisticRegression
+
+    pairs = [(q, label) for label, questions in PROTOTYPES.items() for q in questions] + (extra or [])
+    vectors = unit_vectors(get_embeddings().embed_documents([q for q, _ in pairs]))
+    classifier = LogisticRegression(C=4.0, max_iter=1000, class_weight="balanced")
+    classifier.fit(vectors, [label for _, label in pairs])
+    joblib.dump(classifier, path)
+    return len(pairs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Question intent router")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ask = sub.add_parser("ask", help="route one question")
+    ask.add_argument("question")
+    evaluate = sub.add_parser("eval", help="accuracy and fallback rate on labelled questions")
+    evaluate.add_argument("--questions", default=BENCH_QUESTIONS)
+    fit = sub.add_parser("train", help="train the optional classifier")
+    fit.add_argument("--extra", default=None, help="JSONL with question and label (document/analytics)")
+    fit.add_argument("--out", default=ROUTER_CLASSIFIER_PATH)
+    args = parser.parse_args()
+
+    if args.command == "ask":
+        print(json.dumps(router.route(args.question).to_dict(), indent=2))
+    elif args.command == "eval":
+        pairs = labelled_questions(args.questions)
+        correct = fallback = 0
+        for question, label in pairs:
+            route = router.route(question)
+            correct += route.intent == label
+            fallback += route.intent == BOTH
+            mark = "✅" if route.intent == label else ("↔️" if route.intent == BOTH else "❌")
+            print(f"  {mark} {route.intent:<9} {route.confidence:>6.3f}  {question}")
+        print(f"\n🧭 {correct}/{len(pairs)} routed correctly, {fallback} ran both pipelines ({router.stats()['method']})")
+    else:
+        extra = labelled_questions(args.extra) if args.extra else []
+        count = train(extra, args.out)
+        print(f"🧭 Router classifier trained on {count} questions -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
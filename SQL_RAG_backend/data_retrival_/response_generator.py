@@ -1,5 +1,10 @@
 from langchain_core.prompts import PromptTemplate
 from langchain_core.messages import HumanMessage
+import time
+from .context_builder import CONTEXT_TOKEN_BUDGET, truncate_to_tokens
+from ..tracing import record, span, traced
+
+NO_ANSWER = "I don't have enough information from the provided sources to answer this question."
 
 class ResponseGenerator:
     def __init__(self, llm):
@@ -20,21 +25,44 @@ class ResponseGenerator:
             ),
         )
 
-    def generate_response(self, query: str, context: str, max_chars: int = 4000) -> str:
-        if not context or not context.strip():
-            return "I don't have enough information from the provided sources to answer this question."
-
-        # Defensive trim
-        context = context[:max_chars]
+    def build_messages(self, query: str, context: str, max_tokens: int = CONTEXT_TOKEN_BUDGET) -> list:
+        # Defensive trim, at a sentence boundary
+        context = truncate_to_tokens(context, max_tokens)
 
         prompt = self.prompt_template.format(
             context=context,
             question=query
         )
+        return [HumanMessage(content=prompt)]
+
+    @traced("llm_answer")
+    def generate_response(self, query: str, context: str, max_tokens: int = CONTEXT_TOKEN_BUDGET) -> str:
+        if not context or not context.strip():
+            return NO_ANSWER
 
         try:
-            messages = [HumanMessage(content=prompt)]
+            messages = self.build_messages(query, context, max_tokens)
             response = self.llm.invoke(messages)
             return response.content.strip()
         except Exception as e:
             return f"Error generating response: {str(e)}"
+
+    def stream_response(self, query: str, context: str, max_tokens: int = CONTEXT_TOKEN_BUDGET):
+        """Yield answer tokens as the LLM produces them."""
+        if not context or not context.strip():
+            yield NO_ANSWER
+            return
+
+        try:
+            messages = self.build_messages(query, context, max_tokens)
+            with span("llm_answer"):
+                start = time.perf_counter()
+                first = True
+                for chunk in self.llm.stream(messages):
+                    if chunk.content:
+                        if first:
+                            record("first_token", time.perf_counter() - start)
+                            first = False
+                        yield chunk.content
+        except Exception as e:
+            yield f"Error generating response: {str(e)}"
@@ -1,12 +1,38 @@
-from ..vectordb import get_vectordb
+import os
+import time
+from ..vectordb import get_embeddings, text_search, ann_search
+from ..tracing import span, traced
+from ..admission import check_deadline
 
-def retrieve_top_k_with_threshold(query: str, k: int = 5, threshold: float = 20.0):
-    vector_store = get_vectordb()
-    """
-    Retrieve top-k documents with similarity >= threshold (%)
-    Returns: List of Document objects with similarity score added to metadata
-    """
-    results = vector_store.similarity_search_with_score(query, k=k)
+# "hybrid" fuses full-text and vector results; "vector" is the old behaviour
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Candidates pulled from each stage before fusion
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "20"))
+# Reciprocal rank fusion constant
+RRF_K = int(os.getenv("RRF_K", "60"))
+# ts_rank_cd a lexical-only hit needs; hits the thresholded vector search also
+# found always pass. Keeps the OR-ed text query from bypassing the threshold.
+LEXICAL_MIN_RANK = float(os.getenv("LEXICAL_MIN_RANK", "0.2"))
+
+
+@traced("embed")
+def embed_query(query: str):
+    """Embed the query once so the cache and the vector search can share it."""
+    return get_embeddings().embed_query(query)
+
+
+def _doc_key(doc):
+    return doc.metadata.get("content_hash") or doc.page_content
+
+
+def vector_search(query: str, k: int = 5, threshold: float = 20.0, embedding=None,
+                  ef_search: int = None, probes: int = None):
+    """Top-k chunks by embedding similarity, keeping those >= threshold (%)."""
+    if embedding is None:
+        embedding = embed_query(query)
+    # Served by the collection's ANN index when one exists
+    with span("vector_search"):
+        results = ann_search(embedding, k=k, ef_search=ef_search, probes=probes)
 
     filtered = []
 
@@ -20,3 +46,82 @@ def retrieve_top_k_with_threshold(query: str, k: int = 5, threshold: float = 20.
 
     return filtered
 
+
+def reciprocal_rank_fusion(*rankings, k: int = RRF_K):
+    """Merge ranked document lists; a document scores sum(1 / (k + rank))."""
+    scores = {}
+    docs = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = _doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            if key in docs:
+                # Keep the vector score if the other list found it first
+                docs[key].metadata.update(
+                    {m: v for m, v in doc.metadata.items() if m not in docs[key].metadata}
+                )
+            else:
+                docs[key] = doc
+
+    fused = sorted(docs, key=scores.get, reverse=True)
+    for key in fused:
+        docs[key].metadata["rrf_score"] = round(scores[key], 5)
+    return [docs[key] for key in fused]
+
+
+def hybrid_search(query: str, k: int = 5, threshold: float = 20.0, embedding=None,
+                  fetch_k: int = RETRIEVAL_FETCH_K, ef_search: int = None, probes: int = None):
+    """
+    Vector search plus Postgres full-text search, fused with RRF.
+
+    Lexical hits are only fused in when the vector search also passed them
+    through the similarity threshold, or when their ts_rank_cd reaches
+    LEXICAL_MIN_RANK; otherwise nearly every question would match some
+    chunk and the threshold (and the no-answer path) would never apply.
+
+    Returns (documents, timings) where timings holds seconds per stage.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    if embedding is None:
+        embedding = embed_query(query)
+        timings["embed"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vector_docs = vector_search(
+        query, k=fetch_k, threshold=threshold, embedding=embedding,
+        ef_search=ef_search, probes=probes,
+    )
+    timings["vector"] = time.perf_counter() - start
+
+    with span("lexical_search") as s:
+        relevant = {_doc_key(doc) for doc in vector_docs}
+        lexical_docs = []
+        for doc, score in text_search(query, k=fetch_k):
+            if _doc_key(doc) not in relevant and score < LEXICAL_MIN_RANK:
+                continue
+            doc.metadata["lexical_rank"] = len(lexical_docs) + 1
+            doc.metadata["lexical_score"] = round(float(score), 4)
+            lexical_docs.append(doc)
+    timings["lexical"] = s.seconds
+
+    with span("fuse") as s:
+        docs = reciprocal_rank_fusion(vector_docs, lexical_docs)[:k]
+    timings["fuse"] = s.seconds
+
+    return docs, {stage: round(seconds, 4) for stage, seconds in timings.items()}
+
+
+@traced("retrieve")
+def retrieve_top_k_with_threshold(query: str, k: int = 5, threshold: float = 20.0, embedding=None):
+    """
+    Retrieve top-k documents with similarity >= threshold (%)
+    Returns: List of Document objects with similarity score added to metadata
+    """
+    check_deadline("retrieval")
+    if RETRIEVAL_MODE == "vector":
+        return vector_search(query, k=k, threshold=threshold, embedding=embedding)
+
+    docs, _ = hybrid_search(query, k=k, threshold=threshold, embedding=embedding)
+    return docs
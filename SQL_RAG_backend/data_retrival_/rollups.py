@@ -0,0 +1,598 @@
+"""
+Precomputed sales rollups and a fast path for the questions they answer.
+
+rollup_sales_monthly holds SalesOrder aggregated by month, product, state
+and channel; rollup_customer_monthly by month and customer. Statement-level
+triggers on SalesOrder record every month an INSERT, UPDATE or DELETE
+touches in rollup_dirty_months, and refresh() recomputes only those months
+(a TRUNCATE marks everything). No refresh scans the months that did not change.
+
+answer(question) maps questions like "top 5 products by revenue in 2018"
+or "monthly revenue per channel" onto one rollup query and returns rows,
+a chart spec and a templated summary, without calling the LLM. Anything
+it does not fully understand returns None and goes to the SQL agent.
+Cached rollup answers are keyed on rollup_state.refreshed_at, so every
+process stops serving pre-refresh rows within ROLLUP_VERSION_CHECK seconds.
+
+    python -m SQL_RAG_backend.data_retrival_.rollups refresh [--full]
+    python -m SQL_RAG_backend.data_retrival_.rollups ask "monthly revenue per channel in 2018"
+"""
+import argparse
+import datetime
+import os
+import re
+import threading
+import time
+from decimal import Decimal
+from sqlalchemy import text
+from ..cache import TTLCache, MISSING
+from ..database_config import get_engine, data_config
+from ..tracing import traced
+from .chart_renderer import validate_spec, MAX_POINTS, MAX_SERIES
+
+ROLLUPS_ENABLED = os.getenv("ROLLUPS_ENABLED", "1") == "1"
+# How long the list of channels / regions / states used for filters is kept
+ROLLUP_VALUES_TTL = float(os.getenv("ROLLUP_VALUES_TTL", "300"))
+# How often (seconds) a process re-reads rollup_state.refreshed_at
+ROLLUP_VERSION_CHECK = float(os.getenv("ROLLUP_VERSION_CHECK", "30"))
+DEFAULT_TOP = 10
+
+SALES_TABLE = "rollup_sales_monthly"
+CUSTOMER_TABLE = "rollup_customer_monthly"
+
+DDL = (
+    f"""CREATE TABLE IF NOT EXISTS {SALES_TABLE} (
+        month DATE NOT NULL,
+        product_index INT NOT NULL,
+        state_code VARCHAR(10) NOT NULL,
+        channel VARCHAR(100) NOT NULL,
+        orders BIGINT NOT NULL,
+        quantity BIGINT NOT NULL,
+        revenue NUMERIC(18, 2) NOT NULL,
+        cost NUMERIC(18, 3) NOT NULL,
+        PRIMARY KEY (month, product_index, state_code, channel)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS {CUSTOMER_TABLE} (
+        month DATE NOT NULL,
+        customer_index INT NOT NULL,
+        orders BIGINT NOT NULL,
+        quantity BIGINT NOT NULL,
+        revenue NUMERIC(18, 2) NOT NULL,
+        cost NUMERIC(18, 3) NOT NULL,
+        PRIMARY KEY (month, customer_index)
+    )""",
+    """CREATE TABLE IF NOT EXISTS rollup_state (
+        name VARCHAR(64) PRIMARY KEY,
+        last_month DATE,
+        rows_before BIGINT,
+        refreshed_at TIMESTAMPTZ
+    )""",
+    "ALTER TABLE rollup_state ADD COLUMN IF NOT EXISTS change_log BOOLEAN NOT NULL DEFAULT false",
+    # Months changed since the last refresh; '-infinity' means all of them
+    "CREATE TABLE IF NOT EXISTS rollup_dirty_months (month DATE PRIMARY KEY)",
+)
+
+# Installed by a full rebuild. Statement-level triggers with transition
+# tables cost one DISTINCT over the changed rows, also for bulk COPY loads.
+CHANGE_LOG_DDL = (
+    """CREATE OR REPLACE FUNCTION rollup_mark_months() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            INSERT INTO rollup_dirty_months VALUES ('-infinity') ON CONFLICT DO NOTHING;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO rollup_dirty_months
+            SELECT DISTINCT date_trunc('month', orderDate)::date FROM new_rows WHERE orderDate IS NOT NULL
+            ON CONFLICT DO NOTHING;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            INSERT INTO rollup_dirty_months
+            SELECT DISTINCT date_trunc('month', orderDate)::date FROM old_rows WHERE orderDate IS NOT NULL
+            ON CONFLICT DO NOTHING;
+        END IF;
+        RETURN NULL;
+    END $$""",
+    "DROP TRIGGER IF EXISTS rollup_mark_insert ON SalesOrder",
+    "CREATE TRIGGER rollup_mark_insert AFTER INSERT ON SalesOrder "
+    "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_months()",
+    "DROP TRIGGER IF EXISTS rollup_mark_update ON SalesOrder",
+    "CREATE TRIGGER rollup_mark_update AFTER UPDATE ON SalesOrder "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_months()",
+    "DROP TRIGGER IF EXISTS rollup_mark_delete ON SalesOrder",
+    "CREATE TRIGGER rollup_mark_delete AFTER DELETE ON SalesOrder "
+    "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_months()",
+    "DROP TRIGGER IF EXISTS rollup_mark_truncate ON SalesOrder",
+    "CREATE TRIGGER rollup_mark_truncate AFTER TRUNCATE ON SalesOrder "
+    "FOR EACH STATEMENT EXECUTE FUNCTION rollup_mark_months()",
+)
+
+INSERT_SALES = f"""
+INSERT INTO {SALES_TABLE}
+SELECT date_trunc('month', s.orderDate)::date,
+       s.productDescriptionIndex,
+       r.stateCode,
+       COALESCE(s.channel, 'Unknown'),
+       count(*),
+       COALESCE(sum(s.orderQuantity), 0),
+       COALESCE(sum(s.lineTotal), 0),
+       COALESCE(sum(s.totalUnitCost * s.orderQuantity), 0)
+FROM SalesOrder s
+JOIN Regions r ON r.id = s.deliveryRegionIndex
+WHERE s.orderDate IS NOT NULL {{where}}
+GROUP BY 1, 2, 3, 4
+"""
+
+INSERT_CUSTOMERS = f"""
+INSERT INTO {CUSTOMER_TABLE}
+SELECT date_trunc('month', s.orderDate)::date,
+       s.customerNameIndex,
+       count(*),
+       COALESCE(sum(s.orderQuantity), 0),
+       COALESCE(sum(s.lineTotal), 0),
+       COALESCE(sum(s.totalUnitCost * s.orderQuantity), 0)
+FROM SalesOrder s
+WHERE s.orderDate IS NOT NULL {{where}}
+GROUP BY 1, 2
+"""
+
+# Measures and their keywords; a question naming two measures is left to the agent
+MEASURES = (
+    ("profit", "SUM(r.revenue - r.cost)", ("profit", "margin")),
+    ("quantity", "SUM(r.quantity)", ("quantity", "units", "volume")),
+    ("orders", "SUM(r.orders)", ("orders", "number of orders", "order count")),
+    ("revenue", "SUM(r.revenue)", ("revenue", "sales", "turnover", "income", "earn", "sold")),
+)
+
+# name -> (keywords, label expression, joins needed, time dimension)
+DIMENSIONS = {
+    "month": (("month", "monthly"), "r.month", (), True),
+    "year": (("year", "yearly", "annual", "annually"), "CAST(EXTRACT(YEAR FROM r.month) AS INT)", (), True),
+    "product": (("product",), "p.productName", ("product",), False),
+    "region": (("region",), "sr.region", ("state",), False),
+    "state": (("state",), "sr.state", ("state",), False),
+    "channel": (("channel",), "r.channel", (), False),
+    "customer": (("customer", "client"), "c.customerName", ("customer",), False),
+}
+
+JOINS = {
+    "product": 'JOIN Products p ON p."index" = r.product_index',
+    "state": "JOIN stateRegions sr ON sr.stateCode = r.state_code",
+    "customer": "JOIN Customers c ON c.customerIndex = r.customer_index",
+}
+
+# Questions the rollups cannot answer correctly; they go to the agent
+UNSUPPORTED = (
+    "average", "avg", "mean", "median", "percent", "%", "share", "growth", "budget",
+    "compare", " vs", "versus", "warehouse", "price", "discount", "city", "cities",
+    "county", "counties", "currency", "per order", "delivery", "why", "forecast",
+)
+# Time windows the query cannot express (only whole calendar years can be)
+_UNSUPPORTED_TIME = re.compile(
+    r"\b(quarters?|quarterly|q[1-4]|h[12]|last|this|past|previous|prior|recent|latest|current|"
+    r"ytd|mtd|today|yesterday|weeks?|weekly|days?|daily|since|between|until|before|after|during|"
+    r"january|february|march|april|june|july|august|september|october|november|december|"
+    r"jan|feb|apr|jun|jul|aug|sept?|oct|nov|dec)\b|\b(may|mar)\s+(19|20)\d{2}\b"
+)
+# A negated filter would be read as the filter itself
+_NEGATION = re.compile(r"\b(not|no|non|excluding|exclude|excludes|except|without|other than|besides)\b|n't\b")
+
+_TOP = re.compile(r"\b(top|best|highest|most|largest|biggest)\b(?:\s+(\d+))?")
+_BOTTOM = re.compile(r"\b(bottom|worst|lowest|least|smallest|fewest)\b(?:\s+(\d+))?")
+_YEAR = re.compile(r"\b(19|20)\d{2}\b")
+
+_values = TTLCache(max_size=4, ttl=ROLLUP_VALUES_TTL)
+_version = TTLCache(max_size=1, ttl=ROLLUP_VERSION_CHECK)
+_refresh_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------- refresh
+
+def _month_ranges(months: list) -> list:
+    """Sorted months merged into (first, last) runs of consecutive months."""
+    runs = []
+    for month in sorted(months):
+        if runs:
+            last = runs[-1][1]
+            following = datetime.date(last.year + last.month // 12, last.month % 12 + 1, 1)
+            if month == following:
+                runs[-1][1] = month
+                continue
+        runs.append([month, month])
+    return [tuple(run) for run in runs]
+
+
+def refresh(full: bool = False) -> dict:
+    """
+    Bring the rollups up to date with SalesOrder.
+
+    A full rebuild (the first refresh, full=True, or after a TRUNCATE)
+    installs the change-log triggers and aggregates everything. Otherwise
+    the months the triggers logged are taken off rollup_dirty_months and
+    only they are recomputed, through the orderDate index. Writes committed
+    after the log is read leave their mark for the next refresh. Readers
+    keep seeing the previous rollups until the transaction commits.
+    """
+    start = time.perf_counter()
+    with _refresh_lock, get_engine().begin() as conn:
+        # One refresher at a time across processes as well
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('rollup_sales'))"))
+        for statement in DDL:
+            conn.execute(text(statement))
+
+        state = conn.execute(
+            text("SELECT change_log FROM rollup_state WHERE name = 'sales'")
+        ).first()
+        months = None  # None: everything
+        if state is not None and state.change_log and not full:
+            logged = [month for (month,) in conn.execute(text(
+                "DELETE FROM rollup_dirty_months RETURNING CASE WHEN isfinite(month) THEN month END"
+            ))]
+            if None not in logged:
+                months = logged
+        if months is None:
+            for statement in CHANGE_LOG_DDL:
+                conn.execute(text(statement))
+            conn.execute(text("DELETE FROM rollup_dirty_months"))
+        elif not months:
+            return {"mode": "incremental", "months": [], "sales_rows": 0, "customer_rows": 0,
+                    "seconds": round(time.perf_counter() - start, 3)}
+
+        params, rollup_where, sales_where = {}, "", ""
+        if months is not None:
+            ranges = []
+            for i, (first, last) in enumerate(_month_ranges(months)):
+                params[f"first{i}"], params[f"last{i}"] = first, last
+                ranges.append(f"(%s >= :first{i} AND %s < CAST(:last{i} AS date) + interval '1 month')")
+            rollup_where = " WHERE " + " OR ".join(r % ("month", "month") for r in ranges)
+            sales_where = "AND (" + " OR ".join(r % ("s.orderDate", "s.orderDate") for r in ranges) + ")"
+
+        for table in (SALES_TABLE, CUSTOMER_TABLE):
+            conn.execute(text(f"DELETE FROM {table}{rollup_where}"), params)
+        sales_rows = conn.execute(text(INSERT_SALES.format(where=sales_where)), params).rowcount
+        customer_rows = conn.execute(text(INSERT_CUSTOMERS.format(where=sales_where)), params).rowcount
+
+        last_month = conn.execute(text(f"SELECT max(month) FROM {SALES_TABLE}")).scalar()
+        conn.execute(
+            text(
+                "INSERT INTO rollup_state (name, last_month, change_log, refreshed_at) "
+                "VALUES ('sales', :month, true, clock_timestamp()) "
+                "ON CONFLICT (name) DO UPDATE SET last_month = EXCLUDED.last_month, "
+                "change_log = true, refreshed_at = EXCLUDED.refreshed_at"
+            ),
+            {"month": last_month},
+        )
+        conn.execute(text(f"ANALYZE {SALES_TABLE}"))
+        conn.execute(text(f"ANALYZE {CUSTOMER_TABLE}"))
+
+    # Cached rollup answers and filter values predate the refresh
+    # (other processes notice the new refreshed_at within ROLLUP_VERSION_CHECK)
+    data_config().clear_cache()
+    _values.clear()
+    _version.clear()
+    return {
+        "mode": "full" if months is None else "incremental",
+        "months": None if months is None else sorted(m.isoformat() for m in months),
+        "sales_rows": sales_rows,
+        "customer_rows": customer_rows,
+        "watermark": last_month.isoformat() if last_month else None,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def version():
+    """refreshed_at of the last refresh, or None before the first one (re-read every ROLLUP_VERSION_CHECK s)."""
+    refreshed_at = _version.get("refreshed_at")
+    if refreshed_at is MISSING:
+        try:
+            with get_engine().connect() as conn:
+                refreshed_at = conn.execute(
+                    text("SELECT refreshed_at FROM rollup_state WHERE name = 'sales'")
+                ).scalar()
+        except Exception:
+            refreshed_at = None
+        _version.set("refreshed_at", refreshed_at)
+    return refreshed_at
+
+
+def available() -> bool:
+    """True once the rollups have been built."""
+    return ROLLUPS_ENABLED and version() is not None
+
+
+def _filter_values() -> dict:
+    """Channel, region, state and product names that a question may filter on."""
+    key = version()
+    values = _values.get(key)
+    if values is MISSING:
+        with get_engine().connect() as conn:
+            values = {
+                "channel": [v for (v,) in conn.execute(text(f"SELECT DISTINCT channel FROM {SALES_TABLE}"))],
+                "region": [v for (v,) in conn.execute(text("SELECT DISTINCT region FROM stateRegions"))],
+                "state": [v for (v,) in conn.execute(text("SELECT DISTINCT state FROM stateRegions"))],
+                "product": [v for (v,) in conn.execute(text("SELECT productName FROM Products"))],
+            }
+        _values.set(key, values)
+    return values
+
+
+# ---------------------------------------------------------------- matching
+
+def _has_word(question: str, word: str) -> bool:
+    return re.search(rf"\b{re.escape(word.lower())}s?\b", question) is not None
+
+
+def parse_question(question: str, values: dict = None):
+    """
+    Break a question into measure, dimensions, filters and ordering.
+
+    Returns None for anything it cannot map exactly: unsupported words, time
+    windows other than a calendar year, negations and questions naming more
+    than one measure.
+    """
+    q = " " + question.lower().strip() + " "
+    # "sales channel" names the channel dimension, not the revenue measure
+    q = re.sub(r"\bsales channel", "channel", q)
+    if any(word in q for word in UNSUPPORTED):
+        return None
+    if _UNSUPPORTED_TIME.search(q) or _NEGATION.search(q):
+        return None
+
+    measures = [(name, expr) for name, expr, words in MEASURES if any(_has_word(q, w) for w in words)]
+    if len(measures) > 1:
+        return None
+    measure = measures[0] if measures else None
+
+    filters = {}
+    years = {int(m.group(0)) for m in _YEAR.finditer(q)}
+    if len(years) > 1:
+        return None
+    if years:
+        filters["year"] = years.pop()
+    for name, options in (values or {}).items():
+        for option in sorted(options, key=lambda v: -len(str(v))):
+            if option and re.search(rf"\b{re.escape(str(option).lower())}\b", q):
+                filters[name] = option
+                break
+
+    dims = [name for name, (words, *_rest) in DIMENSIONS.items() if any(_has_word(q, w) for w in words)]
+    time_dims = [d for d in dims if DIMENSIONS[d][3]]
+    # "the Wholesale channel" or "the South region" is a filter, not a breakdown
+    cat_dims = [d for d in dims if not DIMENSIONS[d][3] and d not in filters]
+    if len(time_dims) > 1:
+        time_dims = ["month"] if "month" in time_dims else time_dims[:1]
+    if len(cat_dims) > 1:
+        return None
+    if measure is None and time_dims and "trend" in q:
+        measure = MEASURES[-1][:2]
+    if measure is None or not (time_dims or cat_dims):
+        return None
+
+    if time_dims:
+        dimension, series = time_dims[0], (cat_dims[0] if cat_dims else None)
+    else:
+        dimension, series = cat_dims[0], None
+    if series == "customer":
+        return None
+    if dimension == "customer" and any(f in filters for f in ("channel", "region", "state", "product")):
+        # The customer rollup has no channel, geography or product grain
+        return None
+
+    limit, descending = None, True
+    top, bottom = _TOP.search(q), _BOTTOM.search(q)
+    if bottom:
+        limit, descending = int(bottom.group(2) or DEFAULT_TOP), False
+    elif top:
+        limit = int(top.group(2) or DEFAULT_TOP)
+
+    return {
+        "measure": measure[0],
+        "expression": measure[1],
+        "dimension": dimension,
+        "series": series,
+        "filters": filters,
+        "limit": limit,
+        "descending": descending,
+    }
+
+
+def build_query(parsed: dict):
+    """SQL and bound parameters for a parsed question."""
+    dimension, series = parsed["dimension"], parsed["series"]
+    uses_customers = dimension == "customer"
+    table = CUSTOMER_TABLE if uses_customers else SALES_TABLE
+
+    needed = set(DIMENSIONS[dimension][2])
+    if series:
+        needed |= set(DIMENSIONS[series][2])
+    needed |= {"state" if f in ("region", "state") else f for f in parsed["filters"] if f in ("region", "state", "product")}
+
+    where, params = [], {}
+    year = parsed["filters"].get("year")
+    if year:
+        where.append("r.month >= :start AND r.month < :end")
+        params.update(start=datetime.date(year, 1, 1), end=datetime.date(year + 1, 1, 1))
+    for name, column in (("channel", "r.channel"), ("region", "sr.region"), ("state", "sr.state"), ("product", "p.productName")):
+        if name in parsed["filters"]:
+            where.append(f"{column} = :{name}")
+            params[name] = parsed["filters"][name]
+
+    label = DIMENSIONS[dimension][1]
+    select = [f"{label} AS {dimension}"]
+    group = [label]
+    if series:
+        select.append(f"{DIMENSIONS[series][1]} AS {series}")
+        group.append(DIMENSIONS[series][1])
+    select.append(f"{parsed['expression']} AS {parsed['measure']}")
+
+    sql = f"SELECT {', '.join(select)} FROM {table} r"
+    for join in ("product", "state", "customer"):
+        if join in needed:
+            sql += f" {JOINS[join]}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " GROUP BY " + ", ".join(group)
+
+    if DIMENSIONS[dimension][3]:
+        sql += " ORDER BY 1"
+    else:
+        sql += f" ORDER BY {parsed['measure']} {'DESC' if parsed['descending'] else 'ASC'}"
+        sql += f" LIMIT {min(parsed['limit'] or MAX_POINTS, MAX_POINTS)}"
+    return sql, params
+
+
+# ---------------------------------------------------------------- answers
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def _label(value) -> str:
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime("%Y-%m")
+    return str(value)
+
+
+def _fmt(value: float) -> str:
+    return f"{value:,.2f}" if isinstance(value, float) and not value.is_integer() else f"{value:,.0f}"
+
+
+def _title(parsed: dict) -> str:
+    measure = parsed["measure"].capitalize()
+    dimension = parsed["dimension"]
+    title = f"{'Monthly' if dimension == 'month' else 'Yearly' if dimension == 'year' else ''} {measure}".strip()
+    if dimension not in ("month", "year"):
+        title += f" by {dimension}"
+    if parsed["series"]:
+        title += f" per {parsed['series']}"
+    extras = [str(v) for k, v in parsed["filters"].items()]
+    return title + (f" ({', '.join(extras)})" if extras else "")
+
+
+def build_spec(parsed: dict, rows: list):
+    title = _title(parsed)
+    is_time = DIMENSIONS[parsed["dimension"]][3]
+    if not parsed["series"]:
+        chart_type = "line" if is_time else "barh" if len(rows) > 8 else "bar"
+        return validate_spec({
+            "type": chart_type,
+            "title": title,
+            "xlabel": parsed["dimension"].capitalize(),
+            "ylabel": parsed["measure"].capitalize(),
+            "labels": [_label(r[0]) for r in rows],
+            "values": [_number(r[-1]) for r in rows],
+        })
+
+    # Pivot (label, series, value) rows; keep the largest series
+    labels = sorted({r[0] for r in rows})
+    totals = {}
+    cells = {}
+    for label, name, value in rows:
+        totals[name] = totals.get(name, 0.0) + _number(value)
+        cells[(label, name)] = _number(value)
+    names = sorted(totals, key=totals.get, reverse=True)[:MAX_SERIES]
+    return validate_spec({
+        "type": "line" if is_time else "bar",
+        "title": title,
+        "xlabel": parsed["dimension"].capitalize(),
+        "ylabel": parsed["measure"].capitalize(),
+        "labels": [_label(label) for label in labels],
+        "series": [
+            {"name": str(name), "values": [cells.get((label, name), 0.0) for label in labels]}
+            for name in names
+        ],
+    })
+
+
+def summarize(parsed: dict, rows: list) -> str:
+    """Short explanation in the GraphExplainer layout, built from the numbers."""
+    measure = parsed["measure"]
+    title = _title(parsed)
+
+    if parsed["series"]:
+        totals = {}
+        for _, name, value in rows:
+            totals[name] = totals.get(name, 0.0) + _number(value)
+        ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)
+        description = f"{measure.capitalize()} per {parsed['dimension']}, split by {parsed['series']}."
+        trend = f"{ranked[0][0]} has the highest total ({_fmt(ranked[0][1])})"
+        if len(ranked) > 1:
+            trend += f", {ranked[-1][0]} the lowest ({_fmt(ranked[-1][1])})"
+        trend += "."
+    elif DIMENSIONS[parsed["dimension"]][3]:
+        points = [(_label(r[0]), _number(r[-1])) for r in rows]
+        peak = max(points, key=lambda p: p[1])
+        low = min(points, key=lambda p: p[1])
+        description = f"{measure.capitalize()} per {parsed['dimension']} from {points[0][0]} to {points[-1][0]}."
+        trend = f"Peak in {peak[0]} ({_fmt(peak[1])}), lowest in {low[0]} ({_fmt(low[1])})."
+        if points[0][1]:
+            change = (points[-1][1] - points[0][1]) / abs(points[0][1]) * 100
+            trend += f" The last period is {change:+.1f}% against the first."
+    else:
+        points = [(_label(r[0]), _number(r[-1])) for r in rows]
+        total = sum(p[1] for p in points)
+        description = f"{measure.capitalize()} for {len(points)} {parsed['dimension']}s, ranked."
+        trend = f"{points[0][0]} leads with {_fmt(points[0][1])}"
+        if len(points) > 1:
+            trend += f", followed by {points[1][0]} ({_fmt(points[1][1])})"
+        if total:
+            trend += f"; the first one is {points[0][1] / total * 100:.1f}% of the total shown"
+        trend += "."
+
+    return f"Title:\n{title}\n\nDescription:\n{description}\n\nTrend Observed:\n{trend}"
+
+
+@traced("rollup")
+def answer(question: str):
+    """Rows, chart spec and summary for a question the rollups can answer, else None."""
+    if not available():
+        return None
+    try:
+        parsed = parse_question(question, _filter_values())
+        if parsed is None:
+            return None
+        sql, params = build_query(parsed)
+        # The version comment keys the shared result cache on the refresh
+        versioned = f"{sql} /* rollups {version().isoformat()} */"
+        columns, rows = data_config().fetch_rows(versioned, limit=MAX_POINTS * MAX_SERIES, parameters=params)
+    except Exception as e:
+        print(f"⚠️ Rollup fast path failed, using the SQL agent: {e}")
+        return None
+    if len(rows) < 2:
+        return None
+
+    return {
+        "sql": sql,
+        "columns": columns,
+        "rows": rows,
+        "spec": build_spec(parsed, rows),
+        "summary": summarize(parsed, rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sales rollups")
+    sub = parser.add_subparsers(dest="action", required=True)
+    refresh_parser = sub.add_parser("refresh", help="create or update the rollup tables")
+    refresh_parser.add_argument("--full", action="store_true", help="rebuild every month")
+    ask_parser = sub.add_parser("ask", help="show how a question is answered")
+    ask_parser.add_argument("question")
+    args = parser.parse_args()
+
+    if args.action == "refresh":
+        print(f"📊 Rollups refreshed: {refresh(full=args.full)}")
+        return
+
+    result = answer(args.question)
+    if result is None:
+        print("↪️  Not answerable from the rollups; the SQL agent would run")
+        return
+    print(result["sql"])
+    print(result["columns"])
+    for row in result["rows"][:20]:
+        print(row)
+    print()
+    print(result["summary"])
+
+
+if __name__ == "__main__":
+    main()
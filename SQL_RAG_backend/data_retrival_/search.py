@@ -1,16 +1,45 @@
 from dotenv import load_dotenv
-from .retriever import retrieve_top_k_with_threshold
-from .response_generator import ResponseGenerator
-from .LLMs import grokllm, ollama3_2_3bmodel
+from .retriever import retrieve_top_k_with_threshold, embed_query
+from .answer_cache import answer_cache, MISSING
+from .context_builder import build_context
+from .response_generator import ResponseGenerator, NO_ANSWER
+from .LLMs import get_llm
+from ..tracing import span, traced
 
 load_dotenv()
 
-llm = grokllm()
+llm = get_llm()
 
 response_generator = ResponseGenerator(llm)
 
 
-def ask_question(query: str, k: int = 5, threshold: float = 20.0) -> str:
+def describe_sources(results) -> list:
+    """Compact, JSON-serialisable summary of the retrieved documents."""
+    return [
+        {
+            "source": doc.metadata.get("source", "Unknown"),
+            "section": doc.metadata.get("section"),
+            "page": doc.metadata.get("page"),
+            "similarity_score": doc.metadata.get("similarity_score"),
+        }
+        for doc in results
+    ]
+
+
+def cached_answer(query: str, embedding=None):
+    """(cached answer or MISSING, embedding); the query is only embedded when it is not a repeat."""
+    if embedding is None:
+        with span("answer_cache"):
+            cached = answer_cache.get_exact(query)
+        if cached is not MISSING:
+            return cached, None
+        embedding = embed_query(query)
+    with span("answer_cache"):
+        return answer_cache.get(query, embedding), embedding
+
+
+@traced("rag")
+def ask_question(query: str, k: int = 5, threshold: float = 20.0, embedding=None) -> str:
     """
     Ask a question and get an answer based on RAG retrieval.
     
@@ -18,39 +47,78 @@ def ask_question(query: str, k: int = 5, threshold: float = 20.0) -> str:
         query: The question to ask
         k: Number of top documents to retrieve
         threshold: Minimum similarity score (0-100) for filtering
+        embedding: Query embedding, if the caller (e.g. the router) already has it
         
     Returns:
         The generated answer based on retrieved context
     """
+    cached, embedding = cached_answer(query, embedding)
+    if cached is not MISSING:
+        return cached
+
     results = retrieve_top_k_with_threshold(
         query=query,
         k=k,
-        threshold=threshold
+        threshold=threshold,
+        embedding=embedding
     )
 
     if not results:
-        return "I don't have enough information from the provided sources to answer this question."
-
-    # Build context from retrieved documents
-    context_parts = []
-    for doc in results:
-        similarity = doc.metadata.get("similarity_score", "N/A")
-        source = doc.metadata.get("source", "Unknown")
-        section = doc.metadata.get("section", "Unknown")
-
-        context_parts.append(
-            f"[Source: {source} | Section: {section} | Relevance: {similarity}%]\n"
-            f"{doc.page_content}"
-        )
+        return NO_ANSWER
 
-    context = "\n\n".join(context_parts)
+    # Merge, de-duplicate and pack retrieved documents into the token budget
+    with span("context"):
+        context = build_context(results)
 
     response =  response_generator.generate_response(
         query=query,
         context=context
     )
     
-    if response.startswith("I don't"):
-        return None
-    else:
-        return response
\ No newline at end of file
+    if response.startswith("Error generating response"):
+        return response
+
+    answer = None if response.startswith("I don't") else response
+    answer_cache.set(query, answer, embedding)
+    return answer
+
+
+def stream_answer(query: str, k: int = 5, threshold: float = 20.0, embedding=None):
+    """
+    Streaming variant of ask_question.
+
+    Yields ("sources", list) once retrieval is done, then ("token", str)
+    for every piece of the answer as the LLM produces it.
+    """
+    cached, embedding = cached_answer(query, embedding)
+    if cached is not MISSING:
+        yield "sources", []
+        yield "token", cached if cached is not None else NO_ANSWER
+        return
+
+    results = retrieve_top_k_with_threshold(
+        query=query,
+        k=k,
+        threshold=threshold,
+        embedding=embedding
+    )
+    yield "sources", describe_sources(results)
+
+    if not results:
+        yield "token", NO_ANSWER
+        return
+
+    with span("context"):
+        context = build_context(results)
+
+    tokens = []
+    for token in response_generator.stream_response(
+        query=query,
+        context=context
+    ):
+        tokens.append(token)
+        yield "token", token
+
+    response = "".join(tokens).strip()
+    if not response.startswith("Error generating response"):
+        answer_cache.set(query, None if response.startswith("I don't") else response, embedding)
@@ -1,35 +1,139 @@
+import os
+import threading
 from langchain_community.agent_toolkits import SQLDatabaseToolkit
 from langchain_community.agent_toolkits import create_sql_agent
-from ..database_config import data_config
-from .LLMs import ollama3_2_3bmodel, grokllm, ollamaph3_mini
+from ..cache import TTLCache, MISSING
+from ..database_config import data_config, is_read_only
+from .answer_cache import normalize_query
+from .LLMs import get_llm
 from .graphTools import GraphGenerator,GraphExplainer
+from . import rollups
+from ..tracing import span, traced
+from ..admission import check_deadline
 from dotenv import load_dotenv
 load_dotenv()
 
-def data_retriever(question : str):
-    db=data_config()
-    model=grokllm()
+# question -> generated SQL -> result, so repeated questions skip the agent
+SQL_ANSWER_TTL = float(os.getenv("SQL_ANSWER_TTL", "600"))
+sql_answer_cache = TTLCache(max_size=256, ttl=SQL_ANSWER_TTL)
+
+SQL_PREFIX = """You are an agent designed to interact with a SQL database.
+Given an input question, create a syntactically correct {dialect} query to run, then look at the results of the query and return the answer.
+Unless the user specifies a specific number of examples they wish to obtain, always limit your query to at most {top_k} results.
+You can order the results by a relevant column to return the most interesting examples in the database.
+Never query for all the columns from a specific table, only ask for the relevant columns given the question.
+If you get an error while executing a query, rewrite the query and try again.
+DO NOT make any DML statements (INSERT, UPDATE, DELETE, DROP etc.) to the database.
+
+The full database schema is given below. You do not need to list the tables
+or look up their schema; write the query directly.
+
+__SCHEMA__
+"""
+
+SQL_SUFFIX = """Begin!
+
+Question: {input}
+Thought: The schema is already known, so I can write the query.
+{agent_scratchpad}"""
+
+# Tools the agent still needs once the schema is in the prompt
+AGENT_TOOLS = ("sql_db_query", "sql_db_schema")
+
+_agent = None
+_agent_lock = threading.Lock()
+
+
+class SchemaKnownToolkit(SQLDatabaseToolkit):
+    """Drops the list-tables and query-checker tools, which cost extra agent steps."""
+
+    def get_tools(self):
+        return [tool for tool in super().get_tools() if tool.name in AGENT_TOOLS]
 
-    toolkit = SQLDatabaseToolkit(db=db, llm=model)
 
-    agentdb = create_sql_agent(
-        llm=model,
-        toolkit=toolkit,
-        verbose=True,
-        max_iterations=8,
-        top_k=10,
-    )
+def get_sql_agent():
+    """Build the model, toolkit and agent once per process."""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                db = data_config()
+                model = get_llm()
+
+                # The prefix is formatted twice (dialect/top_k, then as a
+                # prompt template), so literal braces are escaped twice.
+                schema = db.get_table_info()
+                schema = schema.replace("{", "{{{{").replace("}", "}}}}")
+
+                _agent = create_sql_agent(
+                    llm=model,
+                    toolkit=SchemaKnownToolkit(db=db, llm=model),
+                    prefix=SQL_PREFIX.replace("__SCHEMA__", schema),
+                    suffix=SQL_SUFFIX,
+                    verbose=True,
+                    max_iterations=8,
+                    top_k=10,
+                    agent_executor_kwargs={"return_intermediate_steps": True},
+                )
+    return _agent
+
+
+def run_sql_agent(question: str) -> dict:
+    """Answer a data question, reusing the cached SQL and rows when possible."""
+    key = normalize_query(question)
+    sqlAnswer = sql_answer_cache.get(key)
+    if sqlAnswer is not MISSING:
+        return sqlAnswer
+
+    check_deadline("sql agent")
+    with span("sql_agent"):
+        result = get_sql_agent().invoke(question)
+    steps = result.get("intermediate_steps", [])
+    sqlAnswer = {
+        "input": question,
+        "output": result["output"],
+        "sql": [action.tool_input for action, _ in steps if action.tool == "sql_db_query"],
+        "columns": [],
+        "rows": [],
+    }
+
+    # Structured rows of the final query, served from the result cache; the
+    # statement is re-run, so anything but a plain SELECT / WITH is skipped
+    if sqlAnswer["sql"] and is_read_only(str(sqlAnswer["sql"][-1])):
+        try:
+            with span("fetch_rows"):
+                sqlAnswer["columns"], sqlAnswer["rows"] = data_config().fetch_rows(sqlAnswer["sql"][-1])
+        except Exception as e:
+            print(f"⚠️ Could not fetch rows for chart: {e}")
+
+    sql_answer_cache.set(key, sqlAnswer)
+    return sqlAnswer
+
+
+@traced("sql")
+def data_retriever(question : str):
+    model = get_llm()
+
+    # Common aggregates come straight from the rollups: no agent, no LLM
+    fast = rollups.answer(question)
+    if fast is not None:
+        graph_url = GraphGenerator(model).generate_plot_url(fast["spec"])
+        if graph_url:
+            return (fast["summary"], graph_url)
 
-    sqlAnswer= agentdb.invoke(question)
+    sqlAnswer = run_sql_agent(question)
 
     visualizer = GraphGenerator(model)
-    graphtext = visualizer.generate_graph(sqlAnswer)
-    img_base64 = visualizer.generate_plot_base64(graphtext)
+    spec = visualizer.spec_from_rows(sqlAnswer["columns"], sqlAnswer["rows"])
+    if spec is None:
+        spec = visualizer.generate_spec(sqlAnswer["output"])
+    graph_url = visualizer.generate_plot_url(spec)
     
-    if not img_base64:
+    if not graph_url:
         return (None,None)
     
+    check_deadline("graph explanation")
     explain = GraphExplainer(model)
     explain_text = explain.strip_plotting_lines(sqlAnswer['output'])
 
-    return (explain.generate_explanation(explain_text),img_base64)
\ No newline at end of file
+    return (explain.generate_explanation(explain_text),graph_url)
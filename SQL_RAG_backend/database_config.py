@@ -1,7 +1,13 @@
 from langchain_community.utilities import SQLDatabase
+from sqlalchemy import create_engine, inspect, text
 from dotenv import load_dotenv
 load_dotenv()
 import os
+import re
+import threading
+import time
+from .cache import TTLCache, MISSING
+from .tracing import span
 
 username = os.getenv("DB_USER")
 password = os.getenv("DB_PASS")
@@ -10,10 +16,147 @@ port = os.getenv("DB_PORT")
 database_schema = os.getenv("DB_NAME")
 mysql_url = (f"postgresql+psycopg2://{username}:{password}@{host}:{port}/{database_schema}")
 
+# Connection pool shared by every SQLAlchemy user in the process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# How long (seconds) read-only query results stay cached
+SQL_RESULT_TTL = float(os.getenv("SQL_RESULT_TTL", "300"))
+SQL_RESULT_CACHE_SIZE = int(os.getenv("SQL_RESULT_CACHE_SIZE", "256"))
+
+# Tables the application maintains itself; they are hidden from the SQL agent
+INTERNAL_TABLES = [
+    "langchain_pg_collection",
+    "langchain_pg_embedding",
+    "rollup_sales_monthly",
+    "rollup_customer_monthly",
+    "rollup_state",
+    "rollup_dirty_months",
+]
+
+_engine = None
+_engine_lock = threading.RLock()
+_db = None
+
 
 def getSqlUrl():
     return mysql_url
 
+def get_engine():
+    """Return the process-wide pooled engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(
+                    mysql_url,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=True,
+                )
+    return _engine
+
+
+def ping() -> float:
+    """Round-trip one SELECT 1 through the pool; returns the latency in seconds."""
+    start = time.perf_counter()
+    with get_engine().connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return round(time.perf_counter() - start, 3)
+
+
+def dispose_after_fork():
+    """Drop pooled connections inherited from the parent process.
+
+    A psycopg2 socket must never be shared between processes; close=False leaves
+    the parent's connections alone and gives this process a fresh, empty pool.
+    """
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+_comments = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_strings = re.compile(r"'(?:[^']|'')*'")
+# Verbs that write, lock rows or change the schema; SELECT ... INTO creates a table
+_writes = re.compile(
+    r"\b(insert|update|delete|merge|drop|alter|create|truncate|grant|revoke|copy|call|into)\b",
+    re.I,
+)
+
+
+def is_read_only(sql: str) -> bool:
+    """True for one SELECT / WITH statement that cannot modify anything."""
+    body = _strings.sub("''", _comments.sub(" ", sql)).strip().rstrip(";").strip()
+    if ";" in body or not re.match(r"(select|with)\b", body, re.I):
+        return False
+    return _writes.search(body) is None
+
+
+class CachedSQLDatabase(SQLDatabase):
+    """SQLDatabase that caches the schema description and read-only query results."""
+
+    def __init__(self, *args, result_ttl: float = SQL_RESULT_TTL, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._results = TTLCache(max_size=SQL_RESULT_CACHE_SIZE, ttl=result_ttl)
+        self._table_info = {}
+
+    def get_table_info(self, table_names=None) -> str:
+        key = tuple(sorted(table_names)) if table_names else None
+        info = self._table_info.get(key)
+        if info is None:
+            info = super().get_table_info(table_names)
+            self._table_info[key] = info
+        return info
+
+    def _execute(self, command, fetch="all", **kwargs):
+        # Every query path (run, run_no_throw, fetch_rows) goes through here
+        # Data-modifying CTEs (WITH d AS (DELETE ... RETURNING ...)) must reach the database every time
+        sql = str(command).strip()
+        if fetch == "cursor" or not is_read_only(sql):
+            return super()._execute(command, fetch, **kwargs)
+
+        key = (" ".join(sql.split()), fetch, repr(sorted(kwargs.items())))
+        result = self._results.get(key)
+        if result is MISSING:
+            with span("sql_query"):
+                result = super()._execute(command, fetch, **kwargs)
+            self._results.set(key, result)
+        return result
+
+    def fetch_rows(self, sql: str, limit: int = 50, parameters: dict = None):
+        """
+        Column names and up to limit row tuples of a read-only query, from the
+        result cache. The limit is applied in SQL, so a query without one never
+        pulls the whole table into memory.
+        """
+        if not is_read_only(sql):
+            raise ValueError("fetch_rows only runs a single SELECT / WITH query")
+        # The newline keeps a trailing -- comment from swallowing the wrapper
+        limited = f"SELECT * FROM (\n{sql.strip().rstrip(';')}\n) AS q LIMIT {int(limit)}"
+        records = self._execute(limited, parameters=parameters) if parameters else self._execute(limited)
+        if not records:
+            return [], []
+        columns = list(records[0].keys())
+        return columns, [tuple(record[c] for c in columns) for record in records]
+
+    def clear_cache(self):
+        self._results.clear()
+        self._table_info.clear()
+
+
 def data_config():
-    db = SQLDatabase.from_uri(mysql_url)
-    return db
\ No newline at end of file
+    """Process-wide SQLDatabase on the pooled engine; the schema is reflected once."""
+    global _db
+    if _db is None:
+        with _engine_lock:
+            if _db is None:
+                # The pgvector and rollup tables are not part of the analytics schema;
+                # SQLDatabase rejects ignore_tables that do not exist (yet)
+                engine = get_engine()
+                existing = set(inspect(engine).get_table_names())
+                _db = CachedSQLDatabase(
+                    engine,
+                    ignore_tables=[t for t in INTERNAL_TABLES if t in existing],
+                )
+    return _db
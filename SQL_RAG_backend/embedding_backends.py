@@ -0,0 +1,155 @@
+"""
+CPU inference backends for the sentence-transformers embedding model.
+
+    torch       HuggingFaceEmbeddings (sentence-transformers on PyTorch)
+    torch-int8  the same model with its Linear layers dynamically quantised to int8
+    onnx        the ONNX export shipped in the model repo, on ONNX Runtime
+    onnx-int8   the int8-quantised ONNX export from the same repo
+
+Every backend returns mean-pooled, L2-normalised vectors, like the model's
+own sentence-transformers pipeline, so they can query the same index.
+"""
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from .cache import TTLCache, MISSING
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+# Lowest acceptable cosine with the "torch" reference, per precision
+MIN_COSINE = {"torch": 0.9999, "onnx": 0.999, "torch-int8": 0.97, "onnx-int8": 0.97}
+ONNX_FILES = {
+    "onnx": os.getenv("EMBEDDING_ONNX_FILE", "onnx/model.onnx"),
+    # AVX2 is the lowest common denominator of our CPU boxes
+    "onnx-int8": os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx"),
+}
+# all-MiniLM-L6-v2 truncates inputs at 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+
+def unit_vectors(vectors) -> np.ndarray:
+    """L2-normalise one vector or the rows of a matrix (zero vectors stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12, None)
+
+
+class OnnxSentenceEncoder:
+    """Tokenizer plus an ONNX Runtime session, with a SentenceTransformer-like encode()."""
+
+    def __init__(self, model_name: str, onnx_file: str, threads: int = 0,
+                 max_seq_length: int = MAX_SEQ_LENGTH):
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            hf_hub_download(model_name, onnx_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.max_seq_length = max_seq_length
+
+    def _encode_batch(self, texts: list) -> np.ndarray:
+        features = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        feed = {}
+        for name in self.input_names:
+            if name in features:
+                feed[name] = features[name].astype(np.int64)
+            elif name == "token_type_ids":
+                feed[name] = np.zeros_like(features["input_ids"], dtype=np.int64)
+        hidden = self.session.run(None, feed)[0]
+
+        mask = features["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return unit_vectors(pooled)
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Batches of similar length waste less compute on padding
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        result = None
+        for i in range(0, len(texts), batch_size):
+            idx = order[i:i + batch_size]
+            vectors = self._encode_batch([texts[j] for j in idx])
+            if result is None:
+                result = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            result[idx] = vectors
+        return result[0] if single else result
+
+
+class EncoderEmbeddings(Embeddings):
+    """LangChain Embeddings over any client with a SentenceTransformer-style encode()."""
+
+    def __init__(self, client, batch_size: int = 32):
+        self.client = client
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts):
+        return self.client.encode(list(texts), batch_size=self.batch_size).tolist()
+
+    def embed_query(self, text: str):
+        return self.client.encode([text])[0].tolist()
+
+
+class QueryCacheEmbeddings(Embeddings):
+    """Keeps the vectors of recent queries; documents always go to the model."""
+
+    def __init__(self, inner, max_size: int = 1024):
+        self.inner = inner
+        self._queries = TTLCache(max_size=max_size)
+
+    @property
+    def client(self):
+        # embedding_pipeline.Encoder batches through the underlying model
+        return self.inner.client
+
+    def embed_documents(self, texts):
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str):
+        vector = self._queries.get(text)
+        if vector is MISSING:
+            vector = tuple(self.inner.embed_query(text))
+            self._queries.set(text, vector)
+        return list(vector)
+
+    def stats(self) -> dict:
+        return self._queries.stats()
+
+
+def make_embeddings(model_name: str, backend: str = "torch", threads: int = 0):
+    """Build the Embeddings object for one backend; threads=0 keeps the runtime default."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {BACKENDS}")
+
+    if backend.startswith("onnx"):
+        return EncoderEmbeddings(OnnxSentenceEncoder(model_name, ONNX_FILES[backend], threads))
+
+    import torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    if threads:
+        torch.set_num_threads(threads)
+    embeddings = HuggingFaceEmbeddings(model_name=model_name)
+    if backend == "torch-int8":
+        torch.quantization.quantize_dynamic(
+            embeddings.client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    return embeddings
@@ -0,0 +1,47 @@
+"""Gunicorn settings: gunicorn -c SQL_RAG_backend/gunicorn.conf.py SQL_RAG_backend.wsgi:app"""
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+# Each worker is a full process (own torch runtime, DB pool, chat executor);
+# threads serve concurrent requests inside it while the LLM / DB calls block
+workers = int(os.getenv("GUNICORN_WORKERS", str(min(4, multiprocessing.cpu_count()))))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+
+# Split the cores between workers so their embedding runtimes do not oversubscribe
+os.environ.setdefault("EMBEDDING_THREADS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+# A chat request may wait for both pipelines (see RAG_TIMEOUT / SQL_TIMEOUT)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Import the app (and load the embedding model) once in the master, then fork
+preload_app = True
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Connections opened by the master while preloading must not be shared
+    from SQL_RAG_backend.database_config import dispose_after_fork
+
+    dispose_after_fork()
+
+
+def post_worker_init(worker):
+    # Inference thread pools do not survive fork, so the first embedding runs
+    # here, in the worker, before it accepts traffic
+    from SQL_RAG_backend.api import warm_up_worker
+
+    try:
+        worker.log.info("Worker %s warmed up: %s", worker.pid, warm_up_worker())
+    except Exception as e:
+        # Stay up; /health/ready keeps retrying and reports 503 until it passes
+        worker.log.warning("Worker %s warm-up failed: %s", worker.pid, e)
@@ -0,0 +1,191 @@
+"""
+ANN index lifecycle for the pgvector collections.
+
+langchain_postgres stores every collection in one table with an
+untyped `vector` column, so each collection gets a partial index over
+`embedding::vector(384)` restricted to its collection_id. The index is
+built on the shadow collection before it is swapped in, and indexes of
+collections that no longer exist are dropped afterwards.
+
+    python -m SQL_RAG_backend.indexing_store_.ann_index create
+    python -m SQL_RAG_backend.indexing_store_.ann_index bench --k 5 --queries 200
+"""
+import argparse
+import os
+import statistics
+import time
+from sqlalchemy import text
+from ..database_config import get_engine
+from ..vectordb import (
+    ann_search,
+    index_version,
+    COLLECTION_NAME,
+    EMBEDDING_DIM,
+)
+
+ANN_INDEX_TYPE = os.getenv("ANN_INDEX_TYPE", "hnsw")  # hnsw | ivfflat
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+INDEX_PREFIX = "ix_ann_"
+
+
+def index_name(collection_id: str) -> str:
+    return INDEX_PREFIX + collection_id.replace("-", "")
+
+
+def create_ann_index(collection_name: str = COLLECTION_NAME, index_type: str = ANN_INDEX_TYPE,
+                     m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION, lists: int = None):
+    """Create the partial ANN index for a collection if it is missing. Returns its name."""
+    collection_id = index_version(collection_name)
+    if collection_id is None:
+        print(f"⚠️ Collection {collection_name!r} not found, no ANN index created")
+        return None
+
+    name = index_name(collection_id)
+    column = f"(embedding::vector({EMBEDDING_DIM}))"
+
+    with get_engine().begin() as conn:
+        if index_type == "ivfflat":
+            if lists is None:
+                rows = conn.execute(
+                    text("SELECT count(*) FROM langchain_pg_embedding WHERE collection_id = :cid"),
+                    {"cid": collection_id},
+                ).scalar()
+                # pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) above
+                lists = max(10, rows // 1000 if rows <= 1_000_000 else int(rows ** 0.5))
+            method = f"ivfflat ({column} vector_cosine_ops) WITH (lists = {int(lists)})"
+        else:
+            method = (
+                f"hnsw ({column} vector_cosine_ops) "
+                f"WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+            )
+
+        start = time.perf_counter()
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {name} ON langchain_pg_embedding "
+            f"USING {method} WHERE collection_id = '{collection_id}'"
+        ))
+        conn.execute(text("ANALYZE langchain_pg_embedding"))
+
+    print(f"🧭 ANN index {name} ({index_type}) ready in {time.perf_counter() - start:.1f}s")
+    return name
+
+
+def drop_ann_index(collection_name: str = COLLECTION_NAME):
+    collection_id = index_version(collection_name)
+    if collection_id is None:
+        return
+    with get_engine().begin() as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index_name(collection_id)}"))
+
+
+def rebuild_ann_index(collection_name: str = COLLECTION_NAME, **kwargs):
+    drop_ann_index(collection_name)
+    return create_ann_index(collection_name, **kwargs)
+
+
+def drop_stale_ann_indexes() -> list:
+    """Drop ANN indexes whose collection was deleted or replaced."""
+    with get_engine().begin() as conn:
+        live = {
+            index_name(str(row[0]))
+            for row in conn.execute(text("SELECT uuid FROM langchain_pg_collection"))
+        }
+        existing = [
+            row[0] for row in conn.execute(
+                text(
+                    "SELECT indexname FROM pg_indexes "
+                    "WHERE tablename = 'langchain_pg_embedding' AND indexname LIKE :prefix"
+                ),
+                {"prefix": INDEX_PREFIX + "%"},
+            )
+        ]
+        stale = [name for name in existing if name not in live]
+        for name in stale:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    return stale
+
+
+def sample_query_vectors(n: int, collection_name: str = COLLECTION_NAME) -> list:
+    """Stored embeddings used as benchmark queries (no model needed)."""
+    with get_engine().connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT e.embedding::text FROM langchain_pg_embedding e "
+                "JOIN langchain_pg_collection c ON e.collection_id = c.uuid "
+                "WHERE c.name = :name ORDER BY random() LIMIT :n"
+            ),
+            {"name": collection_name, "n": n},
+        )
+        return [[float(x) for x in row[0].strip("[]").split(",")] for row in rows]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def benchmark(k: int = 5, n_queries: int = 100, ef_values=(20, 40, 80, 160),
+              collection_name: str = COLLECTION_NAME) -> list:
+    """Recall@k against exact search and latency for each ef_search / probes value."""
+    queries = sample_query_vectors(n_queries, collection_name)
+    if not queries:
+        print("⚠️ No embeddings to benchmark")
+        return []
+
+    def run(**knobs):
+        ids, latencies = [], []
+        for q in queries:
+            start = time.perf_counter()
+            hits = ann_search(q, k=k, collection_name=collection_name, **knobs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            ids.append({doc.metadata.get("content_hash") or doc.page_content for doc, _ in hits})
+        return ids, latencies
+
+    truth, exact_ms = run(exact=True)
+    report = [{
+        "mode": "exact",
+        "recall_at_k": 1.0,
+        "p50_ms": round(statistics.median(exact_ms), 2),
+        "p95_ms": round(_percentile(exact_ms, 95), 2),
+    }]
+
+    for value in ef_values:
+        found, latencies = run(ef_search=value, probes=max(1, value // 4))
+        recall = statistics.mean(
+            len(f & t) / len(t) for f, t in zip(found, truth) if t
+        )
+        report.append({
+            "mode": f"ef_search={value} / probes={max(1, value // 4)}",
+            "recall_at_k": round(recall, 4),
+            "p50_ms": round(statistics.median(latencies), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+        })
+
+    for row in report:
+        print(f"  {row['mode']:<28} recall@{k}={row['recall_at_k']:<7} "
+              f"p50={row['p50_ms']}ms p95={row['p95_ms']}ms")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the pgvector ANN index")
+    parser.add_argument("action", choices=["create", "rebuild", "drop-stale", "bench"])
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--type", default=ANN_INDEX_TYPE, choices=["hnsw", "ivfflat"])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.action == "create":
+        create_ann_index(args.collection, index_type=args.type)
+    elif args.action == "rebuild":
+        rebuild_ann_index(args.collection, index_type=args.type)
+    elif args.action == "drop-stale":
+        print(f"🗑️  Dropped: {drop_stale_ann_indexes()}")
+    else:
+        benchmark(k=args.k, n_queries=args.queries, collection_name=args.collection)
+
+
+if __name__ == "__main__":
+    main()
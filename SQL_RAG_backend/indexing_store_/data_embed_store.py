@@ -1,52 +1,175 @@
-from ..vectordb import get_vectordb
-import math
+from ..vectordb import (
+    get_vectordb,
+    collection_hashes,
+    copy_embeddings,
+    carry_over_chunks,
+    swap_collection,
+    ensure_text_search_index,
+    index_version,
+    COLLECTION_NAME,
+)
+from ..data_retrival_.answer_cache import answer_cache
+from .ann_index import create_ann_index, drop_stale_ann_indexes
+from .embedding_pipeline import embed_batches, EMBED_BATCH_SIZE
+from collections import namedtuple
+import hashlib
+import re
 
-def embed_store(chunks, batch_size=50):
-    vector_store = get_vectordb()
+SHADOW_COLLECTION = f"{COLLECTION_NAME}__shadow"
+
+
+def chunk_hash(doc) -> str:
+    """Stable id of a chunk: its text plus where it came from."""
+    h = hashlib.sha256()
+    for part in (
+        doc.page_content,
+        doc.metadata.get("source"),
+        doc.metadata.get("page"),
+        doc.metadata.get("start_index"),
+    ):
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+class SourceDone(namedtuple("SourceDone", "source")):
+    """Marker placed in the chunk stream after the last chunk of a source."""
+
+
+class SourceFailed(namedtuple("SourceFailed", "source")):
+    """Marker for a source that could not be loaded; its live chunks are kept."""
+
+
+def embed_store(chunks, batch_size=EMBED_BATCH_SIZE, incremental=True, resume=False, on_checkpoint=None,
+                keep_sources=None):
     """
     Add chunks to vector store with progress printing.
+
+    chunks may be a list or a lazy iterable; it is consumed in bounded
+    batches, so loading, splitting, embedding and writing overlap and
+    memory stays flat. Chunks are written into a shadow collection that
+    replaces the live one in a single transaction, so the chatbot always
+    has an index to query.
+
+    With incremental=True, chunks whose content hash is already stored are
+    copied over instead of re-embedded, and chunks that no longer exist are
+    simply not carried into the new collection. With resume=True an
+    existing shadow collection is kept and its chunks are skipped.
+    SourceDone markers in the stream are reported to on_checkpoint(sources)
+    once every chunk before them is stored. Sources marked SourceFailed are
+    never checkpointed, and their live chunks are carried over unchanged.
+
+    keep_sources is a regex over the "source" metadata: live chunks whose
+    source matches are carried into the new collection unchanged, so a
+    refresh of some loaders does not drop what the others indexed.
     """
-    if not chunks:
+    if isinstance(chunks, list) and not chunks:
         print("❌ ERROR: No chunks provided")
         return {"success": False, "error": "No chunks provided"}
-    
-    vector_store.delete_collection()
-    vector_store.create_collection()
 
-    total = len(chunks)
-    total_batches = math.ceil(total / batch_size)
+    try:
+        shadow = get_vectordb(SHADOW_COLLECTION)
+        if resume and index_version(SHADOW_COLLECTION):
+            seen = collection_hashes(SHADOW_COLLECTION)
+        else:
+            shadow.delete_collection()
+            shadow.create_collection()
+            seen = set()
+        resumed = len(seen)
 
-    print(f"🚀 Starting embedding")
-    print(f"📦 Total chunks: {total}")
-    print(f"🔢 Batch size: {batch_size}")
-    print(f"🧩 Total batches: {total_batches}\n")
+        live_hashes = collection_hashes(COLLECTION_NAME) if incremental else set()
+        counts = {"reused": 0}
+        failed = []
 
-    try:
-        added = 0
+        print(f"🚀 Starting embedding ({'incremental' if incremental else 'full'})")
+        print(f"🔢 Batch size: {batch_size}")
+        if resumed:
+            print(f"⏯️  Resuming with {resumed} chunks already in the shadow collection")
+        print()
+
+        def take_new(batch):
+            # Reusable vectors are copied in SQL; only the rest is embedded
+            reusable = {doc.metadata["content_hash"] for doc in batch} & live_hashes
+            counts["reused"] += copy_embeddings(COLLECTION_NAME, SHADOW_COLLECTION, reusable)
+            return [doc for doc in batch if doc.metadata["content_hash"] not in reusable]
+
+        def batches():
+            batch, finished = [], []
+            for item in chunks:
+                if isinstance(item, SourceDone):
+                    finished.append(item.source)
+                    continue
+                if isinstance(item, SourceFailed):
+                    failed.append(item.source)
+                    continue
+
+                # Hash and de-duplicate
+                digest = chunk_hash(item)
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                item.metadata["content_hash"] = digest
+                batch.append(item)
+
+                if len(batch) >= batch_size:
+                    yield take_new(batch), finished
+                    batch, finished = [], []
+            if batch or finished:
+                yield take_new(batch), finished
+
+        def stored_batch(added, finished):
+            print(f"   ✅ Stored {added} new chunks, reused {counts['reused']} "
+                  f"({len(seen)} total)")
+            if finished and on_checkpoint:
+                on_checkpoint(finished)
+
+        added = embed_batches(batches(), SHADOW_COLLECTION, batch_size=batch_size, on_stored=stored_batch)
+        print()
+
+        kept = set()
+        if failed:
+            exact = "^(" + "|".join(re.escape(source) for source in failed) + ")$"
+            keep_sources = f"({keep_sources})|{exact}" if keep_sources else exact
+            print(f"⚠️  {len(failed)} sources failed to load; keeping their current chunks")
+        if keep_sources:
+            kept = carry_over_chunks(COLLECTION_NAME, SHADOW_COLLECTION, keep_sources)
+            seen |= kept
+
+        if not seen:
+            print("❌ ERROR: No chunks provided")
+            return {"success": False, "error": "No chunks provided"}
 
-        for i in range(0, total, batch_size):
-            batch = chunks[i:i + batch_size]
-            batch_no = (i // batch_size) + 1
+        removed = len(live_hashes - seen)
+        print(f"📦 Total chunks: {len(seen)}")
+        print(f"♻️  Reused chunks: {counts['reused']}")
+        if keep_sources:
+            print(f"📌 Kept from other sources: {len(kept)}")
+        print(f"🧹 Removed chunks: {removed}")
+        print(f"🆕 Embedded chunks: {added}")
 
-            print(f"➡️  Processing batch {batch_no}/{total_batches} "
-                  f"({i+1}–{min(i+batch_size, total)})")
+        # Build the ANN index before the swap so queries never hit an unindexed collection
+        create_ann_index(SHADOW_COLLECTION)
 
-            vector_store.add_documents(batch)
-            added += len(batch)
+        swap_collection(SHADOW_COLLECTION, COLLECTION_NAME)
+        print("🔁 Shadow collection swapped in")
 
-            print(f"   ✅ Stored {added}/{total} chunks\n")
+        drop_stale_ann_indexes()
+        ensure_text_search_index()
 
+        # Answers cached in this process refer to the old collection
+        answer_cache.invalidate()
 
         print("🎉 Embedding completed successfully!")
 
         return {
             "success": True,
             "chunks_added": added,
+            "chunks_reused": counts["reused"],
+            "chunks_kept": len(kept),
+            "chunks_removed": removed,
+            "sources_failed": failed,
         }
 
     except Exception as e:
         print(f"❌ ERROR during embedding: {e}")
         return {"success": False, "error": str(e)}
-    
-if __name__ == "__main__":
-    print(getSqlUrl())
\ No newline at end of file
@@ -1,10 +1,133 @@
-from SQL_RAG_backend.indexing_store_.web_loader import load_docs 
-from SQL_RAG_backend.indexing_store_.pdf_loader import load_pdfs
-from .data_splitter import split_docs 
-from .data_embed_store import embed_store
-
-web_docs = load_docs()
-pdf_docs = load_pdfs()
-docs = web_docs + pdf_docs
-chunks = split_docs(docs)
-res = embed_store(chunks)
\ No newline at end of file
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from SQL_RAG_backend.indexing_store_.web_loader import iter_docs
+from SQL_RAG_backend.indexing_store_.pdf_loader import iter_pdfs
+from .data_splitter import iter_split_docs
+from .data_embed_store import embed_store, SourceDone, SourceFailed, SHADOW_COLLECTION
+from ..vectordb import index_version
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_PATH = os.getenv("INDEX_CHECKPOINT_PATH", os.path.join(BASE_DIR, ".index_checkpoint.json"))
+# Loaded-but-not-yet-split sources buffered between the loader thread and the pipeline
+LOADER_PREFETCH = int(os.getenv("LOADER_PREFETCH", "4"))
+
+# Default run order: the fast web loader first, so vectors are stored while
+# the slow hi-res PDF extraction is still ahead
+SOURCES = {
+    "web": iter_docs,
+    "pdf": iter_pdfs,
+}
+# What each loader's chunks carry as "source" metadata (URLs, PDF file names)
+SOURCE_PATTERNS = {
+    "web": r"^https?://",
+    "pdf": r"\.pdf$",
+}
+
+
+def read_checkpoint() -> set:
+    """Sources already stored in the current shadow collection."""
+    try:
+        with open(CHECKPOINT_PATH, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    if checkpoint.get("shadow") != index_version(SHADOW_COLLECTION):
+        return set()
+    return set(checkpoint.get("sources_done", []))
+
+
+def write_checkpoint(done: set):
+    tmp = CHECKPOINT_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"shadow": index_version(SHADOW_COLLECTION), "sources_done": sorted(done)}, f)
+    os.replace(tmp, CHECKPOINT_PATH)
+
+
+def prefetch(iterable, maxsize: int = LOADER_PREFETCH):
+    """Run an iterator in a background thread, at most maxsize items ahead."""
+    buffer = queue.Queue(maxsize=maxsize)
+    done = object()
+
+    def produce():
+        try:
+            for item in iterable:
+                buffer.put(item)
+            buffer.put(done)
+        except BaseException as e:
+            buffer.put(e)
+
+    threading.Thread(target=produce, name="loader", daemon=True).start()
+    while True:
+        item = buffer.get()
+        if item is done:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+def iter_chunks(sources, skip=(), stats=None, use_cache=True):
+    """
+    Loaders → splitter → filter as one lazy stream, with a SourceDone marker
+    per source, or SourceFailed for one the loader could not load.
+    """
+    for name in sources:
+        loader = SOURCES[name]
+        loaded = loader(use_cache=use_cache, skip=skip) if name == "web" else loader(skip=skip)
+        for source, docs in prefetch(loaded):
+            if docs is None:
+                yield SourceFailed(source)
+                continue
+            yield from iter_split_docs(docs, stats)
+            yield SourceDone(source)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the chatbot's vector index")
+    parser.add_argument("--sources", nargs="+", choices=list(SOURCES), default=list(SOURCES),
+                        help="which loaders to run, in this order (default: all, web first)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="load, split and filter only; print counts without embedding")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its checkpoint")
+    parser.add_argument("--full", action="store_true",
+                        help="re-embed everything instead of reusing unchanged chunks")
+    parser.add_argument("--no-web-cache", action="store_true",
+                        help="ignore the on-disk HTTP cache")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = {}
+    done = read_checkpoint() if args.resume else set()
+    if done:
+        print(f"⏯️  Skipping {len(done)} sources from the checkpoint")
+
+    chunks = iter_chunks(args.sources, skip=done, stats=stats, use_cache=not args.no_web_cache)
+
+    if args.dry_run:
+        sources = sum(1 for item in chunks if isinstance(item, SourceDone))
+        print(f"\n🧪 Dry run: {sources} sources, {stats.get('documents', 0)} documents, "
+              f"{stats.get('raw', 0)} raw chunks, {stats.get('kept', 0)} kept, "
+              f"{stats.get('dropped', 0)} dropped")
+        return
+
+    def checkpoint(finished):
+        done.update(finished)
+        write_checkpoint(done)
+
+    # Loaders left out of --sources keep their chunks in the new collection
+    keep = "|".join(f"({SOURCE_PATTERNS[name]})" for name in sorted(SOURCES) if name not in args.sources)
+    res = embed_store(chunks, incremental=not args.full, resume=args.resume, on_checkpoint=checkpoint,
+                      keep_sources=keep or None)
+    if res.get("success") and os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+
+    print(f"\n⏱️  Indexing finished in {time.perf_counter() - start:.1f}s: {res}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,47 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from .text_filters import drop_reason, RULES
 
 
-def is_good_chunk(text: str) -> bool:
-    """Filter chunks to ensure RAG quality. Less aggressive than before."""
-    words = text.split()
-
-    # 1️⃣ Drop tiny chunks (lowered from 30 to 20 words)
-    if len(words) < 20:
-        return False
-
-    # 2️⃣ Drop navigation-heavy chunks (lowered from 3 to 5 short lines)
-    short_lines = sum(
-        1 for line in text.splitlines()
-        if 1 <= len(line.split()) <= 3
+def make_splitter():
+    return RecursiveCharacterTextSplitter(
+        chunk_size=800,          # ≈130 words
+        chunk_overlap=100,
+        separators=["\n\n", "\n", ". ", " "],
+        add_start_index=True,
     )
-    if short_lines >= 5:
-        return False
 
-    # 3️⃣ Drop chunks without enough punctuation (lowered from 2 to 1 period)
-    if text.count(".") < 1:
-        return False
 
-    # 4️⃣ Drop CTA / instruction-like chunks
-    if any(
-        phrase in text.lower()
-        for phrase in ["scroll", "read more", "learn more", "explore", "click here"]
-    ):
-        return False
-    
-    # 5️⃣ Drop code-like or overly formatted chunks (usually noise)
-    if text.count("{") > 5 or text.count("[") > 10:
-        return False
-
-    return True
+def iter_split_docs(docs, stats: dict = None):
+    """
+    Split and filter documents lazily, one document at a time.
+
+    Kept chunks are yielded as soon as their document is split; stats
+    (if given) is updated with raw/kept/dropped counts.
+    """
+    text_splitter = make_splitter()
+    if stats is None:
+        stats = {}
+    for key in ("documents", "raw", "kept", "dropped"):
+        stats.setdefault(key, 0)
+    dropped_by = stats.setdefault("dropped_by", dict.fromkeys(RULES, 0))
+
+    for doc in docs:
+        stats["documents"] += 1
+        for split in text_splitter.split_documents([doc]):
+            stats["raw"] += 1
+            text = split.page_content
+            words = len(text.split())
+            reason = drop_reason(text, words)
+            if reason is None:
+                split.metadata.update({
+                    "chunk_size": len(text),
+                    "chunk_words": words
+                })
+                stats["kept"] += 1
+                yield split
+            else:
+                stats["dropped"] += 1
+                dropped_by[reason] += 1
 
 
 def split_docs(docs):
@@ -41,38 +50,14 @@ def split_docs(docs):
     print(f"📄 Starting document splitting")
     print(f"🔹 Input documents: {len(docs)}")
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,          # ≈130 words
-        chunk_overlap=100,
-        separators=["\n\n", "\n", ". ", " "],
-        add_start_index=True,
-    )
-
-    # Step 1: Split
-    all_splits = text_splitter.split_documents(docs)
-    print(f"✂️  Raw chunks created: {len(all_splits)}")
-
-    # Step 2: Filter
-    chunks = []
-    dropped = 0
-
-    total = len(all_splits)
-    for i, split in enumerate(all_splits, 1):
-        if is_good_chunk(split.page_content):
-            split.metadata.update({
-                "chunk_size": len(split.page_content),
-                "chunk_words": len(split.page_content.split())
-            })
-            chunks.append(split)
-        else:
-            dropped += 1
-
-        # Progress print (every 10% or last item)
-        if i % max(1, total // 10) == 0 or i == total:
-            print(f"  🔄 Filtering progress: {i}/{total}")
+    stats = {}
+    chunks = list(iter_split_docs(docs, stats))
 
+    print(f"✂️  Raw chunks created: {stats['raw']}")
     print(f"✅ Chunk filtering complete")
-    print(f"📦 Kept chunks: {len(chunks)}")
-    print(f"🗑️  Dropped chunks: {dropped}")
+    print(f"📦 Kept chunks: {stats['kept']}")
+    print(f"🗑️  Dropped chunks: {stats['dropped']}")
+    for rule, count in stats["dropped_by"].items():
+        print(f"   - {rule}: {count}")
 
     return chunks
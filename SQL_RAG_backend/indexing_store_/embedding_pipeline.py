@@ -0,0 +1,237 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+import numpy as np
+from ..database_config import get_engine
+from ..vectordb import get_embeddings, index_version, to_vector_literal, EMBEDDING_CACHE_KEY
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+# Worker processes for sentence-transformers; 0 or 1 encodes in-process
+EMBED_PROCESSES = int(os.getenv("EMBED_PROCESSES", "0"))
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", os.path.join(BASE_DIR, ".embedding_cache.sqlite")
+)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embeddings keyed by (model name, text hash)."""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, model: str = EMBEDDING_CACHE_KEY):
+        self.model = model
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, hashes) -> dict:
+        found = {}
+        hashes = list(hashes)
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(hashes), 500):
+                part = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    "SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN "
+                    f"({','.join('?' * len(part))})",
+                    [self.model, *part],
+                )
+                for digest, blob in rows:
+                    found[digest] = np.frombuffer(blob, dtype=np.float32)
+        self.hits += len(found)
+        self.misses += len(set(hashes)) - len(found)
+        return found
+
+    def put_many(self, items):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(self.model, digest, np.asarray(vec, dtype=np.float32).tobytes()) for digest, vec in items],
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class Encoder:
+    """
+    sentence-transformers encoder for bulk indexing.
+
+    Reuses the model already loaded by the vectordb registry. With
+    processes > 1 it starts a multi-process pool, one CPU worker each.
+    """
+
+    def __init__(self, processes: int = EMBED_PROCESSES, batch_size: int = EMBED_BATCH_SIZE):
+        embeddings = get_embeddings()
+        self.model = getattr(embeddings, "client", None) or getattr(embeddings, "_client")
+        self.batch_size = batch_size
+        self.pool = None
+        # ONNX backends have no multi-process pool; they use intra-op threads instead
+        if processes > 1 and hasattr(self.model, "start_multi_process_pool"):
+            self.pool = self.model.start_multi_process_pool(target_devices=["cpu"] * processes)
+
+    def encode(self, texts: list) -> np.ndarray:
+        if self.pool is not None and len(texts) >= self.batch_size:
+            return self.model.encode_multi_process(texts, self.pool, batch_size=self.batch_size)
+        return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+
+    def close(self):
+        if self.pool is not None:
+            self.model.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+
+def encode_with_cache(texts: list, encoder: Encoder, cache: EmbeddingCache) -> list:
+    """Vectors for texts; only texts missing from the cache are encoded (once each)."""
+    hashes = [text_hash(t) for t in texts]
+    vectors = cache.get_many(set(hashes))
+
+    missing = {}
+    for digest, t in zip(hashes, texts):
+        if digest not in vectors:
+            missing.setdefault(digest, t)
+
+    if missing:
+        encoded = encoder.encode(list(missing.values()))
+        fresh = list(zip(missing.keys(), encoded))
+        cache.put_many(fresh)
+        vectors.update(fresh)
+
+    return [vectors[digest] for digest in hashes]
+
+
+def copy_rows(collection_id: str, docs: list, vectors: list):
+    """Bulk-insert documents and their vectors into pgvector with COPY."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for doc, vec in zip(docs, vectors):
+        writer.writerow([
+            str(uuid.uuid4()),
+            collection_id,
+            to_vector_literal(vec),
+            doc.page_content,
+            json.dumps(doc.metadata, default=str),
+        ])
+    buf.seek(0)
+
+    conn = get_engine().raw_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.copy_expert(
+                "COPY langchain_pg_embedding (id, collection_id, embedding, document, cmetadata) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buf,
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def embed_batches(batches, collection_name: str, batch_size: int = EMBED_BATCH_SIZE,
+                  processes: int = EMBED_PROCESSES, on_stored=None) -> int:
+    """
+    Encode batches of documents and store them in a collection.
+
+    batches yields (documents, tag) pairs and may be a lazy pipeline: it
+    is pulled from a background thread that also encodes, while the main
+    thread COPYs the previous batch. The queue between the two holds at
+    most two batches, which throttles the upstream stages.
+    on_stored(stored_total, tag) is called after each batch is written.
+
+    If storing fails, the encoder thread is stopped and joined (and the
+    batches pipeline closed) before the encoder and the cache are closed.
+    """
+    collection_id = index_version(collection_name)
+    if collection_id is None:
+        raise ValueError(f"Collection {collection_name!r} does not exist")
+
+    encoder = Encoder(processes=processes, batch_size=batch_size)
+    cache = EmbeddingCache()
+    encoded = queue.Queue(maxsize=2)
+    done = object()
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Never block for good on a consumer that has given up
+        while not stop.is_set():
+            try:
+                encoded.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for docs, tag in batches:
+                if stop.is_set():
+                    return
+                vectors = encode_with_cache([d.page_content for d in docs], encoder, cache) if docs else []
+                if not put((docs, vectors, tag)):
+                    return
+            put(done)
+        except BaseException as e:
+            put(e)
+        finally:
+            # Let the loaders and splitter upstream release their resources
+            close = getattr(batches, "close", None)
+            if close is not None:
+                close()
+
+    worker = threading.Thread(target=produce, name="embed-encoder", daemon=True)
+    worker.start()
+
+    stored = 0
+    try:
+        while True:
+            item = encoded.get()
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            docs, vectors, tag = item
+            if docs:
+                copy_rows(collection_id, docs, vectors)
+                stored += len(docs)
+            if on_stored:
+                on_stored(stored, tag)
+    finally:
+        stop.set()
+        while worker.is_alive():
+            # Unblock a put() that raced with stop and wait for the current batch
+            try:
+                encoded.get_nowait()
+            except queue.Empty:
+                worker.join(timeout=0.1)
+        encoder.close()
+        print(f"   🗄️  Embedding cache: {cache.hits} hits, {cache.misses} misses")
+        cache.close()
+
+    return stored
+
+
+def embed_documents(docs: list, collection_name: str, batch_size: int = EMBED_BATCH_SIZE,
+                    processes: int = EMBED_PROCESSES, progress=None) -> int:
+    """Encode a list of documents and store them in a collection."""
+    batches = (
+        (docs[i:i + batch_size], None) for i in range(0, len(docs), batch_size)
+    )
+    on_stored = (lambda stored, _: progress(stored, len(docs))) if progress else None
+    return embed_batches(batches, collection_name, batch_size, processes, on_stored)
@@ -1,58 +1,155 @@
 import os
+import hashlib
+from collections import deque
 import fitz
 from PIL import Image
 import pytesseract
 from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
 from langchain_core.documents import Document
 from langchain_community.document_loaders import UnstructuredPDFLoader
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PDF_DIR = os.path.join(BASE_DIR, "..", "..", "Pdfs")
 
-print("PDF directory:", PDF_DIR)
-
-
-def load_pdfs():
-    all_docs = []
-
-    for filename in os.listdir(PDF_DIR):
-        if not filename.lower().endswith(".pdf"):
-            continue
-
-        pdf_path = os.path.join(PDF_DIR, filename)
-        print(f"\nProcessing: {pdf_path}")
-
-        # --- Load normal extracted text ---
-        loader = UnstructuredPDFLoader(
-            pdf_path,
-            strategy="hi_res",
-            extract_images_in_pdf=False
-        )
-
-        text_docs = loader.load()
+# OCR settings
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_MIN_PIXELS = int(os.getenv("OCR_MIN_PIXELS", "4096"))  # e.g. 64x64
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join(BASE_DIR, ".ocr_cache"))
+# PDFs whose images are queued for OCR ahead of the one being extracted
+OCR_LOOKAHEAD = int(os.getenv("OCR_LOOKAHEAD", "1"))
 
-        # --- Open PDF to read embedded images ---
-        pdf = fitz.open(pdf_path)
-        image_docs = []
-
-        for page_index, page in enumerate(pdf):
-            for _, img in enumerate(page.get_images()):
-                xref = img[0]
-                pix = fitz.Pixmap(pdf, xref)
-
-                # Convert to RGB if needed
-                if pix.n > 3:
-                    pix = fitz.Pixmap(fitz.csRGB, pix)
-
-                # Convert pixmap to bytes (NO FILE SAVED)
-                img_bytes = pix.tobytes("png")
-                image_stream = BytesIO(img_bytes)
+print("PDF directory:", PDF_DIR)
 
-                # Open image directly from memory
-                pil_img = Image.open(image_stream)
 
-                # OCR
-                ocr_text = pytesseract.image_to_string(pil_img)
+def ocr_image(img_bytes: bytes) -> str:
+    """OCR one PNG image. Runs inside a worker process."""
+    return pytesseract.image_to_string(Image.open(BytesIO(img_bytes)))
+
+
+def _cache_path(digest: str) -> str:
+    return os.path.join(OCR_CACHE_DIR, f"{digest}.txt")
+
+
+def read_ocr_cache(digest: str):
+    try:
+        with open(_cache_path(digest), encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_ocr_cache(digest: str, text: str):
+    os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+    tmp = f"{_cache_path(digest)}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, _cache_path(digest))
+
+
+def collect_images(pdf_path: str) -> list:
+    """
+    Unique embedded images of a PDF as (page_number, digest, png_bytes).
+
+    Images are de-duplicated by xref and by content hash (a logo repeated
+    on every page is returned once). Tiny and single-colour images are
+    skipped.
+    """
+    pdf = fitz.open(pdf_path)
+    seen_xrefs = set()
+    seen_digests = set()
+    images = []
+    skipped = 0
+
+    for page_index, page in enumerate(pdf):
+        for img in page.get_images():
+            xref = img[0]
+            if xref in seen_xrefs:
+                continue
+            seen_xrefs.add(xref)
+
+            pix = fitz.Pixmap(pdf, xref)
+            if pix.width * pix.height < OCR_MIN_PIXELS or getattr(pix, "is_unicolor", False):
+                skipped += 1
+                continue
+
+            # Convert to RGB if needed
+            if pix.n > 3:
+                pix = fitz.Pixmap(fitz.csRGB, pix)
+
+            # Convert pixmap to bytes (NO FILE SAVED)
+            img_bytes = pix.tobytes("png")
+            digest = hashlib.sha256(img_bytes).hexdigest()
+            if digest in seen_digests:
+                continue
+            seen_digests.add(digest)
+
+            images.append((page_index + 1, digest, img_bytes))
+
+    pdf.close()
+    print(f"  -> Unique images: {len(images)} (skipped {skipped} tiny/blank)")
+    return images
+
+
+def queue_ocr(pool, pdf_path: str) -> list:
+    """(page, digest, cached text or OCR future) for every unique image of a PDF."""
+    print(f"\nScanning images: {pdf_path}")
+    jobs = []
+    cached = 0
+    for page, digest, img_bytes in collect_images(pdf_path):
+        text = read_ocr_cache(digest)
+        if text is not None:
+            cached += 1
+            jobs.append((page, digest, text))
+        else:
+            jobs.append((page, digest, pool.submit(ocr_image, img_bytes)))
+    print(f"  -> OCR cache hits: {cached}")
+    return jobs
+
+
+def iter_pdfs(skip=()):
+    """
+    Yield (filename, documents) one PDF at a time.
+
+    OCR is queued on the process pool for the current PDF and the next
+    OCR_LOOKAHEAD ones only, so it overlaps with text extraction while the
+    image bytes in flight stay bounded however large the corpus is.
+    Filenames in skip are not processed (used when resuming).
+    """
+    filenames = sorted(
+        f for f in os.listdir(PDF_DIR)
+        if f.lower().endswith(".pdf") and f not in skip
+    )
+
+    with ProcessPoolExecutor(max_workers=OCR_WORKERS) as pool:
+        upcoming = deque(filenames)
+        pending = deque()
+        for filename in filenames:
+            while upcoming and len(pending) <= OCR_LOOKAHEAD:
+                name = upcoming.popleft()
+                pending.append(queue_ocr(pool, os.path.join(PDF_DIR, name)))
+
+            pdf_path = os.path.join(PDF_DIR, filename)
+            print(f"\nProcessing: {pdf_path}")
+
+            # --- Load normal extracted text ---
+            loader = UnstructuredPDFLoader(
+                pdf_path,
+                strategy="hi_res",
+                extract_images_in_pdf=False
+            )
+
+            text_docs = loader.load()
+
+            # --- Collect OCR results for the embedded images ---
+            image_docs = []
+
+            for page, digest, job in pending.popleft():
+                if isinstance(job, str):
+                    ocr_text = job
+                else:
+                    ocr_text = job.result()
+                    write_ocr_cache(digest, ocr_text)
 
                 if not ocr_text.strip():
                     continue
@@ -62,16 +159,23 @@ def load_pdfs():
                         page_content=ocr_text.strip(),
                         metadata={
                             "source": filename,
-                            "page": page_index + 1,
+                            "page": page,
                             "type": "image_ocr"
                         }
                     )
                 )
 
-        print(f"  -> OCR text docs: {len(text_docs)}")
-        print(f"  -> OCR image docs: {len(image_docs)}")
+            print(f"  -> OCR text docs: {len(text_docs)}")
+            print(f"  -> OCR image docs: {len(image_docs)}")
+
+            yield filename, text_docs + image_docs
+
+
+def load_pdfs():
+    all_docs = []
 
-        all_docs.extend(text_docs + image_docs)
+    for _, docs in iter_pdfs():
+        all_docs.extend(docs)
 
     print(f"\nTotal combined docs: {len(all_docs)}")
-    return all_docs
\ No newline at end of file
+    return all_docs
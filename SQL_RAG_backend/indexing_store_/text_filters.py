@@ -0,0 +1,130 @@
+import re
+from collections import Counter
+
+# is_good_chunk thresholds
+MIN_WORDS = 20
+MAX_SHORT_LINES = 5      # this many 1–3 word lines means navigation
+MIN_PERIODS = 1
+MAX_BRACES = 5
+MAX_BRACKETS = 10
+
+# Rules in evaluation order (cheapest first); a dropped chunk is
+# attributed to the first rule it fails.
+RULES = ("too_short", "no_punctuation", "code_like", "call_to_action", "navigation")
+
+CTA_PHRASES = ("scroll", "read more", "learn more", "explore", "click here")
+
+# clean_text patterns
+CTA_LINE = re.compile(r"(read more|learn more|explore|visit website)", re.I)
+MAX_CTA_LINE = len("visit website")
+LEGAL_LINE = re.compile(r"(copyright|©|all rights reserved|privacy|cookies|disclaimer)", re.I)
+LEGAL_TERMS = ("copyright", "all rights reserved", "privacy", "cookies", "disclaimer")
+MULTI_NEWLINES = re.compile(r"\n{3,}")
+MULTI_SPACES = re.compile(r"[ \t]{2,}")
+GLUED_SENTENCES = re.compile(r"([a-z])([A-Z][a-z])")
+
+
+def has_call_to_action(text: str) -> bool:
+    # Lower-casing once and using `in` is several times faster than a
+    # case-insensitive regex over the chunk, and gives the same answer.
+    lowered = text.lower()
+    return any(phrase in lowered for phrase in CTA_PHRASES)
+
+
+def is_legal_line(line: str) -> bool:
+    # ASCII lines take the fast lower() + `in` path; anything else keeps the
+    # regex so Unicode case-folding behaves exactly as before.
+    if line.isascii():
+        lowered = line.lower()
+        return any(term in lowered for term in LEGAL_TERMS)
+    return LEGAL_LINE.search(line) is not None
+
+
+def count_short_lines(text: str, limit: int = None) -> int:
+    """Lines with 1–3 words; stops counting once limit is reached."""
+    count = 0
+    for line in text.splitlines():
+        if 1 <= len(line.split()) <= 3:
+            count += 1
+            if count == limit:
+                break
+    return count
+
+
+def drop_reason(text: str, words: int = None):
+    """Name of the first rule the chunk fails, or None if it is kept."""
+    if (len(text.split()) if words is None else words) < MIN_WORDS:
+        return "too_short"
+    if text.count(".") < MIN_PERIODS:
+        return "no_punctuation"
+    if text.count("{") > MAX_BRACES or text.count("[") > MAX_BRACKETS:
+        return "code_like"
+    if has_call_to_action(text):
+        return "call_to_action"
+    if count_short_lines(text, MAX_SHORT_LINES) >= MAX_SHORT_LINES:
+        return "navigation"
+    return None
+
+
+def is_good_chunk(text: str) -> bool:
+    """Filter chunks to ensure RAG quality. Less aggressive than before."""
+    return drop_reason(text) is None
+
+
+def filter_chunks(texts) -> tuple:
+    """Batch filter: (keep flags, Counter of drop reasons)."""
+    keep = []
+    report = Counter()
+    for text in texts:
+        reason = drop_reason(text)
+        keep.append(reason is None)
+        if reason:
+            report[reason] += 1
+    return keep, report
+
+
+def clean_text(text: str) -> str:
+    cleaned_lines = []
+    short_line_streak = 0
+
+    for line in text.splitlines():
+        line = line.strip()
+
+        # Skip empty lines
+        if not line:
+            short_line_streak = 0
+            continue
+
+        # 1️⃣ Drop very short UI/menu lines
+        if len(line.split()) <= 3:
+            short_line_streak += 1
+            if short_line_streak >= 2:
+                continue
+        else:
+            short_line_streak = 0
+
+        # 2️⃣ Drop navigation-like lines (Title Case & no punctuation)
+        if "." not in line and "," not in line and line.istitle():
+            continue
+
+        # 3️⃣ Drop button / CTA lines
+        if len(line) <= MAX_CTA_LINE and CTA_LINE.fullmatch(line):
+            continue
+
+        # 4️⃣ Drop legal/footer noise
+        if is_legal_line(line):
+            continue
+
+        cleaned_lines.append(line)
+
+    # Rebuild text
+    text = "\n".join(cleaned_lines)
+
+    # 5️⃣ Normalize whitespace
+    text = MULTI_NEWLINES.sub("\n\n", text)
+    text = MULTI_SPACES.sub(" ", text)
+
+    # 6️⃣ Fix glued sentences
+    text = GLUED_SENTENCES.sub(r"\1\n\n\2", text)
+
+    return text.strip()
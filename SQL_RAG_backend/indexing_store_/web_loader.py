@@ -1,69 +1,15 @@
 import os
+import json
+import hashlib
+import threading
+import time
 import requests
-import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 from langchain_core.documents import Document
 from urllib.parse import urlparse
-
-def clean_text(text: str) -> str:
-    lines = text.splitlines()
-
-    cleaned_lines = []
-    short_line_streak = 0
-
-    for line in lines:
-        line = line.strip()
-
-        # Skip empty lines
-        if not line:
-            short_line_streak = 0
-            continue
-
-        word_count = len(line.split())
-
-        # 1️⃣ Drop very short UI/menu lines
-        if word_count <= 3:
-            short_line_streak += 1
-            if short_line_streak >= 2:
-                continue
-        else:
-            short_line_streak = 0
-
-        # 2️⃣ Drop navigation-like lines (Title Case & no punctuation)
-        if (
-            line.istitle()
-            and "." not in line
-            and "," not in line
-        ):
-            continue
-
-        # 3️⃣ Drop button / CTA lines
-        if re.fullmatch(r"(read more|learn more|explore|visit website)", line, re.I):
-            continue
-
-        # 4️⃣ Drop legal/footer noise
-        if re.search(
-            r"(copyright|©|all rights reserved|privacy|cookies|disclaimer)",
-            line,
-            re.I,
-        ):
-            continue
-
-        cleaned_lines.append(line)
-
-    # Rebuild text
-    text = "\n".join(cleaned_lines)
-
-    # 5️⃣ Normalize whitespace
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    text = re.sub(r"[ \t]{2,}", " ", text)
-
-    # 6️⃣ Fix glued sentences
-    text = re.sub(r"([a-z])([A-Z][a-z])", r"\1\n\n\2", text)
-
-    return text.strip()
-
-
+from .text_filters import clean_text
 
 DEFAULT_UA = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -90,23 +36,137 @@ JUNK_SELECTORS = [
     ".footer-wrp",
 ]
 
-def extract_tata_motors_page(url: str, retries: int = 2) -> list:
-    """Extract content from a Tata Motors page with fallback extraction strategies."""
-    
-    documents = []
-    html = None
-    
+# Crawler settings
+WEB_MAX_WORKERS = int(os.environ.get("WEB_MAX_WORKERS", "8"))
+WEB_PER_HOST_LIMIT = int(os.environ.get("WEB_PER_HOST_LIMIT", "4"))
+WEB_HOST_DELAY = float(os.environ.get("WEB_HOST_DELAY", "0.25"))
+WEB_CACHE_DIR = os.environ.get(
+    "WEB_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".web_cache"),
+)
+
+
+def make_session(pool_size: int = WEB_MAX_WORKERS) -> requests.Session:
+    """Keep-alive session whose connection pool fits the worker count."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class HostLimiter:
+    """Per-host politeness: bounded concurrency and a minimum gap between requests."""
+
+    def __init__(self, per_host: int = WEB_PER_HOST_LIMIT, delay: float = WEB_HOST_DELAY):
+        self.per_host = per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._next_start = {}
+
+    def acquire(self, host: str):
+        with self._lock:
+            slot = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        slot.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self, host: str):
+        self._slots[host].release()
+
+
+def _cache_path(url: str) -> str:
+    return os.path.join(WEB_CACHE_DIR, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def _read_cache(url: str):
+    try:
+        with open(_cache_path(url), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(url: str, response):
+    os.makedirs(WEB_CACHE_DIR, exist_ok=True)
+    path = _cache_path(url)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "html": response.text,
+        }, f)
+    os.replace(tmp, path)
+
+
+def fetch_page(url: str, retries: int = 2, session=None, limiter=None, use_cache: bool = False):
+    """
+    Fetch a page's HTML, or None on failure.
+
+    With use_cache, the request is conditional on the cached ETag /
+    Last-Modified and a 304 answer is served from the on-disk cache; if the
+    request fails, the cached copy is returned instead of None.
+    """
+    session = session or make_session(1)
+    host = urlparse(url).netloc
+    cached = _read_cache(url) if use_cache else None
+
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
     # Fetch with retries
     for attempt in range(retries):
+        if limiter:
+            limiter.acquire(host)
         try:
-            response = requests.get(url, headers=HEADERS, timeout=15)
+            response = session.get(url, headers=headers, timeout=15)
+            if response.status_code == 304 and cached:
+                return cached["html"]
             response.raise_for_status()
-            html = response.text
-            break
+            if use_cache:
+                _write_cache(url, response)
+            return response.text
         except requests.RequestException as e:
             if attempt == retries - 1:
+                if cached:
+                    print(f"⚠️ Failed to fetch {url}: {e}; using the cached copy")
+                    return cached["html"]
                 print(f"⚠️ Failed to fetch {url}: {e}")
-                return []
+                return None
+        finally:
+            if limiter:
+                limiter.release(host)
+
+
+def extract_tata_motors_page(url: str, retries: int = 2, session=None, limiter=None,
+                             use_cache: bool = False):
+    """
+    Extract content from a Tata Motors page with fallback extraction strategies.
+
+    Returns None (not []) when the page could not be fetched at all.
+    """
+    html = fetch_page(url, retries, session=session, limiter=limiter, use_cache=use_cache)
+    if html is None:
+        return None
+    return extract_from_html(url, html)
+
+
+def extract_from_html(url: str, html: str) -> list:
+    """Turn a fetched page into section Documents."""
+
+    documents = []
     
     if not html:
         return []
@@ -207,60 +267,95 @@ def normalize_url(url: str) -> str:
     return url.lower()
 
 
-def load_docs(use_cache: bool = False):
-    """Load and extract documents from Tata Motors URLs with deduplication and progress printing."""
+TATA_MOTORS_URLS = [
+    "https://www.tatamotors.com/",
+    'https://www.tatamotors.com/careers/faqs', 
+    'https://www.tatamotors.com/corporate-responsibility/planet-resilience/', 
+    'https://www.tatamotors.com/careers/life-at-tml/',
+    'https://www.tatamotors.com/careers/kaushalya-earn-learn-program/',
+    'https://www.tatamotors.com/blog/a-smarter-vision-for-safer-roads-decoding-advanced-driver-assistance-systems-3/', 
+    'https://www.tatamotors.com/blog/new-era-for-indias-cv-landscape/', 
+    'https://www.tatamotors.com/newsroom', 
+    'https://www.tatamotors.com/careers/life-at-tml', 
+    'https://www.tatamotors.com/blog/defining-new-mobility-for-india/',
+    'https://www.tatamotors.com/blog/2021-recovery-ahead/', 
+    'https://www.tatamotors.com/organisation/our-history/',  
+    'https://www.tatamotors.com/csr-archive',
+    'https://www.tatamotors.com/corporate-responsibility/governance',
+    'https://www.tatamotors.com/blog/developing-software-on-wheels-seamless-technologies-for-the-vehicles-of-tomorrow-2/', 
+    'https://www.tatamotors.com/corporate-responsibility/', 
+    'https://www.tatamotors.com/blog/ownership-in-logistics-newer-opportunities-for-india-in-a-post-covid-world/',
+    'https://www.tatamotors.com/future-of-mobility/', 
+]
+
 
-    raw_urls = [
-        "https://www.tatamotors.com/",
-        'https://www.tatamotors.com/careers/faqs', 
-        'https://www.tatamotors.com/corporate-responsibility/planet-resilience/', 
-        'https://www.tatamotors.com/careers/life-at-tml/',
-        'https://www.tatamotors.com/careers/kaushalya-earn-learn-program/',
-        'https://www.tatamotors.com/blog/a-smarter-vision-for-safer-roads-decoding-advanced-driver-assistance-systems-3/', 
-        'https://www.tatamotors.com/blog/new-era-for-indias-cv-landscape/', 
-        'https://www.tatamotors.com/newsroom', 
-        'https://www.tatamotors.com/careers/life-at-tml', 
-        'https://www.tatamotors.com/blog/defining-new-mobility-for-india/',
-        'https://www.tatamotors.com/blog/2021-recovery-ahead/', 
-        'https://www.tatamotors.com/organisation/our-history/',  
-        'https://www.tatamotors.com/csr-archive',
-        'https://www.tatamotors.com/corporate-responsibility/governance',
-        'https://www.tatamotors.com/blog/developing-software-on-wheels-seamless-technologies-for-the-vehicles-of-tomorrow-2/', 
-        'https://www.tatamotors.com/corporate-responsibility/', 
-        'https://www.tatamotors.com/blog/ownership-in-logistics-newer-opportunities-for-india-in-a-post-covid-world/',
-        'https://www.tatamotors.com/future-of-mobility/', 
-    ]
-
-    print(f"🔹 Raw URLs provided: {len(raw_urls)}")
-
-    # Deduplicate and normalize URLs
-    unique_urls = {}
+def unique_urls(raw_urls: list = TATA_MOTORS_URLS) -> list:
+    """Deduplicate and normalize URLs, keeping the first spelling of each."""
+    unique = {}
     for url in raw_urls:
         normalized = normalize_url(url)
-        if normalized not in unique_urls:
-            unique_urls[normalized] = url
+        if normalized not in unique:
+            unique[normalized] = url
+    return list(unique.values())
 
-    urls = list(unique_urls.values())
 
-    print(f"📌 Deduplication complete: {len(raw_urls)} → {len(urls)} unique URLs\n")
+def iter_docs(use_cache: bool = False, skip=()):
+    """
+    Yield (url, documents) as each page finishes, fastest pages first.
 
-    docs = []
+    documents is None for a page that could not be fetched, so the indexer
+    can keep its previous chunks. URLs in skip are not fetched (used when
+    resuming an indexing run).
+    """
+    urls = [url for url in unique_urls() if url not in skip]
+
+    # Each worker fetches and then extracts, so parsing one page overlaps
+    # with the downloads of the others.
+    session = make_session(WEB_MAX_WORKERS)
+    limiter = HostLimiter()
 
     total = len(urls)
-    for i, url in enumerate(urls, 1):
-        print(f"➡️  [{i}/{total}] Fetching & extracting:")
-        print(f"    🌐 {url}")
+    with ThreadPoolExecutor(max_workers=WEB_MAX_WORKERS) as pool:
+        futures = {
+            pool.submit(
+                extract_tata_motors_page, url,
+                session=session, limiter=limiter, use_cache=use_cache
+            ): url
+            for url in urls
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            url = futures[future]
+            try:
+                extracted = future.result()
+            except Exception as e:
+                print(f"⚠️ Failed to extract {url}: {e}")
+                extracted = None
+
+            if extracted is None:
+                print(f"➡️  [{i}/{total}] Not loaded:")
+                print(f"    🌐 {url}\n")
+            else:
+                print(f"➡️  [{i}/{total}] Fetched & extracted:")
+                print(f"    🌐 {url}")
+                print(f"    📄 Extracted {len(extracted)} documents\n")
+
+            yield url, extracted
 
-        before = len(docs)
-        extracted = extract_tata_motors_page(url)
-        docs.extend(extracted)
-        after = len(docs)
 
-        print(f"    📄 Extracted {len(extracted)} documents")
-        print(f"    📊 Total documents so far: {after}\n")
+def load_docs(use_cache: bool = False):
+    """Load and extract documents from Tata Motors URLs with deduplication and progress printing."""
+
+    urls = unique_urls()
+
+    print(f"🔹 Raw URLs provided: {len(TATA_MOTORS_URLS)}")
+    print(f"📌 Deduplication complete: {len(TATA_MOTORS_URLS)} → {len(urls)} unique URLs\n")
+
+    results = dict(iter_docs(use_cache=use_cache))
+
+    # Keep the original URL order in the output
+    docs = [doc for url in urls for doc in results[url] or []]
 
     print(f"🎉 Done!")
     print(f"📚 Total documents extracted: {len(docs)}")
 
     return docs
-
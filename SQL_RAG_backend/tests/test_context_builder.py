@@ -0,0 +1,41 @@
+"""
+Sentence de-duplication of the RAG context.
+
+    python -m unittest discover -s SQL_RAG_backend/tests -t .
+"""
+import unittest
+from langchain_core.documents import Document
+from SQL_RAG_backend.data_retrival_.context_builder import drop_repeated_sentences
+
+
+def texts(*contents):
+    docs = [Document(page_content=c, metadata={"source": f"doc{i}"}) for i, c in enumerate(contents)]
+    return [doc.page_content for doc in drop_repeated_sentences(docs)]
+
+
+class DropRepeatedSentencesTest(unittest.TestCase):
+    def test_repeat_is_dropped(self):
+        self.assertEqual(
+            texts(
+                "Online sales grew strongly across every region in 2019.",
+                "Online sales grew strongly across every region in 2019. Wholesale stayed flat.",
+            ),
+            ["Online sales grew strongly across every region in 2019.", "Wholesale stayed flat."],
+        )
+
+    def test_different_year_is_kept(self):
+        first = "Online sales grew strongly across every region in 2019."
+        second = "Online sales grew strongly across every region in 2020."
+        self.assertEqual(texts(first, second), [first, second])
+
+    def test_different_figure_is_kept(self):
+        first = "Revenue of the online channel grew by 12% that year."
+        second = "Revenue of the online channel grew by 15% that year."
+        self.assertEqual(texts(first, second), [first, second])
+
+    def test_short_sentences_are_kept(self):
+        self.assertEqual(texts("Revenue grew.", "Revenue grew."), ["Revenue grew.", "Revenue grew."])
+
+
+if __name__ == "__main__":
+    unittest.main()
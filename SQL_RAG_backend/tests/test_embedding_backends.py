@@ -0,0 +1,57 @@
+"""
+Parity of the embedding backends with the PyTorch reference.
+
+Each backend must agree with "torch" on the same texts at least as closely
+as its MIN_COSINE floor. Backends whose runtime (onnxruntime, torch) or
+model files are not available are skipped.
+
+    python -m unittest discover -s SQL_RAG_backend/tests -t .
+"""
+import unittest
+import numpy as np
+from SQL_RAG_backend.embedding_backends import MIN_COSINE, make_embeddings, unit_vectors
+
+TEXTS = [
+    "Tata Motors Limited is an Indian multinational automotive manufacturing company headquartered in Mumbai.",
+    "Jaguar Land Rover was acquired from Ford Motor Company in 2008 for 2.3 billion US dollars.",
+    "Electric vehicle sales crossed a new milestone as charging infrastructure expanded across cities.",
+    "Raw material costs, especially steel and aluminium prices, weighed on operating margins.",
+    "What was the total revenue of the online channel in 2019?",
+    "Which plants build the Nano?",
+]
+
+
+def embed(backend: str) -> np.ndarray:
+    from SQL_RAG_backend.vectordb import EMBEDDING_MODEL
+
+    return unit_vectors(make_embeddings(EMBEDDING_MODEL, backend).embed_documents(TEXTS))
+
+
+class EmbeddingBackendParityTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            cls.reference = embed("torch")
+        except (ImportError, OSError) as e:
+            raise unittest.SkipTest(f"torch reference unavailable: {e}")
+
+    def assert_parity(self, backend: str):
+        try:
+            vectors = embed(backend)
+        except (ImportError, OSError) as e:
+            self.skipTest(f"{backend} unavailable: {e}")
+        cosine = np.sum(vectors * self.reference, axis=1)
+        self.assertGreaterEqual(float(cosine.min()), MIN_COSINE[backend])
+
+    def test_torch_int8(self):
+        self.assert_parity("torch-int8")
+
+    def test_onnx(self):
+        self.assert_parity("onnx")
+
+    def test_onnx_int8(self):
+        self.assert_parity("onnx-int8")
+
+
+if __name__ == "__main__":
+    unittest.main()
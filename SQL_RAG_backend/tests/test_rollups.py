@@ -0,0 +1,126 @@
+"""
+parse_question / build_query of the sales rollups, and the month ranges refresh recomputes.
+
+    python -m unittest discover -s SQL_RAG_backend/tests -t .
+"""
+import datetime
+import unittest
+from SQL_RAG_backend.data_retrival_.rollups import _month_ranges, build_query, parse_question
+
+VALUES = {
+    "channel": ["Online", "Wholesale", "In-Store"],
+    "region": ["South", "West"],
+    "state": ["California"],
+    "product": ["Product 1"],
+}
+
+
+class ParseQuestionTest(unittest.TestCase):
+    def parse(self, question):
+        return parse_question(question, VALUES)
+
+    def test_top_products_in_year(self):
+        parsed = self.parse("Top 5 products by revenue in 2018")
+        self.assertEqual(parsed["measure"], "revenue")
+        self.assertEqual(parsed["dimension"], "product")
+        self.assertEqual(parsed["filters"], {"year": 2018})
+        self.assertEqual(parsed["limit"], 5)
+        self.assertTrue(parsed["descending"])
+
+    def test_monthly_per_channel(self):
+        parsed = self.parse("Monthly revenue per channel in 2018")
+        self.assertEqual((parsed["dimension"], parsed["series"]), ("month", "channel"))
+
+    def test_filter_value_is_not_a_breakdown(self):
+        parsed = self.parse("Monthly revenue for the Wholesale channel")
+        self.assertEqual(parsed["dimension"], "month")
+        self.assertIsNone(parsed["series"])
+        self.assertEqual(parsed["filters"], {"channel": "Wholesale"})
+
+    def test_sales_channel_is_a_dimension(self):
+        parsed = self.parse("How many orders by sales channel")
+        self.assertEqual((parsed["measure"], parsed["dimension"]), ("orders", "channel"))
+
+    def test_bottom_n(self):
+        parsed = self.parse("Lowest 3 states by profit")
+        self.assertEqual(parsed["limit"], 3)
+        self.assertFalse(parsed["descending"])
+
+    def test_time_windows_other_than_a_year(self):
+        for question in (
+            "Top products by revenue last quarter",
+            "Top products by revenue in January 2019",
+            "Top products by revenue in Q3 2019",
+            "Total revenue by region for the last 6 months",
+            "Revenue by product in May 2019",
+            "Revenue by channel this year",
+            "Revenue by product in 2018 and 2019",
+        ):
+            with self.subTest(question=question):
+                self.assertIsNone(self.parse(question))
+
+    def test_negations(self):
+        for question in (
+            "Revenue by month not including online",
+            "Revenue by region excluding Wholesale",
+            "Revenue by product except Product 1",
+            "Monthly revenue without online orders",
+        ):
+            with self.subTest(question=question):
+                self.assertIsNone(self.parse(question))
+
+    def test_more_than_one_measure(self):
+        self.assertIsNone(self.parse("Least sales by product among online orders"))
+        self.assertIsNone(self.parse("Units sold by region"))
+
+    def test_unsupported_words(self):
+        self.assertIsNone(self.parse("Average revenue by product"))
+        self.assertIsNone(self.parse("Compare budget and revenue by product"))
+
+    def test_needs_measure_and_dimension(self):
+        self.assertIsNone(self.parse("Revenue"))
+        self.assertIsNone(self.parse("List the products"))
+
+
+class BuildQueryTest(unittest.TestCase):
+    def test_year_filter_and_limit(self):
+        sql, params = build_query(parse_question("Top 5 products by revenue in 2018", VALUES))
+        self.assertIn("FROM rollup_sales_monthly r", sql)
+        self.assertIn('JOIN Products p ON p."index" = r.product_index', sql)
+        self.assertIn("r.month >= :start AND r.month < :end", sql)
+        self.assertTrue(sql.endswith("ORDER BY revenue DESC LIMIT 5"))
+        self.assertEqual(params, {"start": datetime.date(2018, 1, 1), "end": datetime.date(2019, 1, 1)})
+
+    def test_region_filter_joins_states(self):
+        sql, params = build_query(parse_question("Revenue by product in the South region", VALUES))
+        self.assertIn("JOIN stateRegions sr ON sr.stateCode = r.state_code", sql)
+        self.assertIn("sr.region = :region", sql)
+        self.assertEqual(params, {"region": "South"})
+
+    def test_time_dimension_orders_by_label(self):
+        sql, _ = build_query(parse_question("Monthly revenue per channel", VALUES))
+        self.assertIn("GROUP BY r.month, r.channel", sql)
+        self.assertTrue(sql.endswith("ORDER BY 1"))
+        self.assertNotIn("LIMIT", sql)
+
+    def test_customers_use_customer_rollup(self):
+        sql, _ = build_query(parse_question("Top customers by revenue", VALUES))
+        self.assertIn("FROM rollup_customer_monthly r", sql)
+        self.assertIn("JOIN Customers c", sql)
+        self.assertTrue(sql.endswith("LIMIT 10"))
+
+
+class MonthRangesTest(unittest.TestCase):
+    def test_consecutive_months_merge_across_years(self):
+        d = datetime.date
+        self.assertEqual(
+            _month_ranges([d(2019, 1, 1), d(2018, 12, 1), d(2018, 11, 1), d(2019, 3, 1)]),
+            [(d(2018, 11, 1), d(2019, 1, 1)), (d(2019, 3, 1), d(2019, 3, 1))],
+        )
+
+    def test_no_months(self):
+        self.assertEqual(_month_ranges([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Conditional fetches and per-host limits of the web loader, against a local server.
+
+    python -m unittest discover -s SQL_RAG_backend/tests -t .
+"""
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from SQL_RAG_backend.indexing_store_ import web_loader
+
+PAGE = "<html><body><p>cached page</p></body></html>"
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(dict(self.headers))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            time.sleep(server.delay)
+            if server.fail:
+                self.send_response(503)
+                self.end_headers()
+            elif self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.end_headers()
+            else:
+                body = PAGE.encode("utf-8")
+                self.send_response(200)
+                self.send_header("ETag", ETAG)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class WebLoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.active = self.server.max_active = 0
+        self.server.delay = 0.0
+        self.server.fail = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/page"
+
+        self.cache_dir = tempfile.mkdtemp()
+        self._cache_dir, web_loader.WEB_CACHE_DIR = web_loader.WEB_CACHE_DIR, self.cache_dir
+
+    def tearDown(self):
+        web_loader.WEB_CACHE_DIR = self._cache_dir
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_revalidates_with_etag(self):
+        self.assertEqual(web_loader.fetch_page(self.url, use_cache=True), PAGE)
+        self.assertEqual(web_loader.fetch_page(self.url, use_cache=True), PAGE)
+        first, second = self.server.requests
+        self.assertNotIn("If-None-Match", first)
+        self.assertEqual(second["If-None-Match"], ETAG)
+
+    def test_failed_fetch_serves_cached_copy(self):
+        web_loader.fetch_page(self.url, use_cache=True)
+        self.server.fail = True
+        self.assertEqual(web_loader.fetch_page(self.url, retries=1, use_cache=True), PAGE)
+
+    def test_failed_fetch_without_cache_is_not_loaded(self):
+        self.server.fail = True
+        self.assertIsNone(web_loader.fetch_page(self.url, retries=1, use_cache=True))
+        self.assertIsNone(web_loader.extract_tata_motors_page(self.url, retries=1, use_cache=True))
+
+    def test_host_limiter_caps_concurrency(self):
+        self.server.delay = 0.2
+        limiter = web_loader.HostLimiter(per_host=2, delay=0.0)
+        session = web_loader.make_session(6)
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            pages = list(pool.map(
+                lambda _: web_loader.fetch_page(self.url, session=session, limiter=limiter), range(6)
+            ))
+        self.assertEqual(pages, [PAGE] * 6)
+        self.assertEqual(self.server.max_active, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+"""
+Lightweight request tracing.
+
+A request opens a Trace; code inside it wraps its stages in span("name").
+Spans nest ("sql_agent/llm"), add up per stage within the request, and feed
+process-wide latency histograms rendered in the Prometheus text format.
+The active trace lives in a ContextVar, so pool threads only see it when the
+task is submitted through submit().
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+# Requests slower than this (seconds) are printed and kept for /stats
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "5"))
+SLOW_LOG_SIZE = int(os.getenv("SLOW_LOG_SIZE", "50"))
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_trace = ContextVar("trace", default=None)
+_path = ContextVar("span_path", default=())
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, Prometheus style."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.sum += seconds
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.requests = {}
+        self.slow = deque(maxlen=SLOW_LOG_SIZE)
+
+    def observe(self, family: dict, label: str, seconds: float):
+        with self.lock:
+            histogram = family.get(label)
+            if histogram is None:
+                histogram = family[label] = Histogram()
+            histogram.observe(seconds)
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for metric, label_name, family in (
+                ("sql_rag_stage_seconds", "stage", self.stages),
+                ("sql_rag_request_seconds", "endpoint", self.requests),
+            ):
+                lines.append(f"# TYPE {metric} histogram")
+                for label, h in sorted(family.items()):
+                    for bound, count in zip(h.buckets, h.counts):
+                        lines.append(f'{metric}_bucket{{{label_name}="{label}",le="{bound}"}} {count}')
+                    lines.append(f'{metric}_bucket{{{label_name}="{label}",le="+Inf"}} {h.count}')
+                    lines.append(f'{metric}_sum{{{label_name}="{label}"}} {h.sum:.6f}')
+                    lines.append(f'{metric}_count{{{label_name}="{label}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class Trace:
+    """Per-request stage totals: {stage path: [seconds, calls]}."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self.lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def timings(self) -> dict:
+        """Seconds per stage plus the total so far; repeated stages carry a call count."""
+        with self.lock:
+            stages = {
+                stage: round(seconds, 4) if calls == 1 else {"seconds": round(seconds, 4), "calls": calls}
+                for stage, (seconds, calls) in sorted(self.stages.items())
+            }
+        stages["total"] = round(self.elapsed(), 4)
+        return stages
+
+    def finish(self) -> dict:
+        timings = self.timings()
+        metrics.observe(metrics.requests, self.name, timings["total"])
+        if timings["total"] >= SLOW_REQUEST_SECONDS:
+            entry = {"endpoint": self.name, "at": time.time(), "timings": timings}
+            metrics.slow.append(entry)
+            print(f"🐢 Slow request: {json.dumps(entry)}")
+        return timings
+
+
+class Span:
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.seconds = None
+
+
+@contextmanager
+def span(name: str):
+    """Time a stage; the Span's .seconds is set when the block exits."""
+    path = _path.get() + (name,)
+    token = _path.set(path)
+    current = Span("/".join(path))
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - start
+        _path.reset(token)
+        record(current.stage, current.seconds, nested=False)
+
+
+def record(stage: str, seconds: float, nested: bool = True):
+    """Record an externally measured duration, under the current span when nested."""
+    if nested:
+        stage = "/".join(_path.get() + (stage,))
+    metrics.observe(metrics.stages, stage, seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+def traced(name: str):
+    """Decorator form of span()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def activate(trace: Trace):
+    """Make trace the current one for this block (e.g. inside a streamed response)."""
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+@contextmanager
+def trace(name: str):
+    """Trace one request; records the request histogram and slow log on exit."""
+    current = Trace(name)
+    with activate(current):
+        try:
+            yield current
+        finally:
+            current.finish()
+
+
+def submit(executor, fn, *args, **kwargs):
+    """executor.submit that carries the current trace and span path into the worker."""
+    return executor.submit(copy_context().run, fn, *args, **kwargs)
+
+
+def render_metrics() -> str:
+    return metrics.render()
+
+
+def slow_requests() -> list:
+    with metrics.lock:
+        return list(metrics.slow)
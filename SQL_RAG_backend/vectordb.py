@@ -1,14 +1,290 @@
-from langchain_huggingface import HuggingFaceEmbeddings
+import os
+import re
+import threading
+import time
+from langchain_core.documents import Document
 from langchain_postgres import PGVector
-from .database_config import getSqlUrl
-
-def get_vectordb():
-    embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
-    vector_store = PGVector(
-        collection_name="chatbot",
-        embeddings=embeddings,
-        connection=getSqlUrl(),
-    )
-    return vector_store
\ No newline at end of file
+from sqlalchemy import text
+from .database_config import get_engine
+from .embedding_backends import make_embeddings, QueryCacheEmbeddings
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+COLLECTION_NAME = "chatbot"
+EMBEDDING_DIM = 384
+TEXT_SEARCH_CONFIG = "english"
+
+# "torch", "torch-int8", "onnx" or "onnx-int8" (see embedding_backends.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Inference threads per process; 0 keeps the runtime's default
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+# Recent query vectors kept in memory; 0 disables the cache
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+# Cached index vectors can only be reused by the backend that produced them
+EMBEDDING_CACHE_KEY = (
+    EMBEDDING_MODEL if EMBEDDING_BACKEND == "torch" else f"{EMBEDDING_MODEL}@{EMBEDDING_BACKEND}"
+)
+
+# Default recall/latency knobs for the ANN index (see indexing_store_/ann_index.py)
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40"))
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "10"))
+
+# Process-wide registry: the embedding model is loaded once per worker and
+# every PGVector store shares the pooled engine from database_config.
+_lock = threading.Lock()
+_embeddings = None
+_stores = {}
+_stats = {
+    "embedding_loads": 0,
+    "embedding_load_seconds": 0.0,
+    "embedding_reuses": 0,
+    "store_creates": 0,
+    "store_reuses": 0,
+}
+
+
+def get_embeddings():
+    global _embeddings
+    if _embeddings is not None:
+        _stats["embedding_reuses"] += 1
+        return _embeddings
+
+    with _lock:
+        if _embeddings is None:
+            start = time.perf_counter()
+            embeddings = make_embeddings(EMBEDDING_MODEL, EMBEDDING_BACKEND, EMBEDDING_THREADS)
+            if QUERY_EMBEDDING_CACHE_SIZE > 0:
+                embeddings = QueryCacheEmbeddings(embeddings, QUERY_EMBEDDING_CACHE_SIZE)
+            _embeddings = embeddings
+            _stats["embedding_loads"] += 1
+            _stats["embedding_load_seconds"] += time.perf_counter() - start
+        else:
+            _stats["embedding_reuses"] += 1
+    return _embeddings
+
+
+def get_vectordb(collection_name: str = COLLECTION_NAME):
+    store = _stores.get(collection_name)
+    if store is not None:
+        _stats["store_reuses"] += 1
+        return store
+
+    embeddings = get_embeddings()
+    with _lock:
+        store = _stores.get(collection_name)
+        if store is None:
+            store = PGVector(
+                collection_name=collection_name,
+                embeddings=embeddings,
+                connection=get_engine(),
+            )
+            _stores[collection_name] = store
+            _stats["store_creates"] += 1
+        else:
+            _stats["store_reuses"] += 1
+    return store
+
+
+def preload():
+    """Load the model weights and open the default store without running inference.
+
+    Safe to call in a pre-fork master: the weights are shared copy-on-write with
+    the workers, while the inference thread pools are only created after fork.
+    """
+    start = time.perf_counter()
+    get_vectordb()
+    return round(time.perf_counter() - start, 3)
+
+
+def warm_up():
+    """Load the model, open the store and run one embedding so the first request is fast."""
+    start = time.perf_counter()
+    get_vectordb().embeddings.embed_query("warm up")
+    return round(time.perf_counter() - start, 3)
+
+
+def registry_stats():
+    with _lock:
+        stats = dict(_stats)
+    stats["embedding_load_seconds"] = round(stats["embedding_load_seconds"], 3)
+    stats["stores"] = sorted(_stores)
+    stats["embedding_backend"] = EMBEDDING_BACKEND
+    stats["embedding_threads"] = EMBEDDING_THREADS
+    if isinstance(_embeddings, QueryCacheEmbeddings):
+        stats["query_cache"] = _embeddings.stats()
+    return stats
+
+
+def _collection_uuid(conn, collection_name: str):
+    row = conn.execute(
+        text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"),
+        {"name": collection_name},
+    ).first()
+    return str(row[0]) if row else None
+
+
+def index_version(collection_name: str = COLLECTION_NAME):
+    """UUID of the collection; it changes whenever embed_store rebuilds it."""
+    with get_engine().connect() as conn:
+        return _collection_uuid(conn, collection_name)
+
+
+def to_vector_literal(embedding) -> str:
+    return "[" + ",".join(str(float(x)) for x in embedding) + "]"
+
+
+def ann_search(embedding, k: int = 5, collection_name: str = COLLECTION_NAME,
+               ef_search: int = None, probes: int = None, exact: bool = False) -> list:
+    """
+    Nearest chunks by cosine distance as (Document, distance) pairs.
+
+    The query uses the same expression and collection_id predicate as the
+    partial ANN index, so pgvector can serve it from HNSW/IVFFlat.
+    ef_search / probes trade recall for latency per query; exact=True
+    disables index scans (ground truth for benchmarks).
+    """
+    with get_engine().begin() as conn:
+        collection_id = _collection_uuid(conn, collection_name)
+        if collection_id is None:
+            return []
+
+        conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search or HNSW_EF_SEARCH)}"))
+        conn.execute(text(f"SET LOCAL ivfflat.probes = {int(probes or IVFFLAT_PROBES)}"))
+        if exact:
+            conn.execute(text("SET LOCAL enable_indexscan = off"))
+
+        rows = conn.execute(
+            text(
+                f"SELECT document, cmetadata, "
+                f"       (embedding::vector({EMBEDDING_DIM})) <=> CAST(:q AS vector({EMBEDDING_DIM})) AS distance "
+                "FROM langchain_pg_embedding "
+                "WHERE collection_id = :cid "
+                f"ORDER BY (embedding::vector({EMBEDDING_DIM})) <=> CAST(:q AS vector({EMBEDDING_DIM})) "
+                "LIMIT :k"
+            ),
+            {"q": to_vector_literal(embedding), "cid": collection_id, "k": k},
+        )
+        return [
+            (Document(page_content=row.document, metadata=dict(row.cmetadata or {})), float(row.distance))
+            for row in rows
+        ]
+
+
+def collection_hashes(collection_name: str = COLLECTION_NAME) -> set:
+    """content_hash values of every chunk stored in the collection."""
+    with get_engine().connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT e.cmetadata->>'content_hash' "
+                "FROM langchain_pg_embedding e "
+                "JOIN langchain_pg_collection c ON e.collection_id = c.uuid "
+                "WHERE c.name = :name"
+            ),
+            {"name": collection_name},
+        )
+        return {row[0] for row in rows if row[0]}
+
+
+def copy_embeddings(source: str, target: str, hashes) -> int:
+    """Copy stored vectors for the given chunk hashes without re-embedding them."""
+    if not hashes:
+        return 0
+    with get_engine().begin() as conn:
+        result = conn.execute(
+            text(
+                "INSERT INTO langchain_pg_embedding (id, collection_id, embedding, document, cmetadata) "
+                "SELECT DISTINCT ON (e.cmetadata->>'content_hash') "
+                "       gen_random_uuid()::text, t.uuid, e.embedding, e.document, e.cmetadata "
+                "FROM langchain_pg_embedding e "
+                "JOIN langchain_pg_collection s ON e.collection_id = s.uuid "
+                "JOIN langchain_pg_collection t ON t.name = :target "
+                "WHERE s.name = :source AND e.cmetadata->>'content_hash' = ANY(:hashes)"
+            ),
+            {"source": source, "target": target, "hashes": list(hashes)},
+        )
+        return result.rowcount
+
+
+def carry_over_chunks(source: str, target: str, source_pattern: str) -> set:
+    """
+    Copy chunks whose metadata source matches a regex and that the target
+    does not have yet; returns their content hashes.
+    """
+    with get_engine().begin() as conn:
+        rows = conn.execute(
+            text(
+                "INSERT INTO langchain_pg_embedding (id, collection_id, embedding, document, cmetadata) "
+                "SELECT DISTINCT ON (e.cmetadata->>'content_hash') "
+                "       gen_random_uuid()::text, t.uuid, e.embedding, e.document, e.cmetadata "
+                "FROM langchain_pg_embedding e "
+                "JOIN langchain_pg_collection s ON e.collection_id = s.uuid "
+                "JOIN langchain_pg_collection t ON t.name = :target "
+                "WHERE s.name = :source AND e.cmetadata->>'source' ~* :pattern "
+                "AND NOT EXISTS (SELECT 1 FROM langchain_pg_embedding x "
+                "                WHERE x.collection_id = t.uuid "
+                "                AND x.cmetadata->>'content_hash' = e.cmetadata->>'content_hash') "
+                "RETURNING cmetadata->>'content_hash'"
+            ),
+            {"source": source, "target": target, "pattern": source_pattern},
+        )
+        return {row[0] for row in rows if row[0]}
+
+
+def swap_collection(shadow: str, live: str = COLLECTION_NAME):
+    """Atomically replace the live collection with the shadow one."""
+    with get_engine().begin() as conn:
+        conn.execute(
+            text("DELETE FROM langchain_pg_collection WHERE name = :live"),
+            {"live": live},
+        )
+        conn.execute(
+            text("UPDATE langchain_pg_collection SET name = :live WHERE name = :shadow"),
+            {"live": live, "shadow": shadow},
+        )
+
+
+def ensure_text_search_index():
+    """GIN index over the chunk text used by text_search (idempotent)."""
+    with get_engine().begin() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_langchain_pg_embedding_document_fts "
+            "ON langchain_pg_embedding "
+            f"USING gin (to_tsvector('{TEXT_SEARCH_CONFIG}', document))"
+        ))
+
+
+def text_search(query: str, k: int = 20, collection_name: str = COLLECTION_NAME) -> list:
+    """
+    Full-text search over the chunk text, best match first.
+
+    Query words are OR-ed so that a long question still matches chunks
+    containing only its rare terms (model names, years, figures); ranking
+    is left to ts_rank_cd.
+    """
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return []
+    cfg = TEXT_SEARCH_CONFIG
+
+    with get_engine().connect() as conn:
+        rows = conn.execute(
+            text(
+                # Same expression as the GIN index so the planner can use it
+                f"SELECT e.document, e.cmetadata, ts_rank_cd(to_tsvector('{cfg}', e.document), q) AS rank "
+                "FROM langchain_pg_embedding e "
+                "JOIN langchain_pg_collection c ON e.collection_id = c.uuid, "
+                f"     to_tsquery('{cfg}', :tsquery) q "
+                "WHERE c.name = :name "
+                f"  AND to_tsvector('{cfg}', e.document) @@ q "
+                "ORDER BY rank DESC "
+                "LIMIT :k"
+            ),
+            {
+                "tsquery": " | ".join(dict.fromkeys(words)),
+                "name": collection_name,
+                "k": k,
+            },
+        )
+        return [
+            (Document(page_content=row.document, metadata=dict(row.cmetadata or {})), float(row.rank))
+            for row in rows
+        ]
@@ -0,0 +1,292 @@
+"""
+Bulk loader for the SQL_DATA warehouse.
+
+Creates the tables from tableCreation.sql, streams the CSVs into Postgres
+with COPY, optionally generates synthetic SalesOrder rows server-side with
+generate_series, then builds the secondary indexes from indexes.sql, runs
+ANALYZE and refreshes the sales rollups.
+
+Secondary indexes and the SalesOrder foreign keys are dropped for the bulk
+load and rebuilt afterwards: one sort per index and one validation pass per
+key are far cheaper than maintaining them row by row. If the load fails they
+are rebuilt before the error is raised, so the tables are never left bare.
+
+    python -m SQL_RAG_backend.warehouse_loader --create --truncate
+    python -m SQL_RAG_backend.warehouse_loader --synthetic-rows 10000000
+    python -m SQL_RAG_backend.warehouse_loader --indexes-only
+"""
+import argparse
+import csv
+import os
+import re
+import time
+from contextlib import contextmanager
+from sqlalchemy import text
+from .database_config import get_engine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SQL_DATA_DIR = os.path.join(BASE_DIR, "..", "SQL_DATA")
+SCHEMA_SQL = os.path.join(SQL_DATA_DIR, "Sql Files", "tableCreation.sql")
+INDEXES_SQL = os.path.join(SQL_DATA_DIR, "Sql Files", "indexes.sql")
+
+# Load order respects the foreign keys
+CSV_TABLES = (
+    ("stateRegions.csv", "stateRegions"),
+    ("regions.csv", "Regions"),
+    ("products.csv", "Products"),
+    ("customers.csv", "Customers"),
+    ("budget.csv", "Budget"),
+)
+# SERIAL keys that the CSVs set explicitly
+SERIAL_KEYS = (("Products", "index"), ("Customers", "customerIndex"), ("Regions", "id"))
+
+SALES_FOREIGN_KEYS = {
+    "fk_sales_customer": "FOREIGN KEY (customerNameIndex) REFERENCES Customers(customerIndex)",
+    "fk_sales_product": "FOREIGN KEY (productDescriptionIndex) REFERENCES Products(index)",
+    "fk_sales_region": "FOREIGN KEY (deliveryRegionIndex) REFERENCES Regions(id)",
+}
+
+SYNTHETIC_BATCH = int(os.getenv("SYNTHETIC_BATCH", "1000000"))
+# Memory for index builds in the loader's session only
+LOADER_MAINTENANCE_WORK_MEM = os.getenv("LOADER_MAINTENANCE_WORK_MEM", "512MB")
+
+SYNTHETIC_SALES = """
+INSERT INTO SalesOrder (
+    orderNumber, orderDate, customerNameIndex, channel, currencyCode, warehouseCode,
+    deliveryRegionIndex, productDescriptionIndex, orderQuantity, unitPrice, lineTotal, totalUnitCost
+)
+SELECT 'SYN-' || lpad(g::text, 10, '0'),
+       DATE '2014-01-01' + floor(random() * 1826)::int,
+       k.customers[1 + floor(random() * array_length(k.customers, 1))::int],
+       (ARRAY['Wholesale', 'Distributor', 'Export', 'In-Store', 'Online'])[1 + floor(random() * 5)::int],
+       'USD',
+       (ARRAY['AXW291', 'NXH382', 'FLR025', 'GUT930'])[1 + floor(random() * 4)::int],
+       k.regions[1 + floor(random() * array_length(k.regions, 1))::int],
+       k.products[1 + floor(random() * array_length(k.products, 1))::int],
+       s.quantity,
+       s.price,
+       round(s.quantity * s.price, 2),
+       round(s.price * (0.4 + random() * 0.4)::numeric, 3)
+FROM (
+    SELECT g, 1 + floor(random() * 12)::int AS quantity,
+           round((100 + random() * 5900)::numeric, 2) AS price
+    FROM generate_series(:first, :last) AS g
+) s
+CROSS JOIN (
+    SELECT (SELECT array_agg(customerIndex) FROM Customers) AS customers,
+           (SELECT array_agg(id) FROM Regions) AS regions,
+           (SELECT array_agg(index) FROM Products) AS products
+) k
+"""
+
+
+def sql_statements(path: str) -> list:
+    """Statements of a .sql file, without comments."""
+    with open(path, encoding="utf-8") as f:
+        body = re.sub(r"--[^\n]*", "", f.read())
+    return [s.strip() for s in body.split(";") if s.strip()]
+
+
+def index_names(path: str = INDEXES_SQL) -> list:
+    return [
+        m.group(1)
+        for m in (re.search(r"INDEX\s+IF\s+NOT\s+EXISTS\s+(\w+)", s, re.I) for s in sql_statements(path))
+        if m
+    ]
+
+
+def create_schema(drop: bool = False):
+    with get_engine().begin() as conn:
+        if drop:
+            for _, table in reversed(CSV_TABLES + (("", "SalesOrder"),)):
+                conn.execute(text(f"DROP TABLE IF EXISTS {table} CASCADE"))
+        existing = {
+            name for (name,) in conn.execute(
+                text("SELECT tablename FROM pg_tables WHERE schemaname = current_schema()")
+            )
+        }
+        for statement in sql_statements(SCHEMA_SQL):
+            table = re.search(r"CREATE\s+TABLE\s+(\w+)", statement, re.I)
+            if table and table.group(1).lower() in existing:
+                continue
+            conn.execute(text(statement))
+
+
+def truncate():
+    tables = ", ".join(["SalesOrder"] + [table for _, table in reversed(CSV_TABLES)])
+    with get_engine().begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} CASCADE"))
+
+
+def copy_csv(path: str, table: str) -> int:
+    """Stream one CSV file into a table with COPY; returns the row count."""
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f))
+        f.seek(0)
+        # Unquoted identifiers in tableCreation.sql are folded to lower case
+        columns = ", ".join(f'"{c.strip().lower()}"' for c in header)
+        conn = get_engine().raw_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, HEADER true)", f)
+                rows = cur.rowcount
+            conn.commit()
+        finally:
+            conn.close()
+    return rows
+
+
+def load_csvs(data_dir: str = SQL_DATA_DIR) -> dict:
+    counts = {}
+    for filename, table in CSV_TABLES:
+        start = time.perf_counter()
+        counts[table] = copy_csv(os.path.join(data_dir, filename), table)
+        print(f"📥 {table}: {counts[table]} rows in {time.perf_counter() - start:.2f}s")
+
+    with get_engine().begin() as conn:
+        for table, column in SERIAL_KEYS:
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.lower()}', '{column.lower()}'), "
+                f"COALESCE((SELECT max(\"{column.lower()}\") FROM {table}), 1))"
+            ))
+    return counts
+
+
+def drop_secondary(conn):
+    """Drop the secondary indexes and SalesOrder foreign keys before a bulk load."""
+    for name in index_names():
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    for name in SALES_FOREIGN_KEYS:
+        conn.execute(text(f"ALTER TABLE SalesOrder DROP CONSTRAINT IF EXISTS {name}"))
+
+
+@contextmanager
+def secondary_dropped():
+    """Drop secondary indexes and foreign keys for a bulk load; rebuild them if it fails."""
+    with get_engine().begin() as conn:
+        drop_secondary(conn)
+    try:
+        yield
+    except BaseException:
+        print("⚠️ Bulk load failed; restoring indexes and foreign keys")
+        try:
+            create_indexes()
+        except Exception as e:
+            print(f"❌ Could not restore indexes and foreign keys: {e}")
+        raise
+
+
+def synthetic_count() -> int:
+    with get_engine().connect() as conn:
+        return conn.execute(
+            text("SELECT count(*) FROM SalesOrder WHERE orderNumber LIKE 'SYN-%'")
+        ).scalar()
+
+
+def generate_sales(rows: int, seed: float = None, batch: int = SYNTHETIC_BATCH, drop_indexes: bool = True) -> int:
+    """
+    Append synthetic SalesOrder rows; each batch commits on its own.
+
+    With drop_indexes the secondary indexes and foreign keys are dropped
+    first and, should a batch fail, rebuilt before the error propagates; on
+    success rebuilding them is left to the caller (create_indexes).
+    """
+    if drop_indexes:
+        with secondary_dropped():
+            return generate_sales(rows, seed=seed, batch=batch, drop_indexes=False)
+
+    first = synthetic_count() + 1
+    start = time.perf_counter()
+    done = 0
+    while done < rows:
+        size = min(batch, rows - done)
+        with get_engine().begin() as conn:
+            if seed is not None:
+                # setseed() is per session; derive a distinct seed for every batch
+                batch_seed = (seed + 1 + (done // batch) * 1e-4) % 2 - 1
+                conn.execute(text("SELECT setseed(:seed)"), {"seed": batch_seed})
+            conn.execute(text(SYNTHETIC_SALES), {"first": first + done, "last": first + done + size - 1})
+        done += size
+        rate = done / (time.perf_counter() - start)
+        print(f"   🧪 {done:,}/{rows:,} synthetic orders ({rate:,.0f} rows/s)")
+    return done
+
+
+def remove_synthetic_sales(keep: int = 0) -> int:
+    """Delete synthetic orders numbered above keep (generate_sales numbers them in sequence)."""
+    with get_engine().begin() as conn:
+        deleted = conn.execute(
+            text("DELETE FROM SalesOrder WHERE orderNumber LIKE 'SYN-%' AND orderNumber > :last"),
+            {"last": f"SYN-{keep:010d}"},
+        ).rowcount
+        conn.execute(text("ANALYZE SalesOrder"))
+    return deleted
+
+
+def create_indexes() -> float:
+    """(Re)create secondary indexes and foreign keys, then ANALYZE."""
+    start = time.perf_counter()
+    with get_engine().begin() as conn:
+        conn.execute(text(f"SET LOCAL maintenance_work_mem = '{LOADER_MAINTENANCE_WORK_MEM}'"))
+        for statement in sql_statements(INDEXES_SQL):
+            conn.execute(text(statement))
+        existing = dict(conn.execute(text(
+            "SELECT conname, convalidated FROM pg_constraint WHERE conrelid = 'salesorder'::regclass"
+        )).all())
+        for name, definition in SALES_FOREIGN_KEYS.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE SalesOrder ADD CONSTRAINT {name} {definition} NOT VALID"))
+                existing[name] = False
+
+    # Adding a key NOT VALID only takes a brief exclusive lock; the row check
+    # runs in its own transaction under SHARE UPDATE EXCLUSIVE, which lets
+    # reads and writes on SalesOrder continue meanwhile
+    for name in SALES_FOREIGN_KEYS:
+        if not existing[name]:
+            with get_engine().begin() as conn:
+                conn.execute(text(f"ALTER TABLE SalesOrder VALIDATE CONSTRAINT {name}"))
+
+    with get_engine().begin() as conn:
+        for _, table in CSV_TABLES + (("", "SalesOrder"),):
+            conn.execute(text(f"ANALYZE {table}"))
+    return round(time.perf_counter() - start, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load SQL_DATA into Postgres")
+    parser.add_argument("--create", action="store_true", help="create missing tables from tableCreation.sql")
+    parser.add_argument("--drop", action="store_true", help="drop and recreate the tables (with --create)")
+    parser.add_argument("--truncate", action="store_true", help="empty the tables before loading")
+    parser.add_argument("--skip-csv", action="store_true", help="do not load the CSV files")
+    parser.add_argument("--sales-csv", default=None, help="SalesOrder CSV export to COPY in")
+    parser.add_argument("--synthetic-rows", type=int, default=0, help="synthetic SalesOrder rows to append")
+    parser.add_argument("--seed", type=float, default=None, help="setseed() value in [-1, 1] for repeatable data")
+    parser.add_argument("--indexes-only", action="store_true", help="only (re)build indexes and ANALYZE")
+    parser.add_argument("--no-rollups", action="store_true", help="do not refresh the sales rollups")
+    args = parser.parse_args()
+
+    if not args.indexes_only:
+        if args.create:
+            create_schema(drop=args.drop)
+        if args.truncate:
+            truncate()
+        with secondary_dropped():
+            if not args.skip_csv:
+                load_csvs()
+            if args.sales_csv:
+                start = time.perf_counter()
+                rows = copy_csv(args.sales_csv, "SalesOrder")
+                print(f"📥 SalesOrder: {rows} rows in {time.perf_counter() - start:.2f}s")
+            if args.synthetic_rows:
+                generate_sales(args.synthetic_rows, seed=args.seed, drop_indexes=False)
+
+    print(f"🗂️  Indexes, foreign keys and ANALYZE done in {create_indexes()}s")
+
+    if not args.no_rollups:
+        from .data_retrival_.rollups import refresh
+
+        print(f"📊 Rollups refreshed: {refresh(full=True)}")
+
+
+if __name__ == "__main__":
+    main()
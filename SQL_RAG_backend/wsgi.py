@@ -0,0 +1,8 @@
+"""WSGI entry point: gunicorn -c SQL_RAG_backend/gunicorn.conf.py SQL_RAG_backend.wsgi:app"""
+from .api import create_app
+from .vectordb import preload
+
+# With preload_app the master imports this module once before forking, so the
+# model weights are loaded here and shared copy-on-write by every worker
+print(f"📦 Embedding model loaded in {preload()}s")
+app = create_app()